@@ -4,13 +4,16 @@ import base64
 import requests
 from fastapi import APIRouter
 from pydantic import BaseModel
-from groq import Groq
 from dotenv import load_dotenv
 from data_input import llm_call
+from scripts.llm_gateway import gateway, VLM_MODEL
+from scripts.translation_catalog import catalog, flow_strings, data_digest
 
 load_dotenv()
 router = APIRouter()
 
+VLM_TIMEOUT = 20  # seconds per attempt; the farmer is waiting on the upload reply
+
 def verify_document_vlm(image_url: str, document_type: str) -> bool:
     twilio_sid = os.getenv("TWILIO_ACCOUNT_SID")
     twilio_auth = os.getenv("TWILIO_AUTH_TOKEN")
@@ -37,10 +40,9 @@ def verify_document_vlm(image_url: str, document_type: str) -> bool:
             if "png" in content_type:
                 image_mime = "image/png"
             
-        client = Groq(api_key=os.getenv("GROQ_API_KEY"))
         prompt = f"The user was asked to upload an image of: {document_type}. Does this image visually depict a {document_type} or a document directly satisfying this purpose? Reply ONLY with YES or NO."
             
-        chat_completion = client.chat.completions.create(
+        result = gateway.chat(
             messages=[
                 {
                     "role": "user",
@@ -55,9 +57,10 @@ def verify_document_vlm(image_url: str, document_type: str) -> bool:
                     ],
                 }
             ],
-            model="meta-llama/llama-4-scout-17b-16e-instruct",
-        )
-        result = chat_completion.choices[0].message.content.strip().upper()
+            model=VLM_MODEL,
+            timeout=VLM_TIMEOUT,
+            site="verify_document",
+        ).strip().upper()
         print(f"VLM Verification for {document_type}: {result}")
         return "YES" in result
     except Exception as e:
@@ -119,6 +122,22 @@ application_flows = {
     }
 }
 
+CANCEL_TEXT = "Your application process has been cancelled. Returning to the main menu."
+INVALID_DOC_TEXT = "This document does not look like a valid {expected_doc}. Please try again."
+MISSING_DOC_TEXT = "Please upload an image of the expected document: {expected_doc}."
+
+# Question texts are translated once per language and kept on disk; editing
+# application_flows (or the replies above) drops the cached translations
+catalog.register(
+    "application_flows",
+    [text for flow in application_flows.values() for text in flow_strings(flow)]
+    + [CANCEL_TEXT]
+    + [template.format(expected_doc=q["expected_doc"])
+       for flow in application_flows.values() for q in flow["questions"].values() if q.get("expected_doc")
+       for template in (INVALID_DOC_TEXT, MISSING_DOC_TEXT)],
+    data_digest([application_flows, CANCEL_TEXT, INVALID_DOC_TEXT, MISSING_DOC_TEXT]),
+)
+
 class FormRequest(BaseModel):
     scheme_target: str  # kcc, nlm, pm_kisan, pmfby
     current_state: str = "start"
@@ -140,15 +159,7 @@ def handle_form(request: FormRequest):
     if request.current_state == "start" or not request.current_state:
         next_state_key = "state"
         next_state_data = scheme_data["questions"][next_state_key]
-        question_text = next_state_data["text"]
-        
-        if request.language.lower() != "english":
-            prompt = f"Translate the following question to {request.language}:\n\n{question_text}"
-            try:
-                response = llm_call(prompt)
-                question_text = response.strip()
-            except:
-                pass
+        question_text = catalog.translate(next_state_data["text"], request.language, "application_flows")
                 
         return {"next_state": next_state_key, "question": question_text, "scheme": scheme_data["name"]}
 
@@ -157,15 +168,7 @@ def handle_form(request: FormRequest):
     user_intent = request.user_answer.lower().strip()
     
     if any(k in user_intent for k in cancel_keywords) and len(user_intent) < 30:
-        cancel_text = "Your application process has been cancelled. Returning to the main menu."
-        
-        if request.language.lower() != "english":
-            try:
-                prompt = f"Translate the following confirmation text to {request.language}:\n\n{cancel_text}"
-                response = llm_call(prompt)
-                cancel_text = response.strip()
-            except Exception:
-                pass
+        cancel_text = catalog.translate(CANCEL_TEXT, request.language, "application_flows")
                 
         return {
             "next_state": "end",
@@ -190,30 +193,16 @@ def handle_form(request: FormRequest):
                 image_url = match.group(1)
                 is_valid = verify_document_vlm(image_url, expected_doc)
                 if not is_valid:
-                    error_msg = f"This document does not look like a valid {expected_doc}. Please try again."
-                    question_text = f"{error_msg}\n\n{current_state_data['text']}"
-                    if request.language.lower() != "english":
-                        try:
-                            prompt = f"Translate the following to {request.language}:\n\n{question_text}"
-                            response = llm_call(prompt)
-                            question_text = response.strip()
-                        except:
-                            pass
+                    error_msg = catalog.translate(INVALID_DOC_TEXT.format(expected_doc=expected_doc), request.language, "application_flows")
+                    question_text = f"{error_msg}\n\n{catalog.translate(current_state_data['text'], request.language, 'application_flows')}"
                     return {
                         "next_state": request.current_state,
                         "question": question_text,
                         "collected_data": request.collected_data
                     }
         else:
-            error_msg = f"Please upload an image of the expected document: {expected_doc}."
-            question_text = f"{error_msg}\n\n{current_state_data['text']}"
-            if request.language.lower() != "english":
-                try:
-                    prompt = f"Translate the following to {request.language}:\n\n{question_text}"
-                    response = llm_call(prompt)
-                    question_text = response.strip()
-                except:
-                    pass
+            error_msg = catalog.translate(MISSING_DOC_TEXT.format(expected_doc=expected_doc), request.language, "application_flows")
+            question_text = f"{error_msg}\n\n{catalog.translate(current_state_data['text'], request.language, 'application_flows')}"
             return {
                 "next_state": request.current_state,
                 "question": question_text,
@@ -241,7 +230,7 @@ def handle_form(request: FormRequest):
         if request.language.lower() != "english":
             try:
                 prompt = f"Translate the following confirmation text to {request.language}:\n\n{final_reply}"
-                response = llm_call(prompt)
+                response = llm_call(prompt, site="translate")
                 final_reply = response.strip()
             except Exception:
                 pass
@@ -257,15 +246,7 @@ def handle_form(request: FormRequest):
     if not next_state_data:
         return {"error": "Form sequence broken."}
         
-    question_text = next_state_data["text"]
-    
-    if request.language.lower() != "english":
-        try:
-            prompt = f"Translate the following question to {request.language}:\n\n{question_text}"
-            response = llm_call(prompt)
-            question_text = response.strip()
-        except:
-            pass
+    question_text = catalog.translate(next_state_data["text"], request.language, "application_flows")
             
     return {
         "next_state": next_state_key,
@@ -2,8 +2,11 @@ import json
 import os
 from fastapi import APIRouter
 from pydantic import BaseModel
-from groq import Groq
 from dotenv import load_dotenv
+from scripts.schemes import resolve_scheme
+from scripts.scheme_summaries import summary_store, render_summary
+from scripts.llm_gateway import gateway
+from scripts.translation_catalog import catalog, flow_strings, file_digest, data_digest
 
 load_dotenv()
 router = APIRouter()
@@ -14,23 +17,23 @@ flow_path = os.path.join(current_dir, 'flow.json')
 with open(flow_path, 'r') as f:
     flow = json.load(f)
 
+END_TEXT = "Thank you! We have collected all needed information. Analyzing your profile..."
+
+# Fixed question texts are translated once per language and kept on disk;
+# editing flow.json drops its cached translations
+catalog.register("flow.json", flow_strings(flow), file_digest(flow_path))
+catalog.register("chatbot", [END_TEXT], data_digest([END_TEXT]))
+
 class ChatRequest(BaseModel):
     current_state: str = "start"
     user_answer: str = ""
     language: str = "english"
     answers: dict = {}
 
-def llm_call(prompt: str):
+def llm_call(prompt: str, site: str = "default"):
     print("llm call")
-    client = Groq(api_key=os.getenv("GROQ_API_KEY"))
-    response = client.chat.completions.create(
-        model="openai/gpt-oss-120b",
-        messages=[
-            {"role": "system", "content": "You are a helpful assistant."},
-            {"role": "user", "content": prompt}
-        ]
-    )
-    return response.choices[0].message.content
+    # Shared pooled client with timeouts, retries and a concurrency cap (scripts/llm_gateway.py)
+    return gateway.chat(prompt, site=site)
 
 @router.post("/chatbot")
 def chatbot(request: ChatRequest):
@@ -48,11 +51,8 @@ def chatbot(request: ChatRequest):
         next_state_data = flow["questions"][next_state_key]
         question_text = next_state_data["text"]
         
-        # Translate to desired language
-        if request.language.lower() != "english":
-            prompt = f"Translate the following question to {request.language}:\n\n{question_text}"
-            response = llm_call(prompt)
-            question_text = response.strip()
+        # Translate to desired language (translation catalog, no LLM call once filled)
+        question_text = catalog.translate(question_text, request.language, "flow.json")
             
         return {"next_state": next_state_key, "question": question_text}
 
@@ -84,8 +84,8 @@ def chatbot(request: ChatRequest):
         Return ONLY the exact key name from the allowed keys: {list(next_mapping.keys())}.
         """
         try:
-            response = llm_call(prompt)
-            classified_key = response.text.strip().lower()
+            response = llm_call(prompt, site="flow_branch")
+            classified_key = response.strip().lower()
             
             # Clean and map the LLM response to one of our exact dictionary keys
             matched_key = None
@@ -103,7 +103,7 @@ def chatbot(request: ChatRequest):
             next_state_key = list(next_mapping.values())[0]
             
     if next_state_key == "end":
-        end_text = "Thank you! We have collected all needed information. Analyzing your profile..."
+        end_text = END_TEXT
         
         # Fire off to the RAG system
         from scripts.rag import rag
@@ -115,13 +115,7 @@ def chatbot(request: ChatRequest):
             print("RAG query failed:", e)
             rag_json_str = "{}"
             
-        if request.language.lower() != "english":
-            try:
-                prompt = f"Translate the following completion text to {request.language}:\n\n{end_text}"
-                response = llm_call(prompt)
-                end_text = response.strip()
-            except Exception:
-                pass
+        end_text = catalog.translate(end_text, request.language, "chatbot")
                 
         return {
             "next_state": "end", 
@@ -134,25 +128,27 @@ def chatbot(request: ChatRequest):
     if request.current_state == "scheme_selection":
         # The user's answer is the scheme name they want to learn about
         request.answers["selected_scheme"] = request.user_answer
-        from scripts.rag import rag_specific_qa
-        try:
-            summary = rag_specific_qa(request.user_answer, "Provide a 2 sentence high level summary of this scheme.", request.language)
-            summary_text = summary.get("response", "")
-        except Exception as e:
-            print("Scheme summary failed:", e)
-            summary_text = ""
+        # Precomputed at ingest (scripts/scheme_summaries.py); only unknown schemes or
+        # languages without a summary fall back to a live RAG call
+        scheme_id = resolve_scheme(request.user_answer)
+        entry = summary_store.get(scheme_id, request.language) if scheme_id else None
+        if entry:
+            summary_text = render_summary(entry)
+        else:
+            from scripts.rag import rag_specific_qa
+            try:
+                summary = rag_specific_qa(request.user_answer, "Provide a 2 sentence high level summary of this scheme.", request.language)
+                summary_text = summary.get("response", "")
+            except Exception as e:
+                print("Scheme summary failed:", e)
+                summary_text = ""
             
         next_state_data = flow["questions"]["followup_qa"]
         question_text = f"{summary_text}\n\n{next_state_data['text']}"
         
-        # We manually translate below if necessary, but RAG should handle it
+        # The summary is already in the farmer's language; only the fixed prompt needs translating
         if request.language.lower() != "english":
-            try:
-                prompt = f"Translate the following question to {request.language}:\n\n{next_state_data['text']}"
-                response = llm_call(prompt)
-                question_text = f"{summary_text}\n\n{response.strip()}"
-            except Exception:
-                pass
+            question_text = f"{summary_text}\n\n{catalog.translate(next_state_data['text'], request.language, 'flow.json')}"
                 
         return {
             "next_state": "followup_qa",
@@ -174,12 +170,7 @@ def chatbot(request: ChatRequest):
         question_text = f"{qa_text}\n\n{next_state_data['text']}"
         
         if request.language.lower() != "english":
-            try:
-                prompt = f"Translate the following question to {request.language}:\n\n{next_state_data['text']}"
-                response = llm_call(prompt)
-                question_text = f"{qa_text}\n\n{response.strip()}"
-            except Exception:
-                pass
+            question_text = f"{qa_text}\n\n{catalog.translate(next_state_data['text'], request.language, 'flow.json')}"
         
         # Infinite loop hook
         return {
@@ -194,14 +185,8 @@ def chatbot(request: ChatRequest):
         
     question_text = next_state_data["text"]
     
-    # Final step: translate next question using the LLM
-    if request.language.lower() != "english":
-        try:
-            prompt = f"Translate the following question to {request.language}:\n\n{question_text}"
-            response = llm_call(prompt)
-            question_text = response.strip()
-        except Exception:
-            pass
+    # Final step: translate next question (from the catalog after its first use)
+    question_text = catalog.translate(question_text, request.language, "flow.json")
             
     return {
         "next_state": next_state_key,
@@ -7,8 +7,12 @@ from fastapi import APIRouter, Request
 from fastapi.responses import Response
 from twilio.twiml.voice_response import VoiceResponse, Gather
 from twilio.rest import Client
-from groq import Groq
 from dotenv import load_dotenv
+from scripts.schemes import SCHEMES
+from scripts.llm_gateway import gateway
+from scripts.translation_catalog import catalog, flow_strings, file_digest, data_digest
+from scripts.profile_normalizer import normalize_profile
+from scripts.rule_engine import RuleSet, split_decisions, describe_decisions, decision_stats, ELIGIBLE, UNCERTAIN
 
 load_dotenv()
 
@@ -20,8 +24,22 @@ flow_path = os.path.join(current_dir, "flow_call.json")
 with open(flow_path, "r") as f:
     flow = json.load(f)
 
-# Clients
-groq_client = Groq(api_key=os.getenv("GROQ_API_KEY"))
+# Spoken questions come from the translation catalog (no LLM wait on the
+# call once filled); editing flow_call.json drops its cached translations
+catalog.register("flow_call.json", flow_strings(flow), file_digest(flow_path))
+
+# Fixed spoken replies, served from the catalog under the "ivr" source
+IVR_REPLIES = {
+    "no_input": "No input detected. Let me repeat.",
+    "not_understood": "Sorry, I could not understand. Let me ask again.",
+    "results_sent": "We have also sent these details to your phone. Thank you for calling. Goodbye!",
+    "sms_sent": "Details have been sent to your phone via SMS. Thank you!",
+    "sms_failed": "Sorry, we could not send the SMS. Please try again later.",
+    "goodbye": "Thank you for calling. Goodbye!",
+}
+catalog.register("ivr", list(IVR_REPLIES.values()), data_digest(IVR_REPLIES))
+
+# Clients (LLM and Whisper calls go through the shared gateway, scripts/llm_gateway.py)
 twilio_client = Client(
     os.getenv("TWILIO_ACCOUNT_SID"),
     os.getenv("TWILIO_AUTH_TOKEN"),
@@ -29,6 +47,11 @@ twilio_client = Client(
 TWILIO_PHONE_NUMBER = os.getenv("TWILIO_PHONE_NUMBER")
 NGROK_URL = os.getenv("NGROK_URL", "").rstrip("/")
 LLM_MODEL = "openai/gpt-oss-120b"
+LLM_TIMEOUT = 10  # seconds per attempt; Twilio gives up on a webhook after 15
+RECOMMEND_TOP = 3
+
+# Compiled scheme rules (scripts/compile_rules.py)
+eligibility_rules = RuleSet.load()
 
 # In-memory session storage keyed by Twilio CallSid
 sessions = {}
@@ -52,25 +75,30 @@ def twiml_response(twiml: VoiceResponse) -> Response:
     return Response(content=xml, media_type="application/xml")
 
 
-def llm_call(prompt: str) -> str:
-    resp = groq_client.chat.completions.create(
+def llm_call(prompt: str, site: str = "ivr") -> str:
+    return gateway.chat(
+        prompt,
         model=LLM_MODEL,
-        messages=[
-            {"role": "system", "content": "You are a helpful assistant."},
-            {"role": "user", "content": prompt},
-        ],
+        timeout=LLM_TIMEOUT,
+        site=site,
         temperature=0.3,
         max_completion_tokens=512,
     )
-    return resp.choices[0].message.content
 
 
-def translate(text: str, language: str) -> str:
+def translate(text: str, language: str, source: str | None = "ivr") -> str:
+    """
+    Fixed text is served from the translation catalog under `source`;
+    source=None translates live (for generated text like recommendations).
+    """
     if language == "english":
         return text
+    if source:
+        return catalog.translate(text, language, source, timeout=LLM_TIMEOUT)
     try:
         return llm_call(
-            f"Translate to {language}. Return ONLY the translated text:\n\n{text}"
+            f"Translate to {language}. Return ONLY the translated text:\n\n{text}",
+            site="ivr_translate",
         )
     except Exception:
         return text
@@ -118,12 +146,6 @@ def transcribe_recording(recording_url: str, session: dict) -> str:
 
     print(f"[STT] Downloaded {len(audio_data)} bytes")
 
-    # Save to a unique temp file
-    call_sid = session.get("call_sid", "tmp")
-    temp_path = os.path.join(current_dir, f"rec_{call_sid}.wav")
-    with open(temp_path, "wb") as f:
-        f.write(audio_data)
-
     # Whisper language code
     whisper_lang = {"english": "en", "hindi": "hi", "marathi": "mr"}
     lang_code = whisper_lang.get(session.get("language", "english"), "en")
@@ -146,15 +168,16 @@ def transcribe_recording(recording_url: str, session: dict) -> str:
         whisper_prompt += f" Expected answers: {hint}"
 
     try:
-        with open(temp_path, "rb") as af:
-            result = groq_client.audio.transcriptions.create(
-                model="whisper-large-v3",
-                file=af,
-                language=lang_code,
-                prompt=whisper_prompt,
-                temperature=0.0,
-            )
-        text = result.text.strip()
+        # Sent from memory so a retry can resend the same bytes
+        text = gateway.transcribe(
+            audio_data,
+            f"rec_{session.get('call_sid', 'tmp')}.wav",
+            timeout=LLM_TIMEOUT,
+            site="ivr_stt",
+            language=lang_code,
+            prompt=whisper_prompt,
+            temperature=0.0,
+        ).strip()
         print(f"[STT] Whisper result: '{text}'")
 
         # Filter common hallucinations on silence / short audio
@@ -174,11 +197,6 @@ def transcribe_recording(recording_url: str, session: dict) -> str:
         print(f"[STT] Whisper error: {e}")
         traceback.print_exc()
         return ""
-    finally:
-        try:
-            os.remove(temp_path)
-        except OSError:
-            pass
 
 
 # ------------------------------------------------------------------ #
@@ -186,7 +204,7 @@ def transcribe_recording(recording_url: str, session: dict) -> str:
 # ------------------------------------------------------------------ #
 def build_question_twiml(session: dict, state_key: str) -> VoiceResponse:
     state_data = flow["questions"][state_key]
-    question_text = translate(state_data["text"], session["language"])
+    question_text = translate(state_data["text"], session["language"], "flow_call.json")
     twiml = VoiceResponse()
 
     if state_data.get("input_type") == "dtmf":
@@ -202,7 +220,7 @@ def build_question_twiml(session: dict, state_key: str) -> VoiceResponse:
         # No input → repeat the same question
         say_text(
             twiml,
-            translate("No input detected. Let me repeat.", session["language"]),
+            translate(IVR_REPLIES["no_input"], session["language"]),
             session,
         )
         twiml.redirect(get_url("/ivr/ask-next"))
@@ -341,10 +359,7 @@ async def handle_voice(request: Request):
             twiml = VoiceResponse()
             say_text(
                 twiml,
-                translate(
-                    "Sorry, I could not understand. Let me ask again.",
-                    session["language"],
-                ),
+                translate(IVR_REPLIES["not_understood"], session["language"]),
                 session,
             )
             twiml.redirect(get_url("/ivr/ask-next"))
@@ -387,7 +402,7 @@ def advance_to_next(session, answer, current_data, call_sid):
                 + "Return ONLY the matching category key."
             )
             try:
-                classified = llm_call(prompt).strip().lower()
+                classified = llm_call(prompt, site="ivr_branch").strip().lower()
                 print(f"[Next] LLM classified: '{classified}'")
                 matched = None
                 for k in next_map:
@@ -445,6 +460,17 @@ def ivr_recommend_sync(call_sid: str):
     profile_text = ", ".join(f"{k}: {v}" for k, v in profile.items() if v)
     print(f"[Recommend] Profile: {profile_text}")
 
+    # Settle what the compiled rules can; the LLM only sees the rest
+    decisions = eligibility_rules.evaluate(normalize_profile(profile))
+    groups = split_decisions(decisions)
+    # The rules can't rank schemes by relevance, so they answer alone only when nothing is
+    # uncertain and every eligible scheme fits; otherwise the LLM picks the top few
+    top = groups[ELIGIBLE]
+    local_only = bool(decisions) and not groups[UNCERTAIN] and len(top) <= RECOMMEND_TOP
+    decided = len(decisions) - len(groups[UNCERTAIN])
+    # Not local: one call for the spoken recommendation, one for the SMS short list
+    decision_stats.record("ivr", decided, 0 if local_only else len(SCHEMES) - decided, 0 if local_only else 2)
+
     prompt = (
         "You are an expert on Indian government schemes for farmers.\n"
         "Based on this farmer's profile, recommend the top 3 most relevant schemes.\n"
@@ -454,9 +480,24 @@ def ivr_recommend_sync(call_sid: str):
         "Schemes: PM-KISAN, PMFBY, Soil Health Card, PMKSY, "
         "Kisan Credit Card (KCC), National Livestock Mission (NLM)."
     )
+    if decisions:
+        prompt += (
+            "\n\nAlready decided from the scheme rules (FINAL; never recommend a NOT ELIGIBLE one):\n"
+            f"{describe_decisions(decisions)}"
+        )
 
     try:
-        recommendation = llm_call(prompt)
+        if local_only and top:
+            recommendation = "Based on your profile, you may be eligible for: " + " ".join(
+                f"{decisions[s]['name']}: {decisions[s]['reason']}" for s in top
+            )
+        elif local_only:
+            recommendation = (
+                "Based on your answers, none of the main central schemes clearly apply. "
+                "Please visit your nearest CSC center to check state schemes."
+            )
+        else:
+            recommendation = llm_call(prompt, site="ivr_recommend")
         if not recommendation:
             recommendation = (
                 "Based on your profile, you may be eligible for PM-KISAN, PMFBY, "
@@ -464,7 +505,7 @@ def ivr_recommend_sync(call_sid: str):
             )
             print("[Recommend] LLM returned empty, using fallback")
         print(f"[Recommend] Result: {recommendation[:200]}")
-        recommendation_translated = translate(recommendation, session["language"])
+        recommendation_translated = translate(recommendation, session["language"], source=None)
     except Exception as e:
         print(f"[Recommend] Error: {e}")
         recommendation = "We could not generate recommendations at this time."
@@ -474,15 +515,21 @@ def ivr_recommend_sync(call_sid: str):
     caller = session.get("caller", "")
     if caller:
         # Generate a short SMS-friendly version
-        try:
-            sms_prompt = (
-                "List ONLY the names of the top 3 schemes for this farmer, "
-                "separated by commas. No explanations. Max 100 characters.\n\n"
-                f"Farmer: {profile_text}"
-            )
-            short_schemes = llm_call(sms_prompt).strip()
-        except Exception:
-            short_schemes = "PM-KISAN, PMFBY, KCC"
+        if local_only:
+            # Names are already known from the rules, no need to ask
+            short_schemes = ", ".join(
+                SCHEMES[s]["short_name"] if s in SCHEMES else decisions[s]["name"] for s in top
+            ) or "Visit your nearest CSC"
+        else:
+            try:
+                sms_prompt = (
+                    "List ONLY the names of the top 3 schemes for this farmer, "
+                    "separated by commas. No explanations. Max 100 characters.\n\n"
+                    f"Farmer: {profile_text}"
+                )
+                short_schemes = llm_call(sms_prompt, site="ivr_sms").strip()
+            except Exception:
+                short_schemes = "PM-KISAN, PMFBY, KCC"
         # Build Google Maps link to nearest CSC using farmer's state
         state = profile.get("state", "").replace(" ", "+")
         csc_link = f"https://maps.google.com/maps?q=CSC+center+near+{state}" if state else "https://findmycsc.nic.in"
@@ -531,10 +578,7 @@ def ivr_recommend_sync(call_sid: str):
     say_text(twiml, recommendation_translated, session)
     say_text(
         twiml,
-        translate(
-            "We have also sent these details to your phone. Thank you for calling. Goodbye!",
-            session["language"],
-        ),
+        translate(IVR_REPLIES["results_sent"], session["language"]),
         session,
     )
     twiml.hangup()
@@ -584,20 +628,14 @@ async def ivr_followup(request: Request):
                     from_=TWILIO_PHONE_NUMBER,
                     body=sms_body,
                 )
-            goodbye = translate(
-                "Details have been sent to your phone via SMS. Thank you!",
-                session["language"],
-            )
+            goodbye = translate(IVR_REPLIES["sms_sent"], session["language"])
         except Exception:
-            goodbye = translate(
-                "Sorry, we could not send the SMS. Please try again later.",
-                session["language"],
-            )
+            goodbye = translate(IVR_REPLIES["sms_failed"], session["language"])
         say_text(twiml, goodbye, session)
     else:
         say_text(
             twiml,
-            translate("Thank you for calling. Goodbye!", session["language"]),
+            translate(IVR_REPLIES["goodbye"], session["language"]),
             session,
         )
 
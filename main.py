@@ -9,6 +9,7 @@ from ivr import router as ivr_router
 from stt import router as stt_router
 from auto_form_filling import router as auto_form_router
 from weather_schemes import router as weather_router
+from scripts.registry import registry
 
 app = FastAPI()
 
@@ -31,6 +32,13 @@ app.include_router(stt_router)
 app.include_router(auto_form_router)
 app.include_router(weather_router)
 
+@app.on_event("startup")
+def warmup():
+    # Load the embedding model and open the vector collections before the first request
+    # pays for it (set WARMUP=0 to skip, e.g. for quick local restarts)
+    if os.getenv("WARMUP", "1") == "1":
+        print(f"Warmup: {registry.warmup()}")
+
 @app.get("/")
 def read_root():
     return {"message": "Welcome to the M-Indicator Hackathon API"}
\ No newline at end of file
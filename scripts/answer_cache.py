@@ -0,0 +1,169 @@
+import os
+import json
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+import numpy as np
+
+try:
+    from schemes import scheme_id_for_file
+except ImportError:  # imported as scripts.answer_cache by the app
+    from scripts.schemes import scheme_id_for_file
+
+# ---------- CONFIG ----------
+ANSWER_CACHE_THRESHOLD = float(os.getenv("ANSWER_CACHE_THRESHOLD", "0.92"))  # cosine similarity
+ANSWER_CACHE_TTL = int(os.getenv("ANSWER_CACHE_TTL", str(24 * 3600)))  # seconds
+ANSWER_CACHE_MAX_ENTRIES = int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", "2000"))
+MANIFEST_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "ingest_manifest.json")
+
+
+def corpus_versions(manifest_path: str = MANIFEST_PATH) -> dict:
+    """
+    Content version of every ingested scheme, from the ingest manifest:
+    a hash of the (file, sha256) pairs ingested under that scheme ID. The
+    None key versions the whole corpus, for answers not tied to one scheme.
+    """
+    if not os.path.exists(manifest_path):
+        return {}
+    with open(manifest_path, "r", encoding="utf-8") as f:
+        files = json.load(f).get("files", {})
+    per_scheme = {}
+    for filename, entry in sorted(files.items()):
+        scheme_id = scheme_id_for_file(os.path.splitext(filename)[0])
+        per_scheme.setdefault(scheme_id, []).append(f"{filename}:{entry.get('sha256')}")
+    versions = {
+        scheme_id: hashlib.sha1("\n".join(parts).encode("utf-8")).hexdigest()[:16]
+        for scheme_id, parts in per_scheme.items()
+    }
+    versions[None] = hashlib.sha1("\n".join(sorted(versions.values())).encode("utf-8")).hexdigest()[:16]
+    return versions
+
+
+def _unit(vector) -> np.ndarray:
+    vector = np.asarray(vector, dtype=np.float32)
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+class SemanticAnswerCache:
+    """
+    Answers to scheme follow-up questions, looked up by meaning rather than
+    exact text: an entry is reused when a new question for the same
+    (scheme, language) embeds within `threshold` cosine similarity of a
+    cached one. Entries expire after `ttl` seconds, the least recently used
+    are evicted past `max_entries`, and a scheme's entries are dropped as
+    soon as the ingest manifest shows its PDFs were re-ingested.
+
+    In-process only; a restart starts cold.
+    """
+
+    def __init__(
+        self,
+        threshold: float = ANSWER_CACHE_THRESHOLD,
+        ttl: int = ANSWER_CACHE_TTL,
+        max_entries: int = ANSWER_CACHE_MAX_ENTRIES,
+        manifest_path: str = MANIFEST_PATH,
+    ):
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.manifest_path = manifest_path
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()  # entry id -> {"key", "vector", "answer", "created", "seconds", "version"}
+        self.by_key = {}  # (scope, language) -> set of entry ids
+        self.next_id = 0
+        self.manifest_mtime = None
+        self.versions = {}
+        self.counters = {"hits": 0, "misses": 0, "expired": 0, "evicted": 0, "invalidated": 0}
+        self.saved_seconds = 0.0
+
+    # ---------- corpus version ----------
+    def _refresh_versions(self):
+        """Re-read the manifest only when it changed, and drop stale schemes."""
+        mtime = os.path.getmtime(self.manifest_path) if os.path.exists(self.manifest_path) else None
+        if mtime == self.manifest_mtime:
+            return
+        self.manifest_mtime = mtime
+        self.versions = corpus_versions(self.manifest_path)
+        stale = [eid for eid, e in self.entries.items() if e["version"] != self._version(e["key"][0])]
+        for eid in stale:
+            self._remove(eid)
+        self.counters["invalidated"] += len(stale)
+        if stale:
+            print(f"Answer cache: dropped {len(stale)} answers after re-ingest")
+
+    def _version(self, scope: str | None) -> str | None:
+        # Schemes with no PDF of their own (or unresolved names) answer from the whole corpus
+        return self.versions.get(scope, self.versions.get(None))
+
+    def _remove(self, eid: int):
+        entry = self.entries.pop(eid)
+        ids = self.by_key.get(entry["key"])
+        if ids is not None:
+            ids.discard(eid)
+            if not ids:
+                del self.by_key[entry["key"]]
+
+    # ---------- lookup / store ----------
+    def get(self, scope: str | None, language: str, vector) -> str | None:
+        """
+        Cached answer for a question embedding, or None. `scope` is the
+        scheme ID, or any stable key for a scheme name that didn't resolve.
+        """
+        key = (scope, language.lower())
+        vector = _unit(vector)
+        with self.lock:
+            self._refresh_versions()
+            now = time.time()
+            best_id, best_score = None, self.threshold
+            for eid in list(self.by_key.get(key, ())):
+                entry = self.entries[eid]
+                if now - entry["created"] > self.ttl:
+                    self._remove(eid)
+                    self.counters["expired"] += 1
+                    continue
+                score = float(vector @ entry["vector"])
+                if score >= best_score:
+                    best_id, best_score = eid, score
+            if best_id is None:
+                self.counters["misses"] += 1
+                return None
+            self.entries.move_to_end(best_id)
+            entry = self.entries[best_id]
+            self.counters["hits"] += 1
+            self.saved_seconds += entry["seconds"]
+            return entry["answer"]
+
+    def put(self, scope: str | None, language: str, vector, answer: str, seconds: float = 0.0):
+        """Cache an answer; `seconds` is what producing it cost, for the stats."""
+        key = (scope, language.lower())
+        with self.lock:
+            self._refresh_versions()
+            eid = self.next_id
+            self.next_id += 1
+            self.entries[eid] = {
+                "key": key,
+                "vector": _unit(vector),
+                "answer": answer,
+                "created": time.time(),
+                "seconds": seconds,
+                "version": self._version(scope),
+            }
+            self.by_key.setdefault(key, set()).add(eid)
+            while len(self.entries) > self.max_entries:
+                self._remove(next(iter(self.entries)))
+                self.counters["evicted"] += 1
+
+    def stats(self) -> dict:
+        with self.lock:
+            lookups = self.counters["hits"] + self.counters["misses"]
+            return {
+                "entries": len(self.entries),
+                "max_entries": self.max_entries,
+                "threshold": self.threshold,
+                "ttl_s": self.ttl,
+                **self.counters,
+                "hit_ratio": round(self.counters["hits"] / lookups, 4) if lookups else 0.0,
+                "saved_s": round(self.saved_seconds, 2),
+            }
@@ -0,0 +1,174 @@
+"""
+Parity and speed of the embedding backends (onnx_embedder.py): the torch
+SentenceTransformer against the exported ONNX model in float32 and int8.
+Parity is the cosine between each backend's vector and torch's for the
+same text; the script exits non-zero if any falls below --min-cosine.
+A passing ONNX variant is recorded in the export's parity.json, and the
+app only switches to EMBEDDING_BACKEND=onnx once that record exists for
+the exact exported file. Each backend runs in a fresh process so its
+worker RSS (imports + model) is measured on its own.
+
+    python scripts/export_onnx.py         # once
+    python scripts/bench_embedder.py
+    python scripts/bench_embedder.py --backends onnx-int8 --min-cosine 0.99
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import subprocess
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from registry import rss_mb
+from schemes import SCHEMES
+from onnx_embedder import record_parity
+
+# ---------- CONFIG ----------
+EMBEDDING_MODEL_NAME = "all-MiniLM-L6-v2"
+BACKENDS = {"torch": ("torch", False), "onnx-fp32": ("onnx", False), "onnx-int8": ("onnx", True)}
+MIN_COSINE = 0.98
+BATCH = 32
+THROUGHPUT_TEXTS = 512
+
+# What the app actually embeds: follow-up questions, eligibility queries and profile texts
+QUESTIONS = [
+    "What documents do I need to apply?",
+    "How much money will I get and when?",
+    "Can tenant farmers claim crop insurance for hailstorm damage?",
+    "Is drip irrigation subsidy available for 2 acres of sugarcane?",
+    "What is the interest rate on a Kisan Credit Card loan?",
+    "My goats need insurance, which scheme covers them?",
+    "मुझे फसल बीमा के लिए क्या करना होगा?",
+    "माझ्या शेतासाठी ठिबक सिंचन अनुदान मिळेल का?",
+    "soil testing lab near Nashik",
+    "premium rate kharif rabi commercial horticultural crops",
+]
+PROFILES = [
+    "State: Maharashtra\nDistrict: Nashik\nFarm Size: 3 Acres\nCrops: grapes, onion\nIrrigation: drip\n",
+    "State: Bihar\nLand: 0.5 acre leased\nActivities: paddy, 4 cows\nAnnual income: 80,000\n",
+    "State: Rajasthan\nLand: none\nActivities: goats and sheep\nCategory: SC\n",
+    "State: Punjab\nLand: 12 acres\nCrops: wheat, rice\nIrrigation: tubewell\nIncome: 9 lakh\n",
+]
+
+
+def parity_texts() -> list[str]:
+    texts = QUESTIONS + PROFILES
+    texts += [f"{scheme['name']} eligibility benefits documents" for scheme in SCHEMES.values()]
+    return texts
+
+
+# ---------- WORKER (runs in a subprocess per backend) ----------
+def worker(backend: str, texts_path: str, vectors_path: str) -> dict:
+    with open(texts_path, "r", encoding="utf-8") as f:
+        texts = json.load(f)
+    kind, quantized = BACKENDS[backend]
+    before, started = rss_mb(), time.perf_counter()
+    if kind == "onnx":
+        from onnx_embedder import OnnxEmbedder
+        model = OnnxEmbedder.load(EMBEDDING_MODEL_NAME, quantized=quantized)
+    else:
+        from sentence_transformers import SentenceTransformer
+        model = SentenceTransformer(EMBEDDING_MODEL_NAME, device="cpu")
+    model.encode(texts[:1])
+    load_s = time.perf_counter() - started
+
+    latencies = []
+    for text in texts:
+        started = time.perf_counter()
+        model.encode(text)
+        latencies.append((time.perf_counter() - started) * 1000)
+    np.save(vectors_path, np.asarray(model.encode(texts, batch_size=BATCH), dtype=np.float32))
+
+    bulk = (texts * (THROUGHPUT_TEXTS // len(texts) + 1))[:THROUGHPUT_TEXTS]
+    started = time.perf_counter()
+    model.encode(bulk, batch_size=BATCH)
+    throughput = len(bulk) / (time.perf_counter() - started)
+    return {
+        "load_s": round(load_s, 2),
+        "p50_ms": round(float(np.percentile(latencies, 50)), 2),
+        "p95_ms": round(float(np.percentile(latencies, 95)), 2),
+        "texts_per_s": round(throughput, 1),
+        "rss_mb": round(rss_mb() - before, 1),
+        "torch_imported": "torch" in sys.modules,
+    }
+
+
+# ---------- BENCH ----------
+def bench(backends: list[str], min_cosine: float) -> tuple[list[dict], bool]:
+    texts = parity_texts()
+    workdir = tempfile.mkdtemp(prefix="bench_embedder_")
+    rows, vectors = [], {}
+    try:
+        texts_path = os.path.join(workdir, "texts.json")
+        with open(texts_path, "w", encoding="utf-8") as f:
+            json.dump(texts, f, ensure_ascii=False)
+        for backend in backends:
+            vectors_path = os.path.join(workdir, f"{backend}.npy")
+            try:
+                output = subprocess.run(
+                    [sys.executable, os.path.abspath(__file__), "--worker", backend, texts_path, vectors_path],
+                    check=True, capture_output=True, text=True,
+                ).stdout
+            except subprocess.CalledProcessError as e:
+                print(f"{backend}: failed: {(e.stderr or '').strip().splitlines()[-1:]}")
+                continue
+            rows.append({"backend": backend, **json.loads(output.strip().splitlines()[-1])})
+            vectors[backend] = np.load(vectors_path)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    passed = True
+    for row in rows:
+        if "torch" not in vectors:
+            row["cos_mean"] = row["cos_min"] = None
+            continue
+        a, b = vectors["torch"], vectors[row["backend"]]
+        cosines = (a * b).sum(axis=1) / (np.linalg.norm(a, axis=1) * np.linalg.norm(b, axis=1))
+        row["cos_mean"], row["cos_min"] = round(float(cosines.mean()), 5), round(float(cosines.min()), 5)
+        if row["cos_min"] < min_cosine:
+            passed = False
+            worst = int(np.argmin(cosines))
+            print(f"{row['backend']}: cosine {row['cos_min']} < {min_cosine} for {texts[worst]!r}")
+        elif BACKENDS[row["backend"]][0] == "onnx":
+            record_parity(EMBEDDING_MODEL_NAME, BACKENDS[row["backend"]][1], row["cos_min"], row["cos_mean"], min_cosine)
+            print(f"{row['backend']}: parity passed, max cosine deviation {1 - row['cos_min']:.6f} (recorded)")
+    if "torch" not in vectors:
+        print("torch backend unavailable, parity not checked")
+    return rows, passed
+
+
+def print_table(rows: list[dict]):
+    print(f"\n{'backend':<10} {'load s':>7} {'p50 ms':>8} {'p95 ms':>8} {'texts/s':>8} {'RSS MB':>7} {'torch':>6} "
+          f"{'cos mean':>9} {'cos min':>8}")
+    for row in rows:
+        cos_mean = f"{row['cos_mean']:>9.5f}" if row["cos_mean"] is not None else f"{'-':>9}"
+        cos_min = f"{row['cos_min']:>8.5f}" if row["cos_min"] is not None else f"{'-':>8}"
+        print(f"{row['backend']:<10} {row['load_s']:>7.2f} {row['p50_ms']:>8.2f} {row['p95_ms']:>8.2f} "
+              f"{row['texts_per_s']:>8.1f} {row['rss_mb']:>7.1f} {str(row['torch_imported']):>6} {cos_mean} {cos_min}")
+
+
+# ---------- MAIN ----------
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "--worker":
+        print(json.dumps(worker(*sys.argv[2:5])))
+        sys.exit(0)
+
+    parser = argparse.ArgumentParser(description="Parity and latency of the embedding backends.")
+    parser.add_argument("--backends", default=",".join(BACKENDS), help="Comma-separated subset of: " + ", ".join(BACKENDS))
+    parser.add_argument("--min-cosine", type=float, default=MIN_COSINE, help="Fail if any text's cosine to torch is lower.")
+    parser.add_argument("--output", help="Also write the results as JSON here.")
+    args = parser.parse_args()
+
+    backends = [b for b in args.backends.split(",") if b in BACKENDS]
+    if "torch" not in backends:
+        backends.insert(0, "torch")  # the parity reference
+    rows, passed = bench(backends, args.min_cosine)
+    print_table(rows)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(rows, f, indent=2)
+    sys.exit(0 if passed else 1)
@@ -0,0 +1,186 @@
+"""
+Retrieval quality and latency on the golden set (scripts/golden/), offline:
+no Groq call is made, only the retrieval step of rag() / rag_specific_qa()
+and the context packing after it. Each golden entry maps a scheme question
+or a farmer profile to the guideline pages that answer it; a retrieved
+chunk is a hit when it came from one of those pages (or is a folded
+near-duplicate of one).
+
+  - questions go through the rag_specific_qa path: the scheme's own chunks
+    (scheme_filter), SCHEME_QA_RESULTS of them.
+  - profiles go through the rag path: normalized profile text, RAG_RESULTS.
+
+Reports recall@k, MRR, packed context tokens per query and p50/p95
+retrieval latency (query encoding included, no embedding cache) for every
+combination of retriever, vector storage, embedding backend and n_results.
+Run it before and after a chunking, embedding or n_results change.
+
+    python scripts/bench_golden.py
+    python scripts/bench_golden.py --storages chroma,float16 --embedders torch,onnx --n-results 3,6,12
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import itertools
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from vector_backend import open_collection
+from compact_index import COMPACT_DIR
+from hybrid_search import BM25Index, hybrid_search
+from context_packer import pack_context
+from profile_normalizer import normalize_profile, profile_text
+from onnx_embedder import load_embedding_model
+from schemes import scheme_filter
+
+# ---------- CONFIG ----------
+CHROMA_DB_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "chroma_db")
+BM25_INDEX_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "bm25_index.json")
+GOLDEN_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "golden", "retrieval_v1.json")
+COLLECTION_NAME = "farmer_schemes"
+EMBEDDING_MODEL_NAME = "all-MiniLM-L6-v2"
+RAG_RESULTS = 6  # rag.RAG_RESULTS
+SCHEME_QA_RESULTS = 5  # rag.SCHEME_QA_RESULTS
+K_VALUES = (1, 3, 5)
+RETRIEVERS = ("dense", "hybrid")
+
+
+# ---------- GOLDEN SET ----------
+def load_golden(path: str = GOLDEN_PATH) -> tuple[int, list[dict]]:
+    """(version, cases); a case has id, kind, query, where, n_results (app default) and expected pages."""
+    with open(path, "r", encoding="utf-8") as f:
+        golden = json.load(f)
+    cases = []
+    for entry in golden["questions"]:
+        cases.append({
+            "id": entry["id"], "kind": "question", "query": entry["question"],
+            "where": scheme_filter(entry["scheme_id"]), "n_results": SCHEME_QA_RESULTS,
+            "expected": expected_pages(entry),
+        })
+    for entry in golden["profiles"]:
+        cases.append({
+            "id": entry["id"], "kind": "profile", "query": profile_text(normalize_profile(entry["answers"])),
+            "where": None, "n_results": RAG_RESULTS,
+            "expected": expected_pages(entry),
+        })
+    return golden["version"], cases
+
+
+def expected_pages(entry: dict) -> set[tuple[str, int]]:
+    return {(item["file"], page) for item in entry["expected"] for page in item["pages"]}
+
+
+def chunk_pages(metadata: dict) -> set[tuple[str, int]]:
+    """Every (file stem, page) a stored chunk stands for, including folded duplicates."""
+    metadata = metadata or {}
+    pages = {(metadata.get("scheme_name"), metadata.get("page"))}
+    if metadata.get("sources"):
+        pages |= {(s["scheme_name"], s["page"]) for s in json.loads(metadata["sources"])}
+    return pages
+
+
+# ---------- CORPUS ----------
+def load_corpus(storages: list[str]) -> tuple[dict, BM25Index]:
+    bm25 = BM25Index.load(BM25_INDEX_PATH)
+    if bm25 is None:
+        sys.exit(f"No BM25 index at {BM25_INDEX_PATH} (run ingest first)")
+    client = None
+    if "chroma" in storages:
+        try:
+            import chromadb
+        except ImportError:
+            sys.exit("chromadb not installed; pick --storages from the compact copies")
+        client = chromadb.PersistentClient(path=CHROMA_DB_PATH)
+    return {storage: open_collection(COLLECTION_NAME, client, storage) for storage in storages}, bm25
+
+
+def exported_storage() -> str | None:
+    """The mode of the compact copy ingest exported, if any."""
+    meta_path = os.path.join(COMPACT_DIR, COLLECTION_NAME, "meta.json")
+    if not os.path.exists(meta_path):
+        return None
+    with open(meta_path, "r", encoding="utf-8") as f:
+        return json.load(f)["mode"]
+
+
+# ---------- BENCH ----------
+def bench(cases: list[dict], collection, bm25, embedding_model, retriever: str, n_results: int | None) -> tuple[dict, list]:
+    """One configuration over every case; returns (metrics row, missed case ids)."""
+    hits = {k: 0 for k in K_VALUES}
+    reciprocal_ranks, latencies, tokens, misses = [], [], [], []
+    for case in cases:
+        n = n_results or case["n_results"]
+        started = time.perf_counter()
+        result = hybrid_search(collection, bm25 if retriever == "hybrid" else None, embedding_model,
+                               case["query"], n, where=case["where"])
+        if case["where"] and not result["ids"][0]:
+            # rag_specific_qa's fallback for a scheme with nothing ingested
+            result = hybrid_search(collection, bm25 if retriever == "hybrid" else None, embedding_model, case["query"], n)
+        latencies.append(time.perf_counter() - started)
+        tokens.append(pack_context(result)[1]["packed_tokens"])
+
+        ranks = [i for i, metadata in enumerate(result["metadatas"][0]) if chunk_pages(metadata) & case["expected"]]
+        first = ranks[0] + 1 if ranks else None
+        reciprocal_ranks.append(1 / first if first else 0.0)
+        for k in K_VALUES:
+            hits[k] += bool(first and first <= k)
+        if not first:
+            misses.append(case["id"])
+    row = {
+        **{f"recall@{k}": round(hits[k] / len(cases), 4) for k in K_VALUES},
+        "recall@n": round(sum(1 for rr in reciprocal_ranks if rr) / len(cases), 4),
+        "mrr": round(float(np.mean(reciprocal_ranks)), 4),
+        "ctx_tokens": round(float(np.mean(tokens)), 1),
+        "p50_ms": round(float(np.percentile(latencies, 50)) * 1000, 2),
+        "p95_ms": round(float(np.percentile(latencies, 95)) * 1000, 2),
+    }
+    return row, misses
+
+
+def print_table(rows: list[dict]):
+    recall_cols = [f"recall@{k}" for k in K_VALUES] + ["recall@n"]
+    print(f"\n{'set':<9} {'retriever':<9} {'storage':<8} {'embedder':<9} {'n':>4} "
+          + " ".join(f"{c:>9}" for c in recall_cols) + f" {'MRR':>7} {'tokens':>7} {'p50 ms':>8} {'p95 ms':>8}")
+    for row in rows:
+        print(f"{row['set']:<9} {row['retriever']:<9} {row['storage']:<8} {row['embedder']:<9} {row['n']:>4} "
+              + " ".join(f"{row[c]:>9.4f}" for c in recall_cols)
+              + f" {row['mrr']:>7.4f} {row['ctx_tokens']:>7.1f} {row['p50_ms']:>8.2f} {row['p95_ms']:>8.2f}")
+
+
+# ---------- MAIN ----------
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Golden-set retrieval benchmark (offline).")
+    parser.add_argument("--golden", default=GOLDEN_PATH, help="Golden set JSON.")
+    parser.add_argument("--retrievers", default=",".join(RETRIEVERS), help="Comma-separated: dense, hybrid.")
+    parser.add_argument("--storages", help="Comma-separated VECTOR_STORAGE values (default: chroma plus the exported copy).")
+    parser.add_argument("--embedders", default="torch", help="Comma-separated EMBEDDING_BACKEND values: torch, onnx.")
+    parser.add_argument("--n-results", default="", help="Comma-separated n_results overrides (default: the app's).")
+    parser.add_argument("--output", help="Also write the results (with missed case ids) as JSON here.")
+    args = parser.parse_args()
+
+    version, cases = load_golden(args.golden)
+    storages = args.storages.split(",") if args.storages else ["chroma"] + [m for m in [exported_storage()] if m]
+    collections, bm25 = load_corpus(storages)
+    embedders = {backend: load_embedding_model(EMBEDDING_MODEL_NAME, backend) for backend in args.embedders.split(",")}
+    n_values = [int(n) for n in args.n_results.split(",") if n] or [None]
+    print(f"Golden set v{version}: {sum(c['kind'] == 'question' for c in cases)} questions, "
+          f"{sum(c['kind'] == 'profile' for c in cases)} profiles; {len(bm25.ids)} chunks")
+
+    results = []
+    for storage, backend, retriever, n_results in itertools.product(storages, embedders, args.retrievers.split(","), n_values):
+        collection, embedding_model = collections[storage], embedders[backend]
+        hybrid_search(collection, bm25, embedding_model, cases[0]["query"], 1)  # warm up outside the timings
+        for kind in ("question", "profile", "all"):
+            subset = [c for c in cases if kind == "all" or c["kind"] == kind]
+            row, misses = bench(subset, collection, bm25, embedding_model, retriever, n_results)
+            results.append({
+                "set": kind, "retriever": retriever, "storage": storage, "embedder": backend,
+                "n": n_results or "app", **row, "golden_version": version, "misses": misses,
+            })
+
+    print_table(results)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
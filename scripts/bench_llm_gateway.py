@@ -0,0 +1,166 @@
+"""
+Load test for the LLM gateway (llm_gateway.py) against a local fake
+OpenAI-compatible server, so no Groq quota is spent. A burst of farmers
+hits the same few prompts at once (the same question translated into the
+same language, the same weather recommendation) through the sync and the
+async entry points, with single-flight coalescing off and on.
+
+Reports upstream calls per request, how many requests were coalesced onto
+another caller's in-flight call, wall time and p50/p95 latency. The fake
+server answers after --latency seconds; pass --base-url to aim at a real
+OpenAI-compatible endpoint instead (GROQ_API_KEY must be set then).
+
+    python scripts/bench_llm_gateway.py
+    python scripts/bench_llm_gateway.py --farmers 200 --distinct 5 --latency 0.8
+"""
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+import threading
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+os.environ.setdefault("GROQ_API_KEY", "bench")
+from llm_gateway import LlmGateway, LLM_CONCURRENCY
+
+# ---------- CONFIG ----------
+FARMERS = 64
+DISTINCT_PROMPTS = 4
+LATENCY = 0.4
+QUESTIONS = [
+    "Which state do you farm in?",
+    "Do you own the land you farm on?",
+    "How much land do you farm (in acres)?",
+    "What do you grow?",
+    "How do you irrigate your crops?",
+    "Which district?",
+    "What crop are you insuring?",
+    "Please upload a photo of your Bank Passbook.",
+]
+
+
+# ---------- FAKE SERVER ----------
+class FakeChatHandler(BaseHTTPRequestHandler):
+    """Minimal /chat/completions: echoes the prompt back after `latency` seconds."""
+    protocol_version = "HTTP/1.1"
+    latency = LATENCY
+    calls = 0
+    lock = threading.Lock()
+
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers.get("content-length", 0))) or b"{}")
+        with FakeChatHandler.lock:
+            FakeChatHandler.calls += 1
+        time.sleep(self.latency)
+        content = body["messages"][-1]["content"]
+        payload = json.dumps({
+            "id": "fake", "object": "chat.completion", "created": 0, "model": body.get("model"),
+            "choices": [{"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": f"[translated] {content[-80:]}"}}],
+            "usage": {"prompt_tokens": 1, "completion_tokens": 1, "total_tokens": 2},
+        }).encode()
+        self.send_response(200)
+        self.send_header("content-type", "application/json")
+        self.send_header("content-length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+
+def start_fake_server(latency: float) -> tuple[ThreadingHTTPServer, str]:
+    FakeChatHandler.latency = latency
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeChatHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/openai/v1"
+
+
+# ---------- BENCH ----------
+def burst_prompts(farmers: int, distinct: int, seed: int = 0) -> list[str]:
+    """One translation prompt per farmer, drawn from `distinct` (question, language) pairs."""
+    rng = random.Random(seed)
+    pool = [(q, lang) for lang in ("hindi", "marathi") for q in QUESTIONS][:distinct]
+    return [f"Translate the following question to {lang}:\n\n{q}" for q, lang in (rng.choice(pool) for _ in range(farmers))]
+
+
+def run_sync(gateway: LlmGateway, prompts: list[str]) -> list[float]:
+    def one(prompt):
+        started = time.perf_counter()
+        gateway.chat(prompt, site="bench")
+        return time.perf_counter() - started
+
+    with ThreadPoolExecutor(max_workers=len(prompts)) as pool:
+        return list(pool.map(one, prompts))
+
+
+def run_async(gateway: LlmGateway, prompts: list[str]) -> list[float]:
+    async def one(prompt):
+        started = time.perf_counter()
+        await gateway.achat(prompt, site="bench")
+        return time.perf_counter() - started
+
+    async def burst():
+        return await asyncio.gather(*[one(prompt) for prompt in prompts])
+
+    return asyncio.run(burst())
+
+
+def bench(base_url: str, prompts: list[str], mode: str, coalesce: bool) -> dict:
+    gateway = LlmGateway(base_url=base_url, coalesce=coalesce)
+    calls_before = FakeChatHandler.calls
+    started = time.perf_counter()
+    latencies = run_async(gateway, prompts) if mode == "async" else run_sync(gateway, prompts)
+    wall = time.perf_counter() - started
+    stats = gateway.stats()
+    site = stats["sites"]["bench"]
+    return {
+        "mode": mode,
+        "coalesce": coalesce,
+        "requests": site["requests"],
+        "upstream": site["calls"],
+        "coalesced": site["coalesced"],
+        "coalesced_fraction": site["coalesced_fraction"],
+        "peak_waiters": stats["peak_waiters"],
+        "server_calls": FakeChatHandler.calls - calls_before,
+        "wall_s": round(wall, 2),
+        "p50_ms": round(float(np.percentile(latencies, 50)) * 1000, 1),
+        "p95_ms": round(float(np.percentile(latencies, 95)) * 1000, 1),
+    }
+
+
+def print_table(rows: list[dict]):
+    print(f"\n{'mode':<6} {'coalesce':>8} {'requests':>9} {'upstream':>9} {'coalesced':>10} {'frac':>6} "
+          f"{'peak':>5} {'wall s':>7} {'p50 ms':>8} {'p95 ms':>8}")
+    for row in rows:
+        print(f"{row['mode']:<6} {str(row['coalesce']):>8} {row['requests']:>9} {row['upstream']:>9} {row['coalesced']:>10} "
+              f"{row['coalesced_fraction']:>6.2f} {row['peak_waiters']:>5} {row['wall_s']:>7.2f} {row['p50_ms']:>8.1f} {row['p95_ms']:>8.1f}")
+
+
+# ---------- MAIN ----------
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="LLM gateway burst benchmark (single-flight off vs on).")
+    parser.add_argument("--farmers", type=int, default=FARMERS, help="Concurrent requests in the burst.")
+    parser.add_argument("--distinct", type=int, default=DISTINCT_PROMPTS, help="Distinct prompts among them.")
+    parser.add_argument("--latency", type=float, default=LATENCY, help="Fake server response time (s).")
+    parser.add_argument("--base-url", help="OpenAI-compatible endpoint to use instead of the fake server.")
+    parser.add_argument("--modes", default="sync,async", help="Comma-separated: sync, async.")
+    parser.add_argument("--output", help="Also write the results as JSON here.")
+    args = parser.parse_args()
+
+    base_url = args.base_url
+    if not base_url:
+        _, base_url = start_fake_server(args.latency)
+    prompts = burst_prompts(args.farmers, args.distinct)
+    print(f"{args.farmers} requests, {len(set(prompts))} distinct prompts, concurrency limit {LLM_CONCURRENCY}")
+
+    rows = [bench(base_url, prompts, mode, coalesce) for mode in args.modes.split(",") for coalesce in (False, True)]
+    print_table(rows)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(rows, f, indent=2)
@@ -0,0 +1,153 @@
+"""
+Recall@k, memory and latency of the compact (float16 / int8) vector storage
+modes against exact float32 search, on the scheme corpus and on a synthetic
+farmer-profile set.
+
+    python scripts/bench_quantization.py                  # corpus + 1M profiles
+    python scripts/bench_quantization.py --profiles 200000 --skip-corpus
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from compact_index import CompactIndex
+
+# ---------- CONFIG ----------
+CHROMA_DB_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "chroma_db")
+COLLECTION_NAME = "farmer_schemes"
+DIM = 384  # all-MiniLM-L6-v2
+K_VALUES = (1, 5, 12)
+QUERIES = 200
+CLUSTERS = 2000
+BUILD_BATCH = 50000
+SEED = 7
+
+
+# ---------- DATA ----------
+def corpus_vectors() -> np.ndarray | None:
+    try:
+        import chromadb
+    except ImportError:
+        print("chromadb not installed, skipping corpus")
+        return None
+    if not os.path.isdir(CHROMA_DB_PATH):
+        print(f"No Chroma DB at {CHROMA_DB_PATH}, skipping corpus (run ingest first)")
+        return None
+    collection = chromadb.PersistentClient(path=CHROMA_DB_PATH).get_collection(COLLECTION_NAME)
+    return np.asarray(collection.get(include=["embeddings"])["embeddings"], dtype=np.float32)
+
+
+def synthetic_profiles(n: int, rng: np.random.RandomState):
+    """
+    Unit vectors scattered around CLUSTERS centres, standing in for profile
+    embeddings (farmers with similar answers embed close together).
+    Yielded in batches so the generator itself stays small.
+    """
+    centres = rng.standard_normal((CLUSTERS, DIM)).astype(np.float32)
+    for start in range(0, n, BUILD_BATCH):
+        size = min(BUILD_BATCH, n - start)
+        batch = centres[rng.randint(0, CLUSTERS, size)] + 0.6 * rng.standard_normal((size, DIM)).astype(np.float32)
+        yield batch / np.linalg.norm(batch, axis=1, keepdims=True)
+
+
+def make_queries(vectors: np.ndarray, rng: np.random.RandomState) -> np.ndarray:
+    """Perturbed copies of stored vectors: near, but never exactly on, a target."""
+    picks = vectors[rng.randint(0, len(vectors), QUERIES)]
+    queries = picks + 0.3 * rng.standard_normal(picks.shape).astype(np.float32) / np.sqrt(DIM)
+    return queries / np.linalg.norm(queries, axis=1, keepdims=True)
+
+
+def exact_top_k(vectors: np.ndarray, queries: np.ndarray, k: int) -> np.ndarray:
+    top = np.empty((len(queries), k), dtype=np.int64)
+    norms = np.einsum("ij,ij->i", vectors, vectors)
+    for i, query in enumerate(queries):
+        distances = norms - 2 * (vectors @ query)
+        best = np.argpartition(distances, k - 1)[:k]
+        top[i] = best[np.argsort(distances[best])]
+    return top
+
+
+# ---------- BENCH ----------
+def bench(name: str, vectors: np.ndarray, rng: np.random.RandomState) -> list[dict]:
+    k_max = max(K_VALUES)
+    queries = make_queries(vectors, rng)
+    started = time.perf_counter()
+    truth = exact_top_k(vectors, queries, k_max)
+    exact_ms = (time.perf_counter() - started) / len(queries) * 1000
+    print(f"\n{name}: {len(vectors)} vectors, exact float32 search {exact_ms:.1f} ms/query")
+
+    rows = [{
+        "set": name, "mode": "float32 (exact)", "rescore": False,
+        **{f"recall@{k}": 1.0 for k in K_VALUES},
+        "scan_mb": round(vectors.nbytes / 1e6, 1), "saved_pct": 0.0, "p50_ms": round(exact_ms, 2),
+    }]
+    ids = [str(i) for i in range(len(vectors))]
+
+    for mode in ("float16", "int8"):
+        for rescore in (False, True):
+            workdir = tempfile.mkdtemp(prefix=f"bench_{mode}_")
+            try:
+                index = CompactIndex(workdir, mode=mode, rescore=rescore)
+                for start in range(0, len(vectors), BUILD_BATCH):
+                    index.upsert(ids[start:start + BUILD_BATCH], vectors[start:start + BUILD_BATCH])
+
+                latencies, hits = [], {k: 0 for k in K_VALUES}
+                for query, expected in zip(queries, truth):
+                    started = time.perf_counter()
+                    got = [int(i) for i in index.query([query], n_results=k_max)["ids"][0]]
+                    latencies.append(time.perf_counter() - started)
+                    for k in K_VALUES:
+                        hits[k] += len(set(got[:k]) & set(expected[:k].tolist()))
+
+                memory = index.memory()
+                rows.append({
+                    "set": name, "mode": mode, "rescore": rescore,
+                    **{f"recall@{k}": round(hits[k] / (k * len(queries)), 4) for k in K_VALUES},
+                    "scan_mb": round(memory["scan_bytes"] / 1e6, 1),
+                    "saved_pct": round(100 * (1 - memory["scan_bytes"] / memory["float32_bytes"]), 1),
+                    "p50_ms": round(float(np.median(latencies)) * 1000, 2),
+                })
+                del index
+            finally:
+                shutil.rmtree(workdir, ignore_errors=True)
+    return rows
+
+
+def print_table(rows: list[dict]):
+    recall_cols = [f"recall@{k}" for k in K_VALUES]
+    print(f"\n{'set':<10} {'mode':<16} {'rescore':<8} " + " ".join(f"{c:>10}" for c in recall_cols)
+          + f" {'scan MB':>9} {'saved':>7} {'p50 ms':>8}")
+    for row in rows:
+        print(f"{row['set']:<10} {row['mode']:<16} {str(row['rescore']):<8} "
+              + " ".join(f"{row[c]:>10.4f}" for c in recall_cols)
+              + f" {row['scan_mb']:>9.1f} {row['saved_pct']:>6.1f}% {row['p50_ms']:>8.2f}")
+
+
+# ---------- MAIN ----------
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark quantized vector storage.")
+    parser.add_argument("--profiles", type=int, default=1_000_000, help="Synthetic profile vectors (0 to skip).")
+    parser.add_argument("--skip-corpus", action="store_true", help="Don't load the farmer_schemes collection.")
+    parser.add_argument("--output", help="Also write the results as JSON here.")
+    args = parser.parse_args()
+
+    rng = np.random.RandomState(SEED)
+    results = []
+    if not args.skip_corpus:
+        vectors = corpus_vectors()
+        if vectors is not None and len(vectors):
+            results += bench("corpus", vectors, rng)
+    if args.profiles:
+        vectors = np.concatenate(list(synthetic_profiles(args.profiles, rng)))
+        results += bench("profiles", vectors, rng)
+
+    print_table(results)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
@@ -0,0 +1,153 @@
+"""
+Recall@k, MRR and latency of hybrid (BM25 + dense, RRF-fused) retrieval
+against dense-only retrieval on the ingested scheme corpus.
+
+Two query sets:
+  - known-item: a sentence lifted from a random chunk; the hit is that chunk.
+  - exact-term: hand-written queries built around scheme acronyms, annexure
+    numbers and form terms; the hit is any chunk from the expected scheme.
+
+    python scripts/bench_retrieval.py
+    python scripts/bench_retrieval.py --queries 500 --output retrieval.json
+"""
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from vector_backend import open_collection
+from embedding_cache import EmbeddingCache
+from hybrid_search import BM25Index, hybrid_search
+
+# ---------- CONFIG ----------
+CHROMA_DB_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "chroma_db")
+BM25_INDEX_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "bm25_index.json")
+COLLECTION_NAME = "farmer_schemes"
+K_VALUES = (1, 3, 6, 12)
+QUERIES = 200
+QUERY_WORDS = 12
+SEED = 7
+
+# (query, expected scheme_id)
+EXACT_TERM_QUERIES = [
+    ("PMFBY premium rate for Kharif food crops", "pmfby"),
+    ("Annexure II proposal form crop insurance", "pmfby"),
+    ("claim for prevented sowing localised calamity", "pmfby"),
+    ("PM-KISAN beneficiary exclusion income tax payee", "pm_kisan"),
+    ("Samman Nidhi instalment land records Aadhaar seeding", "pm_kisan"),
+    ("Per Drop More Crop micro irrigation subsidy", "pmksy"),
+    ("Har Khet Ko Pani command area development", "pmksy"),
+    ("District Irrigation Plan DIP preparation", "pmksy"),
+    ("soil sample collection grid 2.5 ha irrigated", "soil_health_card"),
+    ("Soil Health Card nutrient recommendation NPK", "soil_health_card"),
+    ("NLM entrepreneurship poultry sheep goat piggery", "nlm"),
+    ("fodder and feed development sub mission livestock", "nlm"),
+]
+
+
+# ---------- DATA ----------
+def load_corpus():
+    try:
+        import chromadb
+    except ImportError:
+        sys.exit("chromadb not installed")
+    if not os.path.isdir(CHROMA_DB_PATH):
+        sys.exit(f"No Chroma DB at {CHROMA_DB_PATH} (run ingest first)")
+    bm25 = BM25Index.load(BM25_INDEX_PATH)
+    if bm25 is None:
+        sys.exit(f"No BM25 index at {BM25_INDEX_PATH} (run ingest first)")
+    collection = open_collection(COLLECTION_NAME, chromadb.PersistentClient(path=CHROMA_DB_PATH))
+    return collection, bm25
+
+
+def known_item_queries(collection, n: int, rng: random.Random) -> list[tuple[str, str]]:
+    """(sentence from a chunk, that chunk's id), skipping chunks too short to quote."""
+    stored = collection.get(include=["documents"])
+    candidates = [
+        (cid, doc.split()) for cid, doc in zip(stored["ids"], stored["documents"])
+        if len(doc.split()) >= QUERY_WORDS * 2
+    ]
+    queries = []
+    for cid, words in rng.sample(candidates, min(n, len(candidates))):
+        start = rng.randint(0, len(words) - QUERY_WORDS)
+        queries.append((" ".join(words[start:start + QUERY_WORDS]), cid))
+    return queries
+
+
+def in_scheme(metadata: dict, scheme_id: str) -> bool:
+    return metadata.get("scheme_id") == scheme_id or bool(metadata.get(f"also_{scheme_id}"))
+
+
+# ---------- BENCH ----------
+def bench(name, queries, search, is_hit) -> dict:
+    """`search(query)` returns a collection.query()-shaped dict; `is_hit(result, i, expected)`."""
+    k_max = max(K_VALUES)
+    hits = {k: 0 for k in K_VALUES}
+    reciprocal_ranks, latencies = [], []
+    for query, expected in queries:
+        started = time.perf_counter()
+        result = search(query, k_max)
+        latencies.append(time.perf_counter() - started)
+        ranks = [i for i in range(len(result["ids"][0])) if is_hit(result, i, expected)]
+        first = ranks[0] + 1 if ranks else None
+        reciprocal_ranks.append(1 / first if first else 0.0)
+        for k in K_VALUES:
+            hits[k] += bool(first and first <= k)
+    return {
+        "set": name,
+        **{f"recall@{k}": round(hits[k] / len(queries), 4) for k in K_VALUES},
+        "mrr": round(float(np.mean(reciprocal_ranks)), 4),
+        "p50_ms": round(float(np.percentile(latencies, 50)) * 1000, 2),
+        "p95_ms": round(float(np.percentile(latencies, 95)) * 1000, 2),
+    }
+
+
+def print_table(rows: list[dict]):
+    recall_cols = [f"recall@{k}" for k in K_VALUES]
+    print(f"\n{'set':<12} {'retriever':<10} " + " ".join(f"{c:>10}" for c in recall_cols)
+          + f" {'MRR':>7} {'p50 ms':>8} {'p95 ms':>8}")
+    for row in rows:
+        print(f"{row['set']:<12} {row['retriever']:<10} " + " ".join(f"{row[c]:>10.4f}" for c in recall_cols)
+              + f" {row['mrr']:>7.4f} {row['p50_ms']:>8.2f} {row['p95_ms']:>8.2f}")
+
+
+# ---------- MAIN ----------
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark hybrid vs dense-only retrieval.")
+    parser.add_argument("--queries", type=int, default=QUERIES, help="Known-item queries to sample.")
+    parser.add_argument("--output", help="Also write the results as JSON here.")
+    args = parser.parse_args()
+
+    collection, bm25 = load_corpus()
+    embedding_model = EmbeddingCache("all-MiniLM-L6-v2")
+    print(f"{collection.count()} chunks, {len(bm25.postings)} BM25 terms")
+
+    retrievers = {
+        "dense": lambda query, k: hybrid_search(collection, None, embedding_model, query, k),
+        "hybrid": lambda query, k: hybrid_search(collection, bm25, embedding_model, query, k),
+    }
+    query_sets = {
+        "known-item": (
+            known_item_queries(collection, args.queries, random.Random(SEED)),
+            lambda result, i, expected: result["ids"][0][i] == expected,
+        ),
+        "exact-term": (
+            EXACT_TERM_QUERIES,
+            lambda result, i, expected: in_scheme(result["metadatas"][0][i], expected),
+        ),
+    }
+
+    results = []
+    for set_name, (queries, is_hit) in query_sets.items():
+        for retriever, search in retrievers.items():
+            search(queries[0][0], 1)  # warm the model and caches outside the timings
+            results.append({"retriever": retriever, **bench(set_name, queries, search, is_hit)})
+
+    print_table(results)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
@@ -0,0 +1,245 @@
+"""
+Query latency (p50 / p99) and serving memory of the vector backends in
+vector_backend.py: Chroma against the exact NumPy memmap backend
+(float32, and float16 without re-scoring), at the corpus size and at
+--scale times it. Each backend is built and then served in its own fresh
+process so resident memory is measured cleanly.
+
+    python scripts/bench_vector_backend.py                 # corpus (or --base synthetic) x1 and x100
+    python scripts/bench_vector_backend.py --base 1000 --scale 100 --skip-corpus
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import subprocess
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from compact_index import CompactIndex
+from vector_backend import ChromaBackend
+from schemes import SCHEMES
+
+# ---------- CONFIG ----------
+CHROMA_DB_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "chroma_db")
+COLLECTION_NAME = "farmer_schemes"
+DIM = 384  # all-MiniLM-L6-v2
+N_RESULTS = 6  # rag.RAG_RESULTS
+QUERIES = 300
+BATCH = 32
+BUILD_BATCH = 5000  # under Chroma's max batch size
+SEED = 11
+BACKENDS = {
+    "chroma": None,
+    "numpy-float32": "float32",
+    "numpy-float16": "float16",
+}
+
+
+# ---------- DATA ----------
+def corpus_vectors() -> np.ndarray | None:
+    try:
+        import chromadb
+    except ImportError:
+        print("chromadb not installed, skipping corpus vectors")
+        return None
+    if not os.path.isdir(CHROMA_DB_PATH):
+        print(f"No Chroma DB at {CHROMA_DB_PATH}, skipping corpus vectors (run ingest first)")
+        return None
+    collection = chromadb.PersistentClient(path=CHROMA_DB_PATH).get_collection(COLLECTION_NAME)
+    return np.asarray(collection.get(include=["embeddings"])["embeddings"], dtype=np.float32)
+
+
+def scaled(base: np.ndarray, factor: int, rng: np.random.RandomState) -> np.ndarray:
+    """`factor` perturbed copies of the base vectors (copy 0 is the base itself)."""
+    copies = [base]
+    for _ in range(factor - 1):
+        noisy = base + 0.3 * rng.standard_normal(base.shape).astype(np.float32) / np.sqrt(DIM)
+        copies.append(noisy / np.linalg.norm(noisy, axis=1, keepdims=True))
+    return np.concatenate(copies)
+
+
+def synthetic_base(n: int, rng: np.random.RandomState) -> np.ndarray:
+    vectors = rng.standard_normal((n, DIM)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def make_queries(vectors: np.ndarray, rng: np.random.RandomState) -> np.ndarray:
+    picks = vectors[rng.randint(0, len(vectors), QUERIES)]
+    queries = picks + 0.3 * rng.standard_normal(picks.shape).astype(np.float32) / np.sqrt(DIM)
+    return queries / np.linalg.norm(queries, axis=1, keepdims=True)
+
+
+def exact_top_k(vectors: np.ndarray, queries: np.ndarray, k: int) -> np.ndarray:
+    distances = np.einsum("ij,ij->i", vectors, vectors)[None, :] - 2 * (queries @ vectors.T)
+    best = np.argpartition(distances, k - 1, axis=1)[:, :k]
+    return np.take_along_axis(best, np.argsort(np.take_along_axis(distances, best, axis=1), axis=1), axis=1)
+
+
+def metadata(i: int) -> dict:
+    scheme_ids = list(SCHEMES)
+    return {"scheme_id": scheme_ids[i % len(scheme_ids)], "page": i}
+
+
+# ---------- WORKERS (run in a subprocess each) ----------
+def rss_mb() -> float:
+    try:
+        with open("/proc/self/status", encoding="utf-8") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def open_backend(backend: str, path: str, create: bool):
+    if BACKENDS[backend] is None:
+        import chromadb
+        client = chromadb.PersistentClient(path=path)
+        if create:
+            return ChromaBackend(client.create_collection(COLLECTION_NAME, metadata={"hnsw:space": "l2"}))
+        return ChromaBackend(client.get_collection(COLLECTION_NAME))
+    return CompactIndex(path, mode=BACKENDS[backend], rescore=False)
+
+
+def build_worker(backend: str, path: str, vectors_path: str) -> dict:
+    vectors = np.load(vectors_path, mmap_mode="r")
+    index = open_backend(backend, path, create=True)
+    started = time.perf_counter()
+    for start in range(0, len(vectors), BUILD_BATCH):
+        end = min(start + BUILD_BATCH, len(vectors))
+        index.add(
+            [str(i) for i in range(start, end)],
+            np.asarray(vectors[start:end]).tolist() if BACKENDS[backend] is None else vectors[start:end],
+            [f"chunk {i}" for i in range(start, end)],
+            [metadata(i) for i in range(start, end)],
+        )
+    return {"build_s": round(time.perf_counter() - started, 2)}
+
+
+def serve_worker(backend: str, path: str, queries_path: str) -> dict:
+    queries = np.load(queries_path)
+    before = rss_mb()
+    started = time.perf_counter()
+    index = open_backend(backend, path, create=False)
+    index.query(queries[:1].tolist(), n_results=N_RESULTS)  # first query pays any lazy loading
+    open_s = time.perf_counter() - started
+
+    def timed(where=None) -> tuple[list[float], list[list[str]]]:
+        latencies, ids = [], []
+        for query in queries:
+            started = time.perf_counter()
+            result = index.query([query.tolist()], n_results=N_RESULTS, where=where)
+            latencies.append((time.perf_counter() - started) * 1000)
+            ids.append(result["ids"][0])
+        return latencies, ids
+
+    plain, ids = timed()
+    filtered, _ = timed({"scheme_id": next(iter(SCHEMES))})
+    started = time.perf_counter()
+    for start in range(0, len(queries), BATCH):
+        index.query(queries[start:start + BATCH].tolist(), n_results=N_RESULTS)
+    batch_ms = (time.perf_counter() - started) * 1000 / len(queries)
+
+    disk = sum(os.path.getsize(os.path.join(root, name)) for root, _, names in os.walk(path) for name in names)
+    return {
+        "open_s": round(open_s, 3),
+        "p50_ms": round(float(np.percentile(plain, 50)), 3),
+        "p99_ms": round(float(np.percentile(plain, 99)), 3),
+        "p50_where_ms": round(float(np.percentile(filtered, 50)), 3),
+        "p99_where_ms": round(float(np.percentile(filtered, 99)), 3),
+        "batch_ms_per_query": round(batch_ms, 3),
+        "rss_mb": round(rss_mb() - before, 1),
+        "disk_mb": round(disk / 1e6, 1),
+        "ids": ids,
+    }
+
+
+def run_worker(*args: str) -> dict:
+    output = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--worker", *args],
+        check=True, capture_output=True, text=True,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+# ---------- BENCH ----------
+def bench(name: str, vectors: np.ndarray, rng: np.random.RandomState, backends: list[str]) -> list[dict]:
+    queries = make_queries(vectors, rng)
+    truth = exact_top_k(vectors, queries, N_RESULTS)
+    print(f"\n{name}: {len(vectors)} vectors, {len(queries)} queries")
+
+    rows = []
+    workdir = tempfile.mkdtemp(prefix="bench_backend_")
+    try:
+        vectors_path, queries_path = os.path.join(workdir, "vectors.npy"), os.path.join(workdir, "queries.npy")
+        np.save(vectors_path, vectors)
+        np.save(queries_path, queries)
+        for backend in backends:
+            path = os.path.join(workdir, backend)
+            try:
+                built = run_worker("build", backend, path, vectors_path)
+                served = run_worker("serve", backend, path, queries_path)
+            except subprocess.CalledProcessError as e:
+                print(f"  {backend}: failed: {(e.stderr or '').strip().splitlines()[-1:]}")
+                continue
+            hits = sum(len({int(i) for i in got} & set(expected.tolist())) for got, expected in zip(served.pop("ids"), truth))
+            rows.append({"set": name, "vectors": len(vectors), "backend": backend, **built, **served,
+                         f"recall@{N_RESULTS}": round(hits / truth.size, 4)})
+            print(f"  {backend}: done")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    return rows
+
+
+def print_table(rows: list[dict]):
+    print(f"\n{'set':<8} {'vectors':>8} {'backend':<14} {'build s':>8} {'p50 ms':>8} {'p99 ms':>8} {'p50 where':>10} "
+          f"{'p99 where':>10} {'batch ms':>9} {'RSS MB':>7} {'disk MB':>8} {'recall':>7}")
+    for row in rows:
+        print(f"{row['set']:<8} {row['vectors']:>8} {row['backend']:<14} {row['build_s']:>8.2f} {row['p50_ms']:>8.3f} "
+              f"{row['p99_ms']:>8.3f} {row['p50_where_ms']:>10.3f} {row['p99_where_ms']:>10.3f} "
+              f"{row['batch_ms_per_query']:>9.3f} {row['rss_mb']:>7.1f} {row['disk_mb']:>8.1f} "
+              f"{row[f'recall@{N_RESULTS}']:>7.4f}")
+
+
+# ---------- MAIN ----------
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "--worker":
+        step, backend, path, data_path = sys.argv[2:6]
+        result = build_worker(backend, path, data_path) if step == "build" else serve_worker(backend, path, data_path)
+        print(json.dumps(result))
+        sys.exit(0)
+
+    parser = argparse.ArgumentParser(description="Benchmark the vector backends.")
+    parser.add_argument("--base", type=int, default=1000, help="Synthetic base size when the corpus isn't available.")
+    parser.add_argument("--scale", type=int, default=100, help="Also run at this multiple of the base size (1 to skip).")
+    parser.add_argument("--skip-corpus", action="store_true", help="Use synthetic vectors even if a Chroma DB exists.")
+    parser.add_argument("--backends", default=",".join(BACKENDS), help="Comma-separated subset of: " + ", ".join(BACKENDS))
+    parser.add_argument("--output", help="Also write the results as JSON here.")
+    args = parser.parse_args()
+
+    backends = [b for b in args.backends.split(",") if b in BACKENDS]
+    if "chroma" in backends:
+        try:
+            import chromadb  # noqa: F401
+        except ImportError:
+            print("chromadb not installed, benchmarking the NumPy backends only")
+            backends.remove("chroma")
+
+    rng = np.random.RandomState(SEED)
+    base = None if args.skip_corpus else corpus_vectors()
+    if base is None or not len(base):
+        base = synthetic_base(args.base, rng)
+    results = bench("x1", base, rng, backends)
+    if args.scale > 1:
+        results += bench(f"x{args.scale}", scaled(base, args.scale, rng), rng, backends)
+
+    print_table(results)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
@@ -0,0 +1,273 @@
+import re
+from collections import Counter
+
+# ---------- CONFIG ----------
+CHUNK_SIZE = 2000  # max characters per chunk
+MIN_CHUNK_CHARS = 400  # below this a new heading joins the open chunk instead of closing it
+HEADING_SIZE_RATIO = 1.15  # font size vs. body text that marks a heading
+MARGIN_RATIO = 0.07  # top/bottom band treated as running header/footer
+# Font sizes are only trusted for headings when one size clearly dominates the
+# page; OCR'd text layers (e.g. PM_KISAN.pdf) jitter between many sizes.
+BODY_SIZE_SHARE = 0.6
+MAX_HEADING_CHARS = 120
+
+LABEL_RE = re.compile(r"^\(?(\d{1,2}(\.\d{1,2}){0,3}|[a-z]|[ivxlc]{1,5})[.)]?$", re.IGNORECASE)
+CLAUSE_RE = re.compile(
+    r"^(\(?\d{1,2}(\.\d{1,2}){0,3}[.)]?|\(?[a-z][.)]|\(?[ivx]{1,4}\)|[•\-–●▪])\s+\S",
+    re.IGNORECASE,
+)
+NUMBERED_RE = re.compile(r"^(\d{1,2}(\.\d{1,2}){0,3})[.)]?\s")
+SENTENCE_RE = re.compile(r"(?<=[.;:?!])\s+")
+
+
+# ---------- PAGE -> UNITS ----------
+# A unit is the smallest piece of text that must never be split across
+# chunks: {"kind": "heading" | "table" | "clause" | "para", "text": str,
+# "level": int (headings only), "rows": list[str] (tables only)}.
+
+def _line_text(line: dict) -> str:
+    return "".join(span["text"] for span in line["spans"]).strip()
+
+
+def _is_bold(line: dict) -> bool:
+    spans = [span for span in line["spans"] if span["text"].strip()]
+    return bool(spans) and all(span["flags"] & 16 for span in spans)
+
+
+def _heading_level(text: str, size: float, body_size: float) -> int:
+    numbered = NUMBERED_RE.match(text)
+    if numbered:
+        return numbered.group(1).count(".") + 1
+    return 1 if size >= body_size * 1.5 else 2
+
+
+def _table_units(page) -> list[tuple[float, dict]]:
+    try:
+        tables = page.find_tables().tables
+    except Exception:
+        return []
+    units = []
+    for table in tables:
+        rows = []
+        for row in table.extract():
+            cells = [re.sub(r"\s+", " ", cell or "").strip() for cell in row]
+            if any(cells):
+                rows.append(" | ".join(cells))
+        if rows:
+            units.append((table.bbox[1], {"kind": "table", "text": "\n".join(rows), "rows": rows, "bbox": table.bbox}))
+    return units
+
+
+def _in_table(bbox, table_boxes) -> bool:
+    cx, cy = (bbox[0] + bbox[2]) / 2, (bbox[1] + bbox[3]) / 2
+    return any(tx0 <= cx <= tx1 and ty0 <= cy <= ty1 for tx0, ty0, tx1, ty1 in table_boxes)
+
+
+def page_units(page) -> list[dict]:
+    """
+    Turn a PyMuPDF page into ordered units using its block and font
+    structure: headings by font size / bold, table rows from find_tables(),
+    numbered clauses kept with their continuation lines. Running headers,
+    footers and page numbers in the margins are dropped.
+    """
+    data = page.get_text("dict")
+    sizes = Counter()
+    for block in data["blocks"]:
+        for line in block.get("lines", []):
+            for span in line["spans"]:
+                sizes[round(span["size"], 1)] += len(span["text"].strip())
+    if not sizes:
+        return []
+    body_size, body_chars = sizes.most_common(1)[0]
+    sizes_reliable = body_chars >= BODY_SIZE_SHARE * sum(sizes.values())
+
+    tables = _table_units(page)
+    table_boxes = [unit["bbox"] for _, unit in tables]
+    height = page.rect.height
+    placed = list(tables)
+
+    for block in data["blocks"]:
+        if block["type"] != 0:
+            continue
+        current = None
+        label = ""
+        for line in block["lines"]:
+            text = _line_text(line)
+            if not text or _in_table(line["bbox"], table_boxes):
+                continue
+            size = max(span["size"] for span in line["spans"])
+            ly = line["bbox"][1]
+            in_margin = ly < height * MARGIN_RATIO or ly > height * (1 - MARGIN_RATIO)
+            if in_margin and (size < body_size or text.isdigit()):
+                continue
+            if LABEL_RE.match(text) and len(text) <= 8:
+                # A bare "6.2" or "(a)" belongs to whatever line follows it
+                label = f"{label} {text}".strip()
+                continue
+            text = f"{label} {text}".strip() if label else text
+            label = ""
+
+            is_heading = len(text) < MAX_HEADING_CHARS and not text.endswith((".", ",")) and (
+                (sizes_reliable and size >= body_size * HEADING_SIZE_RATIO) or _is_bold(line)
+            )
+            if is_heading:
+                if current and current["kind"] == "heading" and len(current["text"]) + len(text) < MAX_HEADING_CHARS:
+                    current["text"] += " " + text
+                    continue
+                current = {"kind": "heading", "text": text, "level": _heading_level(text, size, body_size)}
+                placed.append((ly, current))
+            elif current is None or current["kind"] == "heading" or CLAUSE_RE.match(text):
+                current = {"kind": "clause" if CLAUSE_RE.match(text) else "para", "text": text}
+                placed.append((ly, current))
+            else:
+                current["text"] += " " + text
+        if label:
+            placed.append((block["bbox"][3], {"kind": "para", "text": label}))
+
+    placed.sort(key=lambda item: item[0])
+    return [unit for _, unit in placed]
+
+
+def text_units(text: str) -> list[dict]:
+    """
+    Same units from plain text (OCR output): markdown-style headings and
+    short all-caps lines as headings, pipe-delimited lines as table rows,
+    numbered / bulleted lines as clauses, blank lines between paragraphs.
+    """
+    units = []
+    current = None
+    for raw in text.splitlines():
+        line = raw.strip()
+        if not line:
+            current = None
+            continue
+        if line.count("|") >= 2:
+            if set(line) <= set("|-: "):
+                continue  # markdown table rule
+            row = " | ".join(cell.strip() for cell in line.strip("|").split("|"))
+            if current is None or current["kind"] != "table":
+                current = {"kind": "table", "text": row, "rows": [row]}
+                units.append(current)
+            else:
+                current["rows"].append(row)
+                current["text"] += "\n" + row
+            continue
+        stripped = line.lstrip("#").strip()
+        if line.startswith("#") or (len(line) < MAX_HEADING_CHARS and line.isupper() and not line.endswith(".")):
+            level = max(1, len(line) - len(line.lstrip("#"))) if line.startswith("#") else 1
+            current = {"kind": "heading", "text": stripped.strip("*"), "level": level}
+            units.append(current)
+            current = None
+            continue
+        if current is None or current["kind"] != "para" or CLAUSE_RE.match(line):
+            current = {"kind": "clause" if CLAUSE_RE.match(line) else "para", "text": line}
+            units.append(current)
+        else:
+            current["text"] += " " + line
+    return units
+
+
+# ---------- UNITS -> CHUNKS ----------
+def _split_oversized(unit: dict, max_chars: int) -> list[str]:
+    """Split a unit bigger than a whole chunk along row / sentence lines."""
+    if unit["kind"] == "table":
+        header, *rows = unit["rows"]
+        if len(header) > max_chars // 4:
+            header, rows = "", unit["rows"]  # too big to repeat; it's content
+        lines = []
+        for row in rows:
+            # A single row can still hold a paragraph-sized cell
+            lines.extend(_split_oversized({"kind": "para", "text": row}, max_chars // 2) if len(row) > max_chars // 2 else [row])
+        pieces, current = [], []
+        for row in lines:
+            if current and len(header) + sum(len(r) + 1 for r in current) + len(row) >= max_chars:
+                pieces.append("\n".join(filter(None, [header] + current)))
+                current = []  # the header row is repeated on every piece
+            current.append(row)
+        pieces.append("\n".join(filter(None, [header] + current)))
+        return pieces
+
+    pieces, current = [], ""
+    for sentence in SENTENCE_RE.split(unit["text"]):
+        if len(sentence) > max_chars and current:
+            pieces.append(current)  # keep the text order: what came before goes first
+            current = ""
+        while len(sentence) > max_chars:
+            pieces.append(sentence[:max_chars])
+            sentence = sentence[max_chars:]
+        if current and len(current) + len(sentence) + 1 > max_chars:
+            pieces.append(current)
+            current = sentence
+        else:
+            current = f"{current} {sentence}".strip()
+    if current:
+        pieces.append(current)
+    return pieces
+
+
+class StructuredChunker:
+    """
+    Packs units into chunks of at most `max_chars` without overlap, never
+    splitting a table row or clause, and closing chunks at headings. Keeps
+    the heading stack across pages so each chunk knows its section path;
+    `sections` can be seeded to resume mid-document.
+    """
+
+    def __init__(self, max_chars: int = CHUNK_SIZE, min_chars: int = MIN_CHUNK_CHARS, sections: list | None = None):
+        self.max_chars = max_chars
+        self.min_chars = min_chars
+        self.sections = [list(s) for s in sections or []]  # [[level, text], ...]
+
+    def section_path(self) -> str:
+        return " > ".join(text for _, text in self.sections)
+
+    def _enter_heading(self, unit: dict):
+        level = unit.get("level", 1)
+        self.sections = [s for s in self.sections if s[0] < level] + [[level, unit["text"]]]
+
+    def chunk_page(self, units: list[dict], metadata: dict) -> list[dict]:
+        chunks = []
+        parts, size, has_body, path = [], 0, False, self.section_path()
+
+        def close():
+            nonlocal parts, size, has_body, path
+            text = "\n".join(parts).strip()
+            if text:
+                chunks.append({"page_content": text, "metadata": {**metadata, "section_path": path}})
+            parts, size, has_body, path = [], 0, False, self.section_path()
+
+        for unit in units:
+            text = unit["text"]
+            if unit["kind"] == "heading":
+                if size >= self.min_chars:
+                    close()
+                self._enter_heading(unit)
+                if not has_body:
+                    # Only headings so far: the chunk belongs to the new section
+                    path = self.section_path()
+            elif size and size + len(text) + 1 > self.max_chars:
+                close()
+
+            if len(text) > self.max_chars:
+                for piece in _split_oversized(unit, self.max_chars):
+                    if parts:
+                        close()
+                    parts, size, has_body = [piece], len(piece), True
+                continue
+            parts.append(text)
+            size += len(text) + 1
+            has_body = has_body or unit["kind"] != "heading"
+        close()
+
+        # Fold scraps (a trailing line, a lone heading) into their neighbour
+        merged = []
+        for chunk in chunks:
+            if merged:
+                previous = merged[-1]["page_content"]
+                text = chunk["page_content"]
+                small = min(len(previous), len(text)) < self.min_chars
+                if small and len(previous) + len(text) + 1 <= self.max_chars:
+                    merged[-1]["page_content"] = previous + "\n" + text
+                    continue
+            merged.append(chunk)
+        return merged
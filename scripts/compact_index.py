@@ -0,0 +1,385 @@
+import os
+import json
+import atexit
+import shutil
+import threading
+import numpy as np
+
+# ---------- CONFIG ----------
+# "chroma" keeps today's behaviour; "float32" / "float16" / "int8" serve
+# queries from a memory-mapped copy of the vectors by exhaustive NumPy
+# search instead of Chroma's HNSW index (see vector_backend.open_collection).
+VECTOR_STORAGE = os.getenv("VECTOR_STORAGE", "chroma").lower()
+# Re-rank the best RESCORE_FACTOR * n_results quantized candidates against
+# the full-precision vectors (kept on disk, only those rows are read).
+VECTOR_RESCORE = os.getenv("VECTOR_RESCORE", "1") == "1"
+RESCORE_FACTOR = 4
+COMPACT_DIR = os.getenv(
+    "COMPACT_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "compact_index"),
+)
+INITIAL_ROWS = 1024
+SCAN_BLOCK = 8192  # rows de-quantized at a time while scanning (keeps the float32 copy cache-sized)
+
+CODE_DTYPES = {"float32": np.float32, "float16": np.float16, "int8": np.int8}
+
+
+def quantize(vectors: np.ndarray, mode: str) -> tuple[np.ndarray, np.ndarray]:
+    """
+    float32: stored as is. float16: plain half precision, scale 1. int8:
+    symmetric per-vector scale so the largest component maps to +-127.
+    """
+    vectors = np.asarray(vectors, dtype=np.float32)
+    if mode in ("float32", "float16"):
+        return vectors.astype(CODE_DTYPES[mode]), np.ones(len(vectors), dtype=np.float32)
+    scales = np.abs(vectors).max(axis=1) / 127.0
+    scales[scales == 0] = 1.0
+    codes = np.clip(np.rint(vectors / scales[:, None]), -127, 127).astype(np.int8)
+    return codes, scales.astype(np.float32)
+
+
+class CompactIndex:
+    """
+    Exhaustive-search NumPy vector store implementing the VectorBackend
+    interface (see vector_backend.py), so it can stand in for
+    `farmer_schemes` or `farmer_profiles`. In float32 mode search is exact;
+    float16 / int8 scan scalar-quantized codes and re-score the best
+    candidates against the float32 originals.
+
+    Layout under `path`: codes, per-row scale and norm (the only arrays a
+    scan touches), float32 originals for re-scoring, all as growable
+    memmaps; an append-only records.jsonl with ids, documents and metadata;
+    and meta.json with the shape. Metadata is also kept as per-key column
+    arrays for vectorized `where` filters. Distances are squared L2 like
+    Chroma's default space.
+
+    One writing process per directory at a time. from_collection() builds
+    a new copy beside `path` and renames it into place; an instance open on
+    the old copy notices on its next read and reloads (refresh()).
+    """
+
+    def __init__(self, path: str, mode: str = "int8", rescore: bool = True):
+        self.path = path
+        self.rescore = rescore and mode != "float32"  # nothing to re-score against
+        os.makedirs(path, exist_ok=True)
+        self.meta_path = os.path.join(path, "meta.json")
+        self.records_path = os.path.join(path, "records.jsonl")
+        self.lock = threading.RLock()
+        self._reset(mode)
+        self._load()
+        atexit.register(self.flush)
+
+    def _reset(self, mode: str):
+        self.mode = mode
+        self.dim = None
+        self.rows = 0
+        self.arrays = {}
+        self.records = {}  # id -> [row, document, metadata]
+        self.row_ids = {}  # row -> id
+        self.free_rows = []
+        self.high_water = 0  # rows ever used; scans stop here
+        self.columns = {}  # metadata key -> object array over rows, rebuilt after writes
+        self.dir_id = os.stat(self.path).st_ino  # changes when from_collection swaps a new copy in
+
+    # ---------- storage ----------
+    def _array_specs(self) -> dict:
+        specs = {
+            "codes": (CODE_DTYPES[self.mode], (self.dim,)),
+            "scales": (np.float32, ()),
+            "norms": (np.float32, ()),
+        }
+        if self.rescore:
+            specs["full"] = (np.float32, (self.dim,))
+        return specs
+
+    def _open_arrays(self, rows: int, mode: str):
+        for name, (dtype, tail) in self._array_specs().items():
+            path = os.path.join(self.path, f"{name}.bin")
+            if mode == "r+":
+                with open(path, "r+b") as f:
+                    f.truncate(rows * int(np.prod(tail, dtype=np.int64)) * np.dtype(dtype).itemsize)
+            self.arrays[name] = np.memmap(path, dtype=dtype, mode=mode, shape=(rows, *tail))
+
+    def _load(self):
+        if not os.path.exists(self.meta_path):
+            return
+        with open(self.meta_path, "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        self.mode, self.dim, self.rows = meta["mode"], meta["dim"], meta["rows"]
+        self.rescore = self.rescore and meta["rescore"]
+        for name, (dtype, tail) in self._array_specs().items():
+            path = os.path.join(self.path, f"{name}.bin")
+            self.arrays[name] = np.memmap(path, dtype=dtype, mode="r+", shape=(self.rows, *tail))
+
+        if os.path.exists(self.records_path):
+            with open(self.records_path, "r", encoding="utf-8") as f:
+                for line in f:
+                    record = json.loads(line)
+                    if record.get("deleted"):
+                        self.records.pop(record["id"], None)
+                    else:
+                        self.records[record["id"]] = [record["row"], record["document"], record["metadata"]]
+        self.row_ids = {row: rid for rid, (row, _, _) in self.records.items()}
+        self.high_water = max(self.row_ids, default=-1) + 1
+        self.free_rows = sorted(set(range(self.high_water)) - set(self.row_ids), reverse=True)
+
+    def _swapped(self) -> bool:
+        try:
+            return os.stat(self.path).st_ino != self.dir_id
+        except OSError:  # mid-swap; keep serving the copy already mapped
+            return False
+
+    def refresh(self) -> bool:
+        """Reload if another process swapped a rebuilt copy in at `path`; True if it did."""
+        if not self._swapped():
+            return False
+        with self.lock:
+            self._reset(self.mode)
+            self._load()
+        print(f"Compact index {self.path} was rebuilt; reloaded {self.count()} vectors")
+        return True
+
+    def _grow(self):
+        new_rows = max(INITIAL_ROWS, self.rows * 2)
+        for array in self.arrays.values():
+            array.flush()
+        self.arrays = {}
+        self._open_arrays(new_rows, "r+" if self.rows else "w+")
+        self.rows = new_rows
+        self._write_meta()  # the shape must match the files before any record points past the old end
+
+    def _allocate(self) -> int:
+        if self.free_rows:
+            return self.free_rows.pop()
+        if self.high_water == self.rows:
+            self._grow()
+        self.high_water += 1
+        return self.high_water - 1
+
+    def _append_records(self, records: list[dict]):
+        with open(self.records_path, "a", encoding="utf-8") as f:
+            for record in records:
+                f.write(json.dumps(record) + "\n")
+
+    def _write_meta(self):
+        meta = {"mode": self.mode, "dim": self.dim, "rows": self.rows, "rescore": self.rescore}
+        tmp_path = self.meta_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, self.meta_path)
+
+    def flush(self):
+        """Write the memmaps back to disk; upserts leave that to the OS (and to this, at exit)."""
+        with self.lock:
+            for array in self.arrays.values():
+                array.flush()
+            if self.dim is None or not self.arrays or self._swapped():
+                return  # nothing written, or `path` now holds someone else's copy
+            self._write_meta()
+
+    # ---------- writes ----------
+    def upsert(self, ids: list[str], embeddings, documents: list | None = None, metadatas: list | None = None):
+        vectors = np.atleast_2d(np.asarray(embeddings, dtype=np.float32))
+        documents = documents or [None] * len(ids)
+        metadatas = metadatas or [None] * len(ids)
+        if len(set(ids)) < len(ids):
+            # Same id twice in one batch: the last one wins, and only gets one row
+            keep = sorted({rid: i for i, rid in enumerate(ids)}.values())
+            ids = [ids[i] for i in keep]
+            vectors = vectors[keep]
+            documents = [documents[i] for i in keep]
+            metadatas = [metadatas[i] for i in keep]
+        with self.lock:
+            if self.dim is None:
+                self.dim = vectors.shape[1]
+            codes, scales = quantize(vectors, self.mode)
+            rows = np.array([self.records[rid][0] if rid in self.records else self._allocate() for rid in ids])
+            self.arrays["codes"][rows] = codes
+            self.arrays["scales"][rows] = scales
+            self.arrays["norms"][rows] = np.einsum("ij,ij->i", vectors, vectors)
+            if self.rescore:
+                self.arrays["full"][rows] = vectors
+            records = []
+            for rid, row, document, metadata in zip(ids, rows.tolist(), documents, metadatas):
+                self.records[rid] = [row, document, metadata]
+                self.row_ids[row] = rid
+                records.append({"id": rid, "row": row, "document": document, "metadata": metadata})
+            self.columns = {}
+            self._append_records(records)
+
+    add = upsert
+
+    def delete(self, ids: list[str]):
+        with self.lock:
+            gone = [rid for rid in ids if rid in self.records]
+            for rid in gone:
+                row = self.records.pop(rid)[0]
+                del self.row_ids[row]
+                self.free_rows.append(row)
+            self.columns = {}
+            self._append_records([{"id": rid, "deleted": True} for rid in gone])
+
+    def count(self) -> int:
+        return len(self.records)
+
+    def get(self, ids: list[str] | None = None, where: dict | None = None, **_) -> dict:
+        self.refresh()
+        with self.lock:
+            keys = [rid for rid in (ids if ids is not None else list(self.records)) if rid in self.records]
+            keys = [rid for rid in keys if matches_where(self.records[rid][2], where)]
+            return {
+                "ids": keys,
+                "documents": [self.records[rid][1] for rid in keys],
+                "metadatas": [self.records[rid][2] for rid in keys],
+            }
+
+    # ---------- search ----------
+    def _column(self, key: str) -> np.ndarray:
+        """Metadata `key` for every used row as an object array (None where unset or free)."""
+        column = self.columns.get(key)
+        if column is None:
+            column = np.full(self.high_water, None, dtype=object)
+            for row, _, metadata in self.records.values():
+                column[row] = (metadata or {}).get(key)
+            self.columns[key] = column
+        return column
+
+    def _where_mask(self, where: dict | None) -> np.ndarray:
+        """Vectorized matches_where over the metadata columns."""
+        mask = np.zeros(self.high_water, dtype=bool)
+        mask[list(self.row_ids)] = True
+        for key, expected in (where or {}).items():
+            if key == "$or":
+                live = mask
+                mask = np.zeros_like(live)
+                for clause in expected:
+                    mask |= self._where_mask(clause)
+                mask &= live
+            elif isinstance(expected, dict) and "$in" in expected:
+                allowed = set(expected["$in"])
+                mask &= np.fromiter((value in allowed for value in self._column(key)), dtype=bool, count=self.high_water)
+            else:
+                mask &= self._column(key) == expected
+        return mask
+
+    def _approx_distances(self, queries: np.ndarray, rows: np.ndarray | None) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Squared L2 from every query to `rows` (or every used row), one
+        matrix product per block for the whole batch: shape (queries, rows).
+        Exact in float32 mode.
+        """
+        codes, scales, norms = self.arrays["codes"], self.arrays["scales"], self.arrays["norms"]
+        if rows is None:
+            rows = np.arange(self.high_water)
+        query_norms = np.einsum("ij,ij->i", queries, queries)[:, None]
+        out = np.empty((len(queries), len(rows)), dtype=np.float32)
+        for start in range(0, len(rows), SCAN_BLOCK):
+            block = rows[start:start + SCAN_BLOCK]
+            contiguous = len(block) and block[-1] - block[0] == len(block) - 1
+            sl = slice(block[0], block[-1] + 1) if contiguous else block
+            dots = (queries @ codes[sl].astype(np.float32, copy=False).T) * scales[sl]
+            out[:, start:start + len(block)] = norms[sl] + query_norms - 2 * dots
+        return rows, out
+
+    def query(
+        self,
+        query_embeddings,
+        n_results: int = 10,
+        where: dict | None = None,
+        include: list | None = None,
+        **_,
+    ) -> dict:
+        """Chroma-shaped results for one or more query vectors, scored as one batch."""
+        queries = np.atleast_2d(np.asarray(query_embeddings, dtype=np.float32))
+        self.refresh()
+        result = {"ids": [], "documents": [], "metadatas": [], "distances": []}
+        with self.lock:
+            if not self.records:
+                for key in result:
+                    result[key] = [[] for _ in queries]
+                return result
+
+            rows = None
+            if where or len(self.records) < self.high_water:
+                rows = np.flatnonzero(self._where_mask(where))
+            candidate_rows, distances = self._approx_distances(queries, rows)
+            pool = min(distances.shape[1], n_results * RESCORE_FACTOR if self.rescore else n_results)
+            if pool:
+                best = np.argpartition(distances, pool - 1, axis=1)[:, :pool]
+
+            for i, query in enumerate(queries):
+                if pool == 0:
+                    top_rows, top_dist = np.array([], dtype=np.int64), np.array([], dtype=np.float32)
+                else:
+                    top_rows, top_dist = candidate_rows[best[i]], distances[i, best[i]]
+                    if self.rescore:
+                        full = np.asarray(self.arrays["full"][np.sort(top_rows)])
+                        order = np.argsort(top_rows)
+                        exact = ((full - query) ** 2).sum(axis=1)
+                        top_rows, top_dist = top_rows[order], exact
+                    keep = np.argsort(top_dist)[:n_results]
+                    top_rows, top_dist = top_rows[keep], top_dist[keep]
+
+                ids = [self.row_ids[int(row)] for row in top_rows]
+                result["ids"].append(ids)
+                result["documents"].append([self.records[rid][1] for rid in ids])
+                result["metadatas"].append([self.records[rid][2] for rid in ids])
+                result["distances"].append([float(d) for d in top_dist])
+        return result
+
+    # ---------- import / stats ----------
+    @classmethod
+    def from_collection(cls, collection, path: str, mode: str = "int8", rescore: bool = True, batch_size: int = 1000):
+        """
+        Rebuild a compact copy of a Chroma collection at `path`. The copy
+        is written to a sibling directory and renamed into place, so a
+        process serving the old files (memory-mapped) never sees them
+        truncated; it picks up the new copy through refresh().
+        """
+        path = os.path.normpath(path)
+        build_path, old_path = f"{path}.build-{os.getpid()}", f"{path}.old-{os.getpid()}"
+        shutil.rmtree(build_path, ignore_errors=True)
+        index = cls(build_path, mode=mode, rescore=rescore)
+        total = collection.count()
+        for offset in range(0, total, batch_size):
+            page = collection.get(limit=batch_size, offset=offset, include=["embeddings", "documents", "metadatas"])
+            if len(page["ids"]):
+                index.upsert(page["ids"], page["embeddings"], page["documents"], page["metadatas"])
+        index.flush()
+        index.arrays = {}  # unmap before the rename (Windows won't move open files)
+
+        if os.path.isdir(path):
+            shutil.rmtree(old_path, ignore_errors=True)
+            os.replace(path, old_path)
+        os.replace(build_path, path)
+        # Fine on POSIX while another process still maps the old files; on Windows they stay until it lets go
+        shutil.rmtree(old_path, ignore_errors=True)
+        return cls(path, mode=mode, rescore=rescore)
+
+    def memory(self) -> dict:
+        count = self.high_water
+        scan_bytes = sum(self.arrays[name][:count].nbytes for name in ("codes", "scales", "norms")) if count else 0
+        return {
+            "mode": self.mode,
+            "vectors": self.count(),
+            "scan_bytes": int(scan_bytes),
+            "float32_bytes": int(count * (self.dim or 0) * 4),
+            "rescore_bytes_on_disk": int(self.arrays["full"][:count].nbytes) if self.rescore and count else 0,
+        }
+
+
+def matches_where(metadata: dict | None, where: dict | None) -> bool:
+    """Equality filters, e.g. {"scheme_id": "pmfby"}, plus {"$in": [...]} and "$or"."""
+    if not where:
+        return True
+    metadata = metadata or {}
+    for key, expected in where.items():
+        if key == "$or":
+            if not any(matches_where(metadata, clause) for clause in expected):
+                return False
+        elif isinstance(expected, dict) and "$in" in expected:
+            if metadata.get(key) not in expected["$in"]:
+                return False
+        elif metadata.get(key) != expected:
+            return False
+    return True
@@ -0,0 +1,160 @@
+"""
+Compile the scheme eligibility rules the app evaluates locally
+(scripts/eligibility_rules.json). Each scheme starts from the curated
+rules below; with --extract the criteria are also pulled out of its
+ingested guideline chunks by the LLM, and a cleanly validated extraction
+replaces the curated rule. Rerun after ingesting new guidelines and
+review the JSON diff before committing it.
+
+    python scripts/compile_rules.py
+    python scripts/compile_rules.py --extract
+"""
+import os
+import sys
+import json
+import hashlib
+import argparse
+from datetime import datetime, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from rule_engine import RULES_PATH, RULES_SCHEMA_VERSION, validate_rule, extract_rule
+from answer_cache import corpus_versions
+from schemes import SCHEMES, scheme_filter
+from hybrid_search import BM25Index
+
+# ---------- CONFIG ----------
+CHROMA_DB_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "chroma_db")
+BM25_INDEX_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "bm25_index.json")
+COLLECTION_NAME = "farmer_schemes"
+CRITERIA_QUERY = "eligibility eligible farmers criteria beneficiaries exclusion landholding"
+CRITERIA_CHUNKS = 6
+CRITERIA_MAX_CHARS = 8000
+
+CROPS = ["cereals", "pulses", "oilseeds", "cash_crops", "horticulture", "plantation", "crops_other"]
+SEASONAL_CROPS = ["cereals", "pulses", "oilseeds", "cash_crops", "horticulture"]
+LIVESTOCK = ["dairy", "small_ruminants", "poultry", "piggery"]
+
+# Clear-cut criteria from the scheme guidelines, in rule_engine's format
+SEED_RULES = {
+    "pm_kisan": {
+        "summary": "Income support for farmer families that own cultivable land.",
+        "require": [
+            {"field": "owns_land", "op": "eq", "value": "yes", "label": "owns cultivable land"},
+        ],
+        "exclude": [],
+        "uncertain_if": [
+            {"field": "income", "op": "gte", "value": 500000, "label": "income tax payers are excluded"},
+        ],
+    },
+    "pmfby": {
+        "summary": "Crop insurance for farmers, owners and tenants, growing notified crops.",
+        "require": [
+            {"field": "activities", "op": "overlaps", "value": CROPS, "label": "grows crops"},
+        ],
+        "exclude": [],
+        "uncertain_if": [
+            {"field": "activities", "op": "not_overlaps", "value": SEASONAL_CROPS,
+             "label": "the crop must be notified for insurance in the area"},
+        ],
+    },
+    "soil_health_card": {
+        "summary": "Free soil testing and nutrient advice for cultivated land.",
+        "require": [
+            {"field": "activities", "op": "overlaps", "value": CROPS, "label": "cultivates crops"},
+        ],
+        "exclude": [],
+        "uncertain_if": [],
+    },
+    "pmksy": {
+        "summary": "Irrigation support, including drip and sprinkler subsidy, for cultivated land.",
+        "require": [
+            {"field": "activities", "op": "overlaps", "value": CROPS, "label": "cultivates crops"},
+        ],
+        "exclude": [],
+        "uncertain_if": [
+            {"field": "owns_land", "op": "eq", "value": "no", "label": "land title or long-term lease is usually needed"},
+        ],
+    },
+    "kcc": {
+        "summary": "Low-interest institutional credit for crop, animal husbandry and fisheries farmers.",
+        "require": [
+            {"field": "activities", "op": "overlaps", "value": CROPS + LIVESTOCK + ["fisheries", "beekeeping"],
+             "label": "farms crops, livestock or fish"},
+        ],
+        "exclude": [],
+        "uncertain_if": [],
+    },
+    "nlm": {
+        "summary": "Support for poultry, sheep, goat and pig rearing, and fodder development.",
+        "require": [
+            {"field": "activities", "op": "overlaps", "value": LIVESTOCK, "label": "rears livestock or poultry"},
+        ],
+        "exclude": [],
+        "uncertain_if": [
+            {"field": "activities", "op": "not_overlaps", "value": ["small_ruminants", "poultry", "piggery"],
+             "label": "dairy is covered only through fodder components"},
+        ],
+    },
+}
+
+
+def criteria_text(collection, bm25, scheme_id: str) -> str:
+    """The scheme's guideline chunks that talk most about eligibility."""
+    hits = bm25.search(CRITERIA_QUERY, CRITERIA_CHUNKS, scheme_filter(scheme_id))
+    if not hits:
+        return ""
+    stored = collection.get(ids=[cid for cid, _ in hits], include=["documents"])
+    return "\n\n".join(stored["documents"])[:CRITERIA_MAX_CHARS]
+
+
+def compile_rules(extract: bool = False) -> dict:
+    schemes = {}
+    for scheme_id, seed in SEED_RULES.items():
+        problems = validate_rule(seed)
+        if problems:
+            raise ValueError(f"Seed rule for {scheme_id} is invalid: {problems}")
+        schemes[scheme_id] = {"name": SCHEMES[scheme_id]["name"], "origin": "seed", **seed}
+
+    if extract:
+        import chromadb
+        sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+        from data_input import llm_call
+
+        bm25 = BM25Index.load(BM25_INDEX_PATH)
+        if bm25 is None:
+            sys.exit(f"No BM25 index at {BM25_INDEX_PATH} (run ingest first)")
+        collection = chromadb.PersistentClient(path=CHROMA_DB_PATH).get_collection(COLLECTION_NAME)
+        for scheme_id in schemes:
+            text = criteria_text(collection, bm25, scheme_id)
+            if not text:
+                print(f"  {scheme_id}: no guideline chunks, keeping curated rule")
+                continue
+            rule, problems = extract_rule(SCHEMES[scheme_id]["name"], text, llm_call)
+            if rule is None:
+                print(f"  {scheme_id}: extraction rejected ({'; '.join(problems)}), keeping curated rule")
+                continue
+            schemes[scheme_id] = {**rule, "origin": "extracted"}
+            print(f"  {scheme_id}: extracted {len(rule.get('require', []))} requirements")
+
+    digest = hashlib.sha1(json.dumps(schemes, sort_keys=True).encode("utf-8")).hexdigest()[:12]
+    return {
+        "schema_version": RULES_SCHEMA_VERSION,
+        "rules_version": digest,
+        "compiled_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "corpus_versions": {k: v for k, v in corpus_versions().items() if k},
+        "schemes": schemes,
+    }
+
+
+# ---------- MAIN ----------
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compile scheme eligibility rules.")
+    parser.add_argument("--extract", action="store_true", help="Pull criteria out of the ingested guidelines with the LLM.")
+    parser.add_argument("--output", default=RULES_PATH, help="Where to write the rule set.")
+    args = parser.parse_args()
+
+    rules = compile_rules(args.extract)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(rules, f, indent=1, ensure_ascii=False)
+        f.write("\n")
+    print(f"Wrote {len(rules['schemes'])} scheme rules (version {rules['rules_version']}) to {args.output}")
@@ -0,0 +1,111 @@
+import os
+import re
+import json
+
+# ---------- CONFIG ----------
+CONTEXT_TOKEN_BUDGET = int(os.getenv("RAG_CONTEXT_TOKENS", "1500"))
+CHARS_PER_TOKEN = 4  # rough estimate, close enough for English/Hinglish scheme text
+MIN_TAIL_TOKENS = 60  # don't bother truncating a chunk into a smaller scrap than this
+MAX_SECTION_CHARS = 60
+
+# A sentence or a line; a line break right after a full stop stays with the span,
+# so table-like rows ("... 2 ha.\nState ...") keep their own lines
+SPAN_RE = re.compile(r"[^\n]+?(?:[.!?](?:[ \t]*\n|(?=\s))|\n|$)")
+
+
+def estimate_tokens(text: str) -> int:
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def _span_key(span: str) -> str:
+    return re.sub(r"\W+", " ", span.lower()).strip()
+
+
+def citation(metadata: dict) -> str:
+    """
+    "PMFBY p.12 · Claims > Prevented Sowing (+ PM_KISAN p.3)": where a chunk
+    came from, plus the other places a folded near-duplicate appeared.
+    """
+    metadata = metadata or {}
+    cite = f"{metadata.get('scheme_name', '?')} p.{metadata.get('page', '?')}"
+    section = metadata.get("section_path")
+    if section:
+        if len(section) > MAX_SECTION_CHARS:
+            section = "…" + section[-MAX_SECTION_CHARS:]
+        cite += f" · {section}"
+    if metadata.get("sources"):
+        others = json.loads(metadata["sources"])[1:]
+        if others:
+            cite += " (+ " + ", ".join(f"{s['scheme_name']} p.{s['page']}" for s in others[:3]) + ")"
+    return cite
+
+
+def pack_context(result: dict, budget: int = CONTEXT_TOKEN_BUDGET) -> tuple[str, dict]:
+    """
+    Turn a collection.query()/hybrid_search() result into prompt context:
+    chunk text under a one-line citation, best-ranked first, with sentences
+    and table rows already given by a higher-ranked chunk dropped, until
+    `budget` (estimated) tokens are used. Returns (context, stats).
+    """
+    ids = result["ids"][0] if result and result.get("ids") else []
+    documents = result["documents"][0] if ids else []
+    metadatas = result["metadatas"][0] if ids else []
+
+    seen = set()
+    blocks = []
+    used = 0
+    dropped_spans = 0
+    for rank, (doc, metadata) in enumerate(zip(documents, metadatas), start=1):
+        spans = []
+        for span in SPAN_RE.findall(doc or ""):
+            key = _span_key(span)
+            if not key:
+                continue
+            if key in seen:
+                dropped_spans += 1
+                continue
+            seen.add(key)
+            # Keep line breaks (table rows, list items); sentences run on
+            spans.append(span.strip() + ("\n" if span.endswith("\n") else " "))
+        if not spans:
+            continue
+
+        header = f"[{len(blocks) + 1}] {citation(metadata)}\n"
+        remaining = budget - used - estimate_tokens(header)
+        body, truncated = "", False
+        for span in spans:
+            if estimate_tokens(body + span) > remaining:
+                truncated = True
+                break
+            body += span
+        body = body.rstrip()
+        if truncated:
+            # Chunk didn't fit whole; keep its head if that's worth anything, then stop
+            if estimate_tokens(body) >= MIN_TAIL_TOKENS:
+                blocks.append(header + body)
+            break
+        blocks.append(header + body)
+        used += estimate_tokens(header + body) + 1
+
+    context = "\n\n".join(blocks)
+    raw_tokens = estimate_tokens(str(result))
+    packed_tokens = estimate_tokens(context)
+    stats = {
+        "chunks_in": len(ids),
+        "chunks_out": len(blocks),
+        "dropped_spans": dropped_spans,
+        "raw_tokens": raw_tokens,
+        "packed_tokens": packed_tokens,
+        "saved_tokens": raw_tokens - packed_tokens,
+        "budget": budget,
+    }
+    return context, stats
+
+
+def log_stats(label: str, stats: dict):
+    saved_pct = 100 * stats["saved_tokens"] / stats["raw_tokens"] if stats["raw_tokens"] else 0.0
+    print(
+        f"[{label}] context {stats['packed_tokens']}/{stats['budget']} tokens from "
+        f"{stats['chunks_out']}/{stats['chunks_in']} chunks, saved {stats['saved_tokens']} "
+        f"({saved_pct:.0f}%) vs raw result, {stats['dropped_spans']} overlapping spans dropped"
+    )
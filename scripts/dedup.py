@@ -0,0 +1,209 @@
+import os
+import re
+import json
+import hashlib
+import numpy as np
+
+# ---------- CONFIG ----------
+NUM_PERM = 128
+BANDS = 16  # 16 bands x 8 rows: pairs above ~0.7 Jaccard almost always collide
+ROWS = NUM_PERM // BANDS
+SIMILARITY_THRESHOLD = 0.85  # estimated Jaccard needed to fold a chunk into another
+SHINGLE_WORDS = 3
+INDEX_VERSION = 1
+
+_MERSENNE = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64((1 << 32) - 1)
+_rng = np.random.RandomState(1)
+_PERM_A = _rng.randint(1, 1 << 32, size=NUM_PERM, dtype=np.uint64)
+_PERM_B = _rng.randint(0, 1 << 32, size=NUM_PERM, dtype=np.uint64)
+
+
+# ---------- MINHASH ----------
+def shingles(text: str) -> set[str]:
+    words = re.findall(r"[a-z0-9]+", text.lower())
+    if len(words) < SHINGLE_WORDS:
+        return {" ".join(words)} if words else set()
+    return {" ".join(words[i:i + SHINGLE_WORDS]) for i in range(len(words) - SHINGLE_WORDS + 1)}
+
+
+def minhash(text: str) -> np.ndarray:
+    """NUM_PERM-value MinHash signature of the text's word shingles."""
+    hashed = np.array(
+        [int.from_bytes(hashlib.blake2b(s.encode("utf-8"), digest_size=4).digest(), "little") for s in shingles(text)],
+        dtype=np.uint64,
+    )
+    if hashed.size == 0:
+        return np.full(NUM_PERM, _MAX_HASH, dtype=np.uint32)
+    permuted = (np.outer(hashed, _PERM_A) + _PERM_B) % _MERSENNE & _MAX_HASH
+    return permuted.min(axis=0).astype(np.uint32)
+
+
+def similarity(a: np.ndarray, b: np.ndarray) -> float:
+    """Estimated Jaccard similarity of two signatures."""
+    return float(np.mean(a == b))
+
+
+def _band_keys(signature: np.ndarray) -> list[str]:
+    return [f"{band}:{signature[band * ROWS:(band + 1) * ROWS].tobytes().hex()}" for band in range(BANDS)]
+
+
+# ---------- INDEX ----------
+class DedupIndex:
+    """
+    LSH index over the chunks stored in the collection. A chunk that is a
+    near-duplicate of an already stored one is not stored again; it becomes
+    an alias, and the stored ("canonical") chunk lists every scheme and page
+    it stands for. Canonical chunks stay in the collection until the last
+    page referring to them goes away.
+
+    Persisted next to the ingest manifest and saved at the same checkpoints.
+    """
+
+    def __init__(self):
+        self.signatures = {}  # canonical id -> signature
+        self.members = {}  # canonical id -> [{"id": chunk id, "metadata": {...}}, ...]
+        self.alias = {}  # chunk id -> canonical id, for every member
+        self.buckets = {}  # band key -> set of canonical ids
+
+    # ---------- persistence ----------
+    @classmethod
+    def load(cls, path: str) -> "DedupIndex":
+        index = cls()
+        if not os.path.exists(path):
+            return index
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        if data.get("version") != INDEX_VERSION:
+            return index
+        for cid, entry in data["canonical"].items():
+            index._add_canonical(cid, np.frombuffer(bytes.fromhex(entry["signature"]), dtype=np.uint32).copy())
+            index.members[cid] = entry["members"]
+            for member in entry["members"]:
+                index.alias[member["id"]] = cid
+        return index
+
+    def save(self, path: str):
+        data = {
+            "version": INDEX_VERSION,
+            "canonical": {
+                cid: {"signature": self.signatures[cid].tobytes().hex(), "members": members}
+                for cid, members in self.members.items()
+            },
+        }
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        os.replace(tmp_path, path)
+
+    # ---------- lookups ----------
+    def _add_canonical(self, cid: str, signature: np.ndarray):
+        self.signatures[cid] = signature
+        for key in _band_keys(signature):
+            self.buckets.setdefault(key, set()).add(cid)
+
+    def _drop_canonical(self, cid: str):
+        for key in _band_keys(self.signatures.pop(cid)):
+            bucket = self.buckets.get(key)
+            if bucket:
+                bucket.discard(cid)
+                if not bucket:
+                    del self.buckets[key]
+        del self.members[cid]
+
+    def find(self, signature: np.ndarray, metadata: dict) -> str | None:
+        """
+        Best canonical chunk at or above SIMILARITY_THRESHOLD. Chunks from the
+        same scheme page are skipped, so an edited page never folds into its
+        own previous version.
+        """
+        candidates = set()
+        for key in _band_keys(signature):
+            candidates |= self.buckets.get(key, set())
+
+        best, best_score = None, SIMILARITY_THRESHOLD
+        for cid in candidates:
+            if any(
+                m["metadata"]["scheme_name"] == metadata["scheme_name"] and m["metadata"]["page"] == metadata["page"]
+                for m in self.members[cid]
+            ):
+                continue
+            score = similarity(signature, self.signatures[cid])
+            if score >= best_score:
+                best, best_score = cid, score
+        return best
+
+    # ---------- updates ----------
+    def add(self, chunk: dict) -> str:
+        """
+        Register a chunk. Returns the canonical ID it is stored under: its
+        own ID if it is new, or the chunk it duplicates.
+        """
+        cid = chunk["id"]
+        if cid in self.alias:
+            return self.alias[cid]
+
+        signature = chunk.get("minhash")
+        if signature is None:
+            signature = minhash(chunk["page_content"])
+        member = {"id": cid, "metadata": chunk["metadata"]}
+
+        target = self.find(signature, chunk["metadata"])
+        if target is None:
+            self._add_canonical(cid, signature)
+            self.members[cid] = [member]
+            target = cid
+        else:
+            self.members[target].append(member)
+        self.alias[cid] = target
+        return target
+
+    def release(self, chunk_ids: list[str]) -> tuple[list[str], set[str]]:
+        """
+        Forget chunks whose page changed or disappeared. Returns the canonical
+        IDs to delete from the collection (no member left) and those whose
+        source list changed and need their metadata rewritten.
+        """
+        deleted, changed = [], set()
+        for chunk_id in chunk_ids:
+            cid = self.alias.pop(chunk_id, None)
+            if cid is None:
+                # Not in the index (e.g. its file was lost): just delete it
+                deleted.append(chunk_id)
+                continue
+            self.members[cid] = [m for m in self.members[cid] if m["id"] != chunk_id]
+            if self.members[cid]:
+                changed.add(cid)
+            else:
+                self._drop_canonical(cid)
+                deleted.append(cid)
+                changed.discard(cid)
+        return deleted, changed
+
+    def metadata(self, cid: str) -> dict:
+        """
+        Metadata for a canonical chunk: its first member's, plus `sources`
+        (JSON list of every scheme/page it stands for; Chroma metadata must
+        be scalar), how many near-duplicates it absorbed, and an
+        `also_<scheme_id>` flag for every other scheme it covers so
+        per-scheme filters still find it.
+        """
+        members = self.members[cid]
+        sources = [{"scheme_name": m["metadata"]["scheme_name"], "page": m["metadata"]["page"]} for m in members]
+        metadata = {**members[0]["metadata"], "sources": json.dumps(sources), "duplicates": len(members) - 1}
+        for member in members[1:]:
+            scheme_id = member["metadata"].get("scheme_id")
+            if scheme_id and scheme_id != metadata.get("scheme_id"):
+                metadata[f"also_{scheme_id}"] = True
+        return metadata
+
+    def stats(self) -> dict:
+        chunks = len(self.alias)
+        canonical = len(self.members)
+        return {
+            "chunks": chunks,
+            "canonical": canonical,
+            "folded": chunks - canonical,
+            "shrink_pct": round(100 * (chunks - canonical) / chunks, 2) if chunks else 0.0,
+            "threshold": SIMILARITY_THRESHOLD,
+        }
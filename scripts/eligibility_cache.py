@@ -0,0 +1,114 @@
+import os
+import json
+import time
+import sqlite3
+import threading
+
+try:
+    from answer_cache import corpus_versions, MANIFEST_PATH
+    from profile_normalizer import LAND_BUCKETS_ACRES, INCOME_BUCKETS_RUPEES
+except ImportError:  # imported as scripts.eligibility_cache by the app
+    from scripts.answer_cache import corpus_versions, MANIFEST_PATH
+    from scripts.profile_normalizer import LAND_BUCKETS_ACRES, INCOME_BUCKETS_RUPEES
+
+# ---------- CONFIG ----------
+ELIGIBILITY_CACHE_PATH = os.getenv(
+    "ELIGIBILITY_CACHE_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "eligibility_cache.sqlite"),
+)
+ELIGIBILITY_CACHE_TTL = int(os.getenv("ELIGIBILITY_CACHE_TTL", str(7 * 24 * 3600)))  # seconds
+
+
+class EligibilityCache:
+    """
+    Eligibility JSON from rag(), persisted in SQLite per (normalized profile
+    key, language) so it survives restarts and is shared by every worker.
+    Rows are ignored once older than `ttl` or built against a different
+    corpus version (see answer_cache.corpus_versions).
+    """
+
+    def __init__(self, path: str = ELIGIBILITY_CACHE_PATH, ttl: int = ELIGIBILITY_CACHE_TTL,
+                 manifest_path: str = MANIFEST_PATH):
+        self.ttl = ttl
+        self.manifest_path = manifest_path
+        self.manifest_mtime = -1
+        self.corpus_version = None
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.execute("""
+            CREATE TABLE IF NOT EXISTS eligibility (
+                profile_key TEXT NOT NULL,
+                language TEXT NOT NULL,
+                profile TEXT NOT NULL,
+                response TEXT NOT NULL,
+                corpus_version TEXT,
+                created REAL NOT NULL,
+                seconds REAL NOT NULL,
+                hits INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (profile_key, language)
+            )
+        """)
+        self.db.commit()
+        self.counters = {"hits": 0, "misses": 0, "stale": 0}
+        self.saved_seconds = 0.0
+
+    def _current_version(self) -> str | None:
+        mtime = os.path.getmtime(self.manifest_path) if os.path.exists(self.manifest_path) else None
+        if mtime != self.manifest_mtime:
+            self.manifest_mtime = mtime
+            self.corpus_version = corpus_versions(self.manifest_path).get(None)
+        return self.corpus_version
+
+    def get(self, profile_key: str, language: str) -> str | None:
+        language = language.lower()
+        with self.lock:
+            row = self.db.execute(
+                "SELECT response, corpus_version, created, seconds FROM eligibility WHERE profile_key = ? AND language = ?",
+                (profile_key, language),
+            ).fetchone()
+            if row and (row[1] != self._current_version() or time.time() - row[2] > self.ttl):
+                self.counters["stale"] += 1
+                row = None
+            if row is None:
+                self.counters["misses"] += 1
+                return None
+            self.db.execute(
+                "UPDATE eligibility SET hits = hits + 1 WHERE profile_key = ? AND language = ?",
+                (profile_key, language),
+            )
+            self.db.commit()
+            self.counters["hits"] += 1
+            self.saved_seconds += row[3]
+            return row[0]
+
+    def put(self, profile_key: str, language: str, profile: dict, response: str, seconds: float):
+        with self.lock:
+            self.db.execute(
+                "INSERT OR REPLACE INTO eligibility VALUES (?, ?, ?, ?, ?, ?, ?, 0)",
+                (profile_key, language.lower(), json.dumps(profile, ensure_ascii=False), response,
+                 self._current_version(), time.time(), seconds),
+            )
+            self.db.commit()
+
+    def stats(self) -> dict:
+        """
+        Process counters plus what the table says about bucket granularity:
+        how many distinct profiles were seen and how often each got reused.
+        """
+        with self.lock:
+            entries, profiles, reused, total_hits, avg_seconds = self.db.execute(
+                "SELECT COUNT(*), COUNT(DISTINCT profile_key), SUM(hits > 0), SUM(hits), AVG(seconds) FROM eligibility"
+            ).fetchone()
+            lookups = self.counters["hits"] + self.counters["misses"]
+            return {
+                **self.counters,
+                "hit_ratio": round(self.counters["hits"] / lookups, 4) if lookups else 0.0,
+                "saved_s": round(self.saved_seconds, 2),
+                "entries": entries,
+                "distinct_profiles": profiles,
+                "reused_entries": reused or 0,
+                "lifetime_hits": total_hits or 0,
+                "avg_llm_s": round(avg_seconds or 0.0, 2),
+                "land_buckets_acres": list(LAND_BUCKETS_ACRES),
+                "income_buckets_rupees": list(INCOME_BUCKETS_RUPEES),
+            }
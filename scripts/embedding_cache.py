@@ -0,0 +1,269 @@
+import os
+import re
+import json
+import atexit
+import hashlib
+import threading
+import unicodedata
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+# ---------- CONFIG ----------
+EMBED_CACHE_DIR = os.getenv(
+    "EMBED_CACHE_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "embedding_cache"),
+)
+# Ingest embeds chunks while the app may be serving queries; each gets its own directory
+INGEST_EMBED_CACHE_DIR = os.getenv("INGEST_EMBED_CACHE_DIR", os.path.join(EMBED_CACHE_DIR, "ingest"))
+EMBED_CACHE_MAX_ENTRIES = int(os.getenv("EMBED_CACHE_MAX_ENTRIES", "50000"))
+INITIAL_ROWS = 1024
+# Evict this fraction of the cache at once when it is full, so eviction
+# isn't paid on every single insert
+EVICT_FRACTION = 0.1
+FLUSH_EVERY = 256
+# encode() kwargs that don't change the vectors, so they stay out of the key
+NEUTRAL_KWARGS = {"show_progress_bar", "batch_size", "device", "convert_to_numpy"}
+
+
+def normalize_text(text: str) -> str:
+    text = unicodedata.normalize("NFKC", text)
+    return re.sub(r"\s+", " ", text).strip()
+
+
+def text_key(text: str, variant: str = "") -> str:
+    """`variant` folds in encode kwargs that change the vector (normalize_embeddings, ...)."""
+    payload = f"{variant}\0{normalize_text(text)}" if variant else normalize_text(text)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+def encode_variant(kwargs: dict) -> str:
+    relevant = {k: v for k, v in kwargs.items() if k not in NEUTRAL_KWARGS}
+    return json.dumps(relevant, sort_keys=True, default=str) if relevant else ""
+
+
+def try_lock(f) -> bool:
+    """Exclusive, non-blocking lock on an open file; released when the file is closed."""
+    try:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        else:
+            msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+        return True
+    except OSError:
+        return False
+
+
+class EmbeddingCache:
+    """
+    Content-addressed embedding cache keyed by (model name, normalized text
+    hash). Vectors live in a memory-mapped float32 matrix, one row per text;
+    a JSON index maps keys to rows and tracks recency for LRU eviction once
+    `max_entries` rows are used.
+
+    Drop-in for SentenceTransformer.encode(): only cache misses reach the
+    model, and the model itself is loaded on the first miss, so a process
+    that only ever hits the cache never pays the load.
+
+    Rows are reused on eviction, so a second process with its own view of
+    the index would overwrite vectors the first one hands out. One process
+    per cache directory is enforced with a lock file: a process that can't
+    get it encodes straight through the model without touching the cache.
+    Ingest uses INGEST_EMBED_CACHE_DIR so it can run while the app serves.
+    """
+
+    def __init__(
+        self,
+        model_name: str = "all-MiniLM-L6-v2",
+        model=None,
+        cache_dir: str = EMBED_CACHE_DIR,
+        max_entries: int = EMBED_CACHE_MAX_ENTRIES,
+        model_loader=None,
+    ):
+        self.model_name = model_name
+        self._model = model
+        self._model_loader = model_loader  # called on the first miss instead of loading a private copy
+        self.max_entries = max_entries
+        safe_name = re.sub(r"[^A-Za-z0-9_.-]", "_", model_name)
+        os.makedirs(cache_dir, exist_ok=True)
+        self.matrix_path = os.path.join(cache_dir, f"{safe_name}.f32")
+        self.index_path = os.path.join(cache_dir, f"{safe_name}.index.json")
+        self.lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._unflushed = 0
+
+        self.slots = {}  # key -> [row, last_used]
+        self.free_rows = []
+        self.clock = 0
+        self.dim = None
+        self.rows = 0
+        self.matrix = None
+        self._lock_file = open(os.path.join(cache_dir, f"{safe_name}.lock"), "a+")
+        self.enabled = try_lock(self._lock_file)
+        if self.enabled:
+            self._load()
+            atexit.register(self.flush)
+        else:
+            self._lock_file.close()
+            print(f"Embedding cache {cache_dir} is in use by another process; encoding without it")
+
+    # ---------- model ----------
+    @property
+    def model(self):
+        if self._model is None:
+            if self._model_loader is not None:
+                self._model = self._model_loader()
+            else:
+                from sentence_transformers import SentenceTransformer
+                self._model = SentenceTransformer(self.model_name)
+        return self._model
+
+    def get_sentence_embedding_dimension(self) -> int:
+        if self.dim is None:
+            self.dim = self.model.get_sentence_embedding_dimension()
+        return self.dim
+
+    # ---------- storage ----------
+    def _load(self):
+        if not (os.path.exists(self.index_path) and os.path.exists(self.matrix_path)):
+            return
+        with open(self.index_path, "r", encoding="utf-8") as f:
+            index = json.load(f)
+        if index.get("model") != self.model_name:
+            return
+        self.dim = index["dim"]
+        self.rows = index["rows"]
+        self.clock = index["clock"]
+        self.slots = {key: list(slot) for key, slot in index["slots"].items()}
+        used = {row for row, _ in self.slots.values()}
+        self.free_rows = sorted(set(range(self.rows)) - used, reverse=True)
+        self.matrix = np.memmap(self.matrix_path, dtype=np.float32, mode="r+", shape=(self.rows, self.dim))
+
+    def _grow(self):
+        new_rows = min(self.max_entries, max(INITIAL_ROWS, self.rows * 2))
+        if self.matrix is not None:
+            self.matrix.flush()
+            del self.matrix
+        mode = "r+" if self.rows else "w+"
+        if mode == "r+":
+            with open(self.matrix_path, "r+b") as f:
+                f.truncate(new_rows * self.dim * 4)
+        self.matrix = np.memmap(self.matrix_path, dtype=np.float32, mode=mode, shape=(new_rows, self.dim))
+        self.free_rows = list(range(new_rows - 1, self.rows - 1, -1)) + self.free_rows
+        self.rows = new_rows
+
+    def _evict(self):
+        count = max(1, int(len(self.slots) * EVICT_FRACTION))
+        oldest = sorted(self.slots.items(), key=lambda item: item[1][1])[:count]
+        for key, (row, _) in oldest:
+            del self.slots[key]
+            self.free_rows.append(row)
+        self.evictions += count
+
+    def _allocate(self) -> int:
+        if not self.free_rows:
+            if self.rows < self.max_entries:
+                self._grow()
+            else:
+                self._evict()
+        return self.free_rows.pop()
+
+    def flush(self):
+        with self.lock:
+            if self.matrix is None:
+                return
+            self.matrix.flush()
+            index = {
+                "model": self.model_name,
+                "dim": self.dim,
+                "rows": self.rows,
+                "clock": self.clock,
+                "slots": self.slots,
+            }
+            tmp_path = self.index_path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(index, f)
+            os.replace(tmp_path, self.index_path)
+            self._unflushed = 0
+
+    # ---------- encode ----------
+    def encode(self, sentences, batch_size: int = 32, **kwargs):
+        """
+        Same contract as SentenceTransformer.encode(): a single string gives
+        a 1-D array, a list gives a 2-D array. Extra kwargs are passed to
+        the model for the misses.
+        """
+        single = isinstance(sentences, str)
+        texts = [sentences] if single else list(sentences)
+        if not self.enabled:
+            with self.lock:
+                self.misses += len(texts)
+            kwargs.setdefault("show_progress_bar", False)
+            out = np.asarray(self.model.encode(texts, batch_size=batch_size, **kwargs), dtype=np.float32)
+            return out[0] if single else out
+        variant = encode_variant(kwargs)
+        keys = [text_key(text, variant) for text in texts]
+
+        # Copy hits out while holding the lock, so nothing inserted below
+        # (or by another thread) can evict a row before it has been read
+        hit_vectors = {}
+        miss_texts = {}
+        with self.lock:
+            for key, text in zip(keys, texts):
+                slot = self.slots.get(key)
+                if slot is not None:
+                    self.clock += 1
+                    slot[1] = self.clock
+                    hit_vectors[key] = np.array(self.matrix[slot[0]])
+                    self.hits += 1
+                elif key in hit_vectors or key in miss_texts:
+                    self.hits += 1
+                else:
+                    miss_texts[key] = text
+                    self.misses += 1
+
+        fresh = {}
+        if miss_texts:
+            kwargs.setdefault("show_progress_bar", False)
+            vectors = np.asarray(
+                self.model.encode(list(miss_texts.values()), batch_size=batch_size, **kwargs),
+                dtype=np.float32,
+            )
+            fresh = dict(zip(miss_texts, vectors))
+
+            with self.lock:
+                if self.dim is None:
+                    self.dim = vectors.shape[1]
+                for key, vector in fresh.items():
+                    if key in self.slots:
+                        continue
+                    row = self._allocate()
+                    self.matrix[row] = vector
+                    self.clock += 1
+                    self.slots[key] = [row, self.clock]
+                self._unflushed += len(fresh)
+                if self._unflushed >= FLUSH_EVERY:
+                    self.flush()
+
+        vectors_by_key = {**hit_vectors, **fresh}
+        out = np.stack([vectors_by_key[key] for key in keys]).astype(np.float32, copy=False)
+        return out[0] if single else out
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "model": self.model_name,
+            "enabled": self.enabled,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+            "entries": len(self.slots),
+            "max_entries": self.max_entries,
+            "evictions": self.evictions,
+        }
@@ -0,0 +1,83 @@
+"""
+Export the embedding model to ONNX for EMBEDDING_BACKEND=onnx: the
+transformer as model.onnx, a dynamically int8-quantized copy as
+model_int8.onnx, plus the fast tokenizer and the pooling settings the
+runtime needs (meta.json). Run once wherever torch is installed; the
+serving workers then only need onnxruntime and tokenizers.
+
+    python scripts/export_onnx.py
+    python scripts/bench_embedder.py      # parity + latency check afterwards
+"""
+import os
+import sys
+import json
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from onnx_embedder import ONNX_MODEL_DIR, model_dir
+
+# ---------- CONFIG ----------
+EMBEDDING_MODEL_NAME = "all-MiniLM-L6-v2"
+OPSET = 14
+
+
+def export(model_name: str, root: str = ONNX_MODEL_DIR) -> str:
+    import torch
+    from sentence_transformers import SentenceTransformer
+    from sentence_transformers.models import Normalize, Pooling
+    from onnxruntime.quantization import quantize_dynamic, QuantType
+
+    path = model_dir(model_name, root)
+    os.makedirs(path, exist_ok=True)
+    st = SentenceTransformer(model_name, device="cpu")
+    transformer = st[0].auto_model.eval()
+    tokenizer = st.tokenizer
+
+    pooling = [m for m in st if isinstance(m, Pooling)]
+    if pooling and not pooling[0].pooling_mode_mean_tokens:
+        sys.exit(f"{model_name} doesn't use mean pooling; the ONNX runtime only implements mean pooling")
+
+    sample = tokenizer(["a sample sentence", "another one"], padding=True, return_tensors="pt")
+    input_names = [name for name in ("input_ids", "attention_mask", "token_type_ids") if name in sample]
+    dynamic = {name: {0: "batch", 1: "sequence"} for name in input_names}
+    dynamic["last_hidden_state"] = {0: "batch", 1: "sequence"}
+
+    model_path = os.path.join(path, "model.onnx")
+    with torch.no_grad():
+        torch.onnx.export(
+            transformer,
+            tuple(sample[name] for name in input_names),
+            model_path,
+            input_names=input_names,
+            output_names=["last_hidden_state"],
+            dynamic_axes=dynamic,
+            opset_version=OPSET,
+        )
+    quantize_dynamic(model_path, os.path.join(path, "model_int8.onnx"), weight_type=QuantType.QInt8)
+
+    tokenizer.backend_tokenizer.save(os.path.join(path, "tokenizer.json"))
+    meta = {
+        "model": model_name,
+        "dim": st.get_sentence_embedding_dimension(),
+        "max_seq_length": st.max_seq_length,
+        "normalize": any(isinstance(m, Normalize) for m in st),
+        "pad_id": tokenizer.pad_token_id,
+        "pad_token": tokenizer.pad_token,
+        "opset": OPSET,
+    }
+    with open(os.path.join(path, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump(meta, f, indent=1)
+    return path
+
+
+# ---------- MAIN ----------
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export the embedding model to (int8) ONNX.")
+    parser.add_argument("--model", default=EMBEDDING_MODEL_NAME)
+    parser.add_argument("--output", default=ONNX_MODEL_DIR, help="Root directory for exported models.")
+    args = parser.parse_args()
+
+    path = export(args.model, args.output)
+    for name in ("model.onnx", "model_int8.onnx"):
+        print(f"{name}: {os.path.getsize(os.path.join(path, name)) / 1e6:.1f} MB")
+    print(f"Exported {args.model} to {path}")
@@ -0,0 +1,176 @@
+import os
+import re
+import json
+import math
+import numpy as np
+from collections import Counter
+
+try:
+    from compact_index import matches_where
+except ImportError:  # imported as scripts.hybrid_search by the app
+    from scripts.compact_index import matches_where
+
+# ---------- CONFIG ----------
+BM25_K1 = 1.5
+BM25_B = 0.75
+RRF_K = 60  # reciprocal rank fusion damping; 60 is the usual default
+CANDIDATES = 20  # taken from each ranker before fusing
+INDEX_VERSION = 1
+
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "has", "have", "i", "in", "is", "it",
+    "its", "me", "my", "of", "on", "or", "shall", "that", "the", "this", "to", "was", "were", "will", "with",
+}
+
+
+def tokenize(text: str) -> list[str]:
+    """Lowercased word tokens; numbers and roman numerals are kept ("annexure ii", "2018")."""
+    return [token for token in re.findall(r"\w+", (text or "").lower()) if token not in STOPWORDS]
+
+
+class BM25Index:
+    """
+    In-process inverted index over the chunk collection, built by ingest
+    and loaded once by the RAG router. Postings are numpy arrays per term,
+    so a query only touches the documents that contain its terms.
+    """
+
+    def __init__(self, k1: float = BM25_K1, b: float = BM25_B):
+        self.k1, self.b = k1, b
+        self.ids = []
+        self.metadatas = []
+        self.lengths = np.zeros(0, dtype=np.float32)
+        self.postings = {}  # term -> (doc indexes, term frequencies)
+
+    # ---------- build / persist ----------
+    @classmethod
+    def build(cls, ids: list[str], documents: list[str], metadatas: list[dict] | None = None) -> "BM25Index":
+        index = cls()
+        index.ids = list(ids)
+        index.metadatas = list(metadatas or [{} for _ in ids])
+        lengths = []
+        postings = {}
+        for doc, text in enumerate(documents):
+            counts = Counter(tokenize(text))
+            lengths.append(sum(counts.values()))
+            for term, tf in counts.items():
+                postings.setdefault(term, ([], []))
+                postings[term][0].append(doc)
+                postings[term][1].append(tf)
+        index.lengths = np.array(lengths, dtype=np.float32)
+        index.postings = {
+            term: (np.array(docs, dtype=np.int32), np.array(tfs, dtype=np.float32))
+            for term, (docs, tfs) in postings.items()
+        }
+        return index
+
+    @classmethod
+    def from_collection(cls, collection) -> "BM25Index":
+        stored = collection.get(include=["documents", "metadatas"])
+        return cls.build(stored["ids"], stored["documents"], stored["metadatas"])
+
+    def save(self, path: str):
+        data = {
+            "version": INDEX_VERSION,
+            "k1": self.k1,
+            "b": self.b,
+            "ids": self.ids,
+            "metadatas": self.metadatas,
+            "lengths": self.lengths.tolist(),
+            "postings": {term: [docs.tolist(), tfs.tolist()] for term, (docs, tfs) in self.postings.items()},
+        }
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> "BM25Index | None":
+        if not os.path.exists(path):
+            return None
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        if data.get("version") != INDEX_VERSION:
+            return None
+        index = cls(data["k1"], data["b"])
+        index.ids = data["ids"]
+        index.metadatas = data["metadatas"]
+        index.lengths = np.array(data["lengths"], dtype=np.float32)
+        index.postings = {
+            term: (np.array(docs, dtype=np.int32), np.array(tfs, dtype=np.float32))
+            for term, (docs, tfs) in data["postings"].items()
+        }
+        return index
+
+    # ---------- search ----------
+    def search(self, query: str, n_results: int = CANDIDATES, where: dict | None = None) -> list[tuple[str, float]]:
+        """Top (id, score) pairs for the query, best first."""
+        n_docs = len(self.ids)
+        if not n_docs:
+            return []
+        avgdl = float(self.lengths.mean()) or 1.0
+        scores = np.zeros(n_docs, dtype=np.float32)
+        for term in set(tokenize(query)):
+            if term not in self.postings:
+                continue
+            docs, tfs = self.postings[term]
+            idf = math.log(1 + (n_docs - len(docs) + 0.5) / (len(docs) + 0.5))
+            norm = self.k1 * (1 - self.b + self.b * self.lengths[docs] / avgdl)
+            scores[docs] += idf * tfs * (self.k1 + 1) / (tfs + norm)
+
+        hits = np.flatnonzero(scores)
+        if where:
+            hits = np.array([doc for doc in hits if matches_where(self.metadatas[doc], where)], dtype=np.int64)
+        if not len(hits):
+            return []
+        if len(hits) > n_results:
+            hits = hits[np.argpartition(-scores[hits], n_results - 1)[:n_results]]
+        hits = hits[np.argsort(-scores[hits])]
+        return [(self.ids[doc], float(scores[doc])) for doc in hits]
+
+
+def reciprocal_rank_fusion(rankings: list[list[str]], k: int = RRF_K) -> list[tuple[str, float]]:
+    """Fuse several best-first ID lists: score = sum of 1 / (k + rank)."""
+    scores = {}
+    for ranking in rankings:
+        for rank, cid in enumerate(ranking, start=1):
+            scores[cid] = scores.get(cid, 0.0) + 1.0 / (k + rank)
+    return sorted(scores.items(), key=lambda item: -item[1])
+
+
+def hybrid_search(
+    collection,
+    bm25: BM25Index | None,
+    embedding_model,
+    query: str,
+    n_results: int,
+    where: dict | None = None,
+    dense_query: str | None = None,
+) -> dict:
+    """
+    Dense (collection) and BM25 candidates fused by reciprocal rank, in the
+    same shape as collection.query() so callers don't change; "scores"
+    holds the fused scores. Without a BM25 index this is the dense search.
+    `dense_query` lets the embedding use different text than the keywords.
+    """
+    embedding = embedding_model.encode(dense_query or query).tolist()
+    if bm25 is None:
+        return collection.query(query_embeddings=embedding, n_results=n_results, where=where)
+
+    dense = collection.query(query_embeddings=embedding, n_results=max(n_results, CANDIDATES), where=where)
+    sparse = bm25.search(query, max(n_results, CANDIDATES), where)
+    fused = reciprocal_rank_fusion([dense["ids"][0], [cid for cid, _ in sparse]])[:n_results]
+
+    known = {cid: (doc, meta) for cid, doc, meta in zip(dense["ids"][0], dense["documents"][0], dense["metadatas"][0])}
+    missing = [cid for cid, _ in fused if cid not in known]
+    if missing:
+        fetched = collection.get(ids=missing, include=["documents", "metadatas"])
+        known.update({cid: (doc, meta) for cid, doc, meta in zip(fetched["ids"], fetched["documents"], fetched["metadatas"])})
+
+    fused = [(cid, score) for cid, score in fused if cid in known]
+    return {
+        "ids": [[cid for cid, _ in fused]],
+        "documents": [[known[cid][0] for cid, _ in fused]],
+        "metadatas": [[known[cid][1] for cid, _ in fused]],
+        "scores": [[round(score, 5) for _, score in fused]],
+    }
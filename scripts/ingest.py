@@ -1,223 +1,845 @@
 import os
+import json
 import base64
+import hashlib
+import time
+import queue
+import argparse
+import threading
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from concurrent.futures import ProcessPoolExecutor
 import fitz  # PyMuPDF
 import chromadb
-from langchain_community.document_loaders import PyPDFLoader
-from langchain_text_splitters import RecursiveCharacterTextSplitter
 from sentence_transformers import SentenceTransformer
-from groq import Groq
 from dotenv import load_dotenv
+from ocr import OcrEngine
+from chunker import StructuredChunker, page_units, text_units, CHUNK_SIZE, MIN_CHUNK_CHARS
+from embedding_cache import EmbeddingCache, INGEST_EMBED_CACHE_DIR
+from dedup import DedupIndex, minhash
+from schemes import scheme_id_for_file
+from hybrid_search import BM25Index
+from scheme_summaries import refresh_summaries, SUMMARY_LANGUAGES
+from compact_index import CompactIndex, CODE_DTYPES, COMPACT_DIR, VECTOR_STORAGE, VECTOR_RESCORE
 
 load_dotenv()
 
 # ---------- CONFIG ----------
 PDF_DIR = r"C:\M_Indicator_Hackathon\VJTI-M-Indicator-Hackathon\data_sources"
 CHROMA_DB_PATH = r"C:\M_Indicator_Hackathon\VJTI-M-Indicator-Hackathon\scripts\chroma_db"
+# Artifacts the app reads live next to this file, wherever the checkout is (rag.py looks there)
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
 COLLECTION_NAME = "farmer_schemes"
-CHUNK_SIZE = 1500
-CHUNK_OVERLAP = 250
+EMBEDDING_MODEL_NAME = "all-MiniLM-L6-v2"
 MIN_CHARS_PER_PAGE = 50
-
-
-# ---------- GROQ OCR ----------
-groq_client = Groq()
-
-
-def ocr_page(pdf_path: str, page_number: int) -> str:
+MANIFEST_PATH = os.path.join(SCRIPTS_DIR, "ingest_manifest.json")
+MANIFEST_VERSION = 5
+DEDUP_INDEX_PATH = os.path.join(SCRIPTS_DIR, "dedup_index.json")
+BM25_INDEX_PATH = os.path.join(SCRIPTS_DIR, "bm25_index.json")
+EXTRACT_WORKERS = os.cpu_count() or 1
+PAGES_PER_TASK = 8
+EMBED_BATCH_SIZE = 64
+PAGE_QUEUE_SIZE = 32
+CHUNK_QUEUE_SIZE = 256
+BATCH_QUEUE_SIZE = 2
+REPORT_DIR = os.path.join(SCRIPTS_DIR, "ingest_reports")
+RENDER_DPI = 150
+RENDER_MAX_DIM = 1024
+
+
+# ---------- PAGE SOURCE ----------
+def render_page_png(page) -> bytes:
     """
-    Convert a single PDF page to image using PyMuPDF
-    and extract text via Groq Vision.
-    page_number is 0-indexed.
+    Render a PyMuPDF page to PNG for OCR in a single pass: 150 DPI, scaled
+    down up front so the longest side is at most RENDER_MAX_DIM pixels.
     """
-    doc = fitz.open(pdf_path)
-    page = doc[page_number]
-
-    # Render page to PNG at 150 DPI to reduce payload size
-    pix = page.get_pixmap(dpi=150)
-    
-    # If the image is still massive, resize it to a max dimension
-    max_dim = 1024
-    if pix.width > max_dim or pix.height > max_dim:
-        scale = max_dim / max(pix.width, pix.height)
-        matrix = fitz.Matrix(scale, scale)
-        pix = page.get_pixmap(matrix=matrix, dpi=150)
+    zoom = RENDER_DPI / 72
+    longest = max(page.rect.width, page.rect.height) * zoom
+    if longest > RENDER_MAX_DIM:
+        zoom *= RENDER_MAX_DIM / longest
+    pix = page.get_pixmap(matrix=fitz.Matrix(zoom, zoom))
+    return pix.tobytes("png")
 
-    image_bytes = pix.tobytes("png")
-    image_base64 = base64.b64encode(image_bytes).decode()
-    doc.close()
-
-    # Send to Groq Vision
-    response = groq_client.chat.completions.create(
-        model="meta-llama/llama-4-scout-17b-16e-instruct",
-        messages=[
-            {
-                "role": "user",
-                "content": [
-                    {
-                        "type": "text",
-                        "text": "Extract ALL text from this document image. Return only the extracted text, nothing else. Preserve the structure and formatting.",
-                    },
-                    {
-                        "type": "image_url",
-                        "image_url": {
-                            "url": f"data:image/png;base64,{image_base64}"
-                        },
-                    },
-                ],
-            }
-        ],
-        temperature=0.1,
-        max_completion_tokens=2048,
-    )
 
-    return response.choices[0].message.content
+def iter_pages(doc, pages: list[int] | None = None):
+    """
+    Stream pages from an open PyMuPDF document. Yields one dict per
+    1-indexed page with its text, whether it looks scanned, its layout
+    units (see chunker.page_units) and a `render` callable that only
+    rasterises the page if asked.
+    """
+    if pages is None:
+        pages = range(1, doc.page_count + 1)
+    for page_number in pages:
+        page = doc[page_number - 1]
+        text = page.get_text().strip()
+        scanned = len(text) < MIN_CHARS_PER_PAGE
+        yield {
+            "page": page_number,
+            "text": text,
+            "scanned": scanned,
+            "units": None if scanned else page_units(page),
+            "render": lambda page=page: render_page_png(page),
+        }
+
+
+def read_pages(doc, pages: list[int] | None = None) -> dict[int, dict]:
+    """
+    Read text for the given pages off one document handle, rendering only
+    the scanned ones. Returns {page: {"text": ..., "units": ..., "image": png or None}}.
+    """
+    return {
+        item["page"]: {
+            "text": item["text"],
+            "units": item["units"],
+            "image": item["render"]() if item["scanned"] else None,
+        }
+        for item in iter_pages(doc, pages)
+    }
 
 
 # ---------- PDF EXTRACTION ----------
-def extract_text_from_pdf(pdf_path: str) -> list[dict]:
+def read_pdf_pages(pdf_path: str, pages: list[int] | None = None) -> dict:
+    """
+    Open a PDF once and read the given pages. Top-level so it can run
+    inside a worker process.
+    """
+    started = time.perf_counter()
+    with fitz.open(pdf_path) as doc:
+        records = read_pages(doc, pages)
+    return {
+        "pdf_path": pdf_path,
+        "records": records,
+        "pid": os.getpid(),
+        "seconds": time.perf_counter() - started,
+    }
+
+
+def iter_page_blocks(jobs: dict[str, list[int]], workers: int = 1):
+    """
+    Yield (pdf_path, records) for every changed page, PAGES_PER_TASK pages
+    at a time, in file and page order. With workers > 1 the blocks are read
+    on a process pool, but only a bounded number are in flight at once so
+    memory stays flat however large the corpus is. Prints per-worker
+    throughput at the end.
+    """
+    tasks = []
+    for pdf_path, pages in jobs.items():
+        pages = sorted(pages)
+        for start in range(0, len(pages), PAGES_PER_TASK):
+            tasks.append((pdf_path, pages[start:start + PAGES_PER_TASK]))
+    if not tasks:
+        return
+
+    if workers <= 1:
+        # One document handle per file, read block by block
+        for pdf_path, pages in jobs.items():
+            with fitz.open(pdf_path) as doc:
+                pages = sorted(pages)
+                for start in range(0, len(pages), PAGES_PER_TASK):
+                    yield pdf_path, read_pages(doc, pages[start:start + PAGES_PER_TASK])
+        return
+
+    per_worker = {}
+    total_pages = 0
+    started = time.perf_counter()
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+        task_iter = iter(tasks)
+        for pdf_path, pages in task_iter:
+            pending.append(pool.submit(read_pdf_pages, pdf_path, pages))
+            if len(pending) >= workers * 2:
+                break
+        while pending:
+            # Consume in submission order so the output order is deterministic
+            result = pending.popleft().result()
+            next_task = next(task_iter, None)
+            if next_task:
+                pending.append(pool.submit(read_pdf_pages, *next_task))
+
+            stats = per_worker.setdefault(result["pid"], {"pages": 0, "seconds": 0.0})
+            stats["pages"] += len(result["records"])
+            stats["seconds"] += result["seconds"]
+            total_pages += len(result["records"])
+            yield result["pdf_path"], result["records"]
+
+    elapsed = time.perf_counter() - started
+    print(f"\nRead {total_pages} pages with {workers} workers in {elapsed:.2f}s")
+    for pid, stats in sorted(per_worker.items()):
+        rate = stats["pages"] / stats["seconds"] if stats["seconds"] else 0.0
+        print(f"  worker {pid}: {stats['pages']} pages, {stats['seconds']:.2f}s busy, {rate:.1f} pages/s")
+
+
+def extract_text_from_pdf(
+    pdf_path: str,
+    pages: set[int] | None = None,
+    records: dict[int, dict] | None = None,
+    ocr_engine: OcrEngine | None = None,
+) -> list[dict]:
     """
     Extract text from a PDF.
-    Auto-detects scanned vs text-based pages.
+    Auto-detects scanned vs text-based pages; scanned pages are OCR'd
+    concurrently through `ocr_engine`.
+    If `pages` is given, only those 1-indexed pages are extracted / OCR'd.
+    `records` lets the caller pass in pages already read by read_pages()
+    (the streaming pipeline hands over one block at a time).
     """
-    loader = PyPDFLoader(pdf_path)
-    docs = loader.load()
+    if ocr_engine is None:
+        ocr_engine = OcrEngine()
+    if records is None:
+        records = read_pdf_pages(pdf_path, sorted(pages) if pages is not None else None)["records"]
     filename = os.path.basename(pdf_path)
     scheme_name = os.path.splitext(filename)[0]
+    scheme_id = scheme_id_for_file(scheme_name)
 
     results = []
+    scanned = {}
 
-    for i, doc in enumerate(docs):
-        page_text = doc.page_content.strip()
+    for page_number, record in sorted(records.items()):
+        if pages is not None and page_number not in pages:
+            continue
+        page_text = record["text"]
 
-        if len(page_text) >= MIN_CHARS_PER_PAGE:
+        if record["image"] is None:
             # Text-based page
-            print(f"  Page {i+1}: text-based ({len(page_text)} chars)")
+            print(f"  Page {page_number}: text-based ({len(page_text)} chars)")
             results.append({
                 "page_content": page_text,
+                "units": record["units"],
                 "metadata": {
                     "source": pdf_path,
                     "scheme_name": scheme_name,
-                    "page": i + 1,
+                    "scheme_id": scheme_id,
+                    "page": page_number,
                     "extraction_method": "text",
                 },
             })
         else:
-            # Scanned page — run OCR via Groq
-            print(f"  Page {i+1}: scanned, running Groq OCR...")
-            try:
-                ocr_text = ocr_page(pdf_path, page_number=i)
-                if ocr_text and ocr_text.strip():
-                    results.append({
-                        "page_content": ocr_text,
-                        "metadata": {
-                            "source": pdf_path,
-                            "scheme_name": scheme_name,
-                            "page": i + 1,
-                            "extraction_method": "ocr_groq",
-                        },
-                    })
-                else:
-                    print(f"  Page {i+1}: OCR returned empty, skipping")
-            except Exception as e:
-                print(f"  Page {i+1}: Groq API error ({e}), skipping to save progress")
+            # Scanned page — queue for Groq OCR
+            print(f"  Page {page_number}: scanned, queued for Groq OCR")
+            scanned[page_number] = record["image"]
+
+    if scanned:
+        print(f"  Running OCR on {len(scanned)} pages...")
+        for page_number, ocr_text in sorted(ocr_engine.ocr_many(scanned).items()):
+            if isinstance(ocr_text, Exception):
+                print(f"  Page {page_number}: Groq API error ({ocr_text}), skipping to save progress")
+            elif ocr_text.strip():
+                results.append({
+                    "page_content": ocr_text,
+                    "units": text_units(ocr_text),
+                    "metadata": {
+                        "source": pdf_path,
+                        "scheme_name": scheme_name,
+                        "scheme_id": scheme_id,
+                        "page": page_number,
+                        "extraction_method": "ocr_groq",
+                    },
+                })
+            else:
+                print(f"  Page {page_number}: OCR returned empty, skipping")
 
+    results.sort(key=lambda doc: doc["metadata"]["page"])
     return results
 
 
 # ---------- CHUNKING ----------
-def chunk_documents(documents: list[dict]) -> list[dict]:
+def chunk_documents(documents: list[dict], chunker: StructuredChunker | None = None) -> list[dict]:
     """
-    Split documents into smaller chunks for embedding.
+    Split page documents into chunks along their layout units: headings,
+    table rows and numbered clauses are never cut, and every chunk carries
+    the section path it sits under. Pass the same `chunker` for consecutive
+    pages of a file so sections carry over page breaks.
     """
-    splitter = RecursiveCharacterTextSplitter(
-        chunk_size=CHUNK_SIZE,
-        chunk_overlap=CHUNK_OVERLAP,
-    )
+    if chunker is None:
+        chunker = StructuredChunker()
 
     all_chunks = []
 
     for doc in documents:
-        text_chunks = splitter.split_text(doc["page_content"])
-
-        for chunk_text in text_chunks:
-            all_chunks.append({
-                "page_content": chunk_text,
-                "metadata": doc["metadata"],
-            })
+        units = doc.get("units")
+        if units is None:
+            units = text_units(doc["page_content"])
+        all_chunks.extend(chunker.chunk_page(units, doc["metadata"]))
 
     return all_chunks
 
 
-# ---------- EMBED & STORE ----------
-def embed_and_store(chunks: list[dict], collection, embedding_model):
+# ---------- MANIFEST ----------
+def file_sha256(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def page_hashes(doc) -> dict[int, str]:
+    """
+    Fingerprint every page (1-indexed) of an open document from its content
+    stream and embedded image streams, without extracting text or rendering.
+    """
+    hashes = {}
+    for i, page in enumerate(doc):
+        h = hashlib.sha256(page.read_contents())
+        h.update(repr(page.rect).encode())
+        for img in page.get_images(full=True):
+            h.update(doc.xref_stream_raw(img[0]) or b"")
+        hashes[i + 1] = h.hexdigest()
+    return hashes
+
+
+def load_manifest() -> dict:
+    if not os.path.exists(MANIFEST_PATH):
+        return {}
+    with open(MANIFEST_PATH, "r", encoding="utf-8") as f:
+        manifest = json.load(f)
+    if manifest.get("version") != MANIFEST_VERSION:
+        return {}
+    return manifest
+
+
+def save_manifest(manifest: dict):
+    # Write to a temp file first so a crash never leaves a half-written manifest
+    manifest["version"] = MANIFEST_VERSION
+    tmp_path = MANIFEST_PATH + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    os.replace(tmp_path, MANIFEST_PATH)
+
+
+def chunk_id(scheme_name: str, page: int, text: str) -> str:
+    """Stable chunk ID derived from (scheme, page, chunk content hash)."""
+    digest = hashlib.sha1(text.encode("utf-8")).hexdigest()[:16]
+    return f"{scheme_name}:p{page}:{digest}"
+
+
+def assign_chunk_ids(chunks: list[dict]) -> list[dict]:
     """
-    Embed chunks and add to ChromaDB in batches.
+    Attach a stable `id` to every chunk. Identical text repeated on the
+    same page maps to the same ID, so only the first copy is kept.
     """
+    seen = set()
+    unique = []
+    for chunk in chunks:
+        meta = chunk["metadata"]
+        cid = chunk_id(meta["scheme_name"], meta["page"], chunk["page_content"])
+        if cid in seen:
+            continue
+        seen.add(cid)
+        unique.append({**chunk, "id": cid})
+    return unique
+
+
+# ---------- EMBED & STORE ----------
+def embed_batch(chunks: list[dict], embedding_model) -> list:
     documents = [chunk["page_content"] for chunk in chunks]
-    metadatas = [chunk["metadata"] for chunk in chunks]
-    ids = [f"chunk_{i}" for i in range(len(chunks))]
-
-    print(f"\nEmbedding {len(documents)} chunks...")
-    embeddings = embedding_model.encode(documents, show_progress_bar=True)
-    embeddings_list = embeddings.tolist()
-
-    BATCH_SIZE = 100
-    for start in range(0, len(documents), BATCH_SIZE):
-        end = min(start + BATCH_SIZE, len(documents))
-        collection.add(
-            documents=documents[start:end],
-            embeddings=embeddings_list[start:end],
-            metadatas=metadatas[start:end],
-            ids=ids[start:end],
+    return embedding_model.encode(documents, batch_size=EMBED_BATCH_SIZE).tolist()
+
+
+def store_batch(collection, chunks: list[dict], embeddings: list, dedup: DedupIndex) -> int:
+    """
+    Write a batch, folding near-duplicates of chunks already stored into
+    those chunks' source lists instead of storing them again. Returns how
+    many chunks were folded.
+    """
+    keep, touched = [], set()
+    for chunk, embedding in zip(chunks, embeddings):
+        canonical = dedup.add(chunk)
+        if canonical == chunk["id"]:
+            keep.append((chunk, embedding))
+        else:
+            touched.add(canonical)
+
+    if keep:
+        collection.upsert(
+            documents=[chunk["page_content"] for chunk, _ in keep],
+            embeddings=[embedding for _, embedding in keep],
+            metadatas=[dedup.metadata(chunk["id"]) for chunk, _ in keep],
+            ids=[chunk["id"] for chunk, _ in keep],
+        )
+    update_sources(collection, dedup, touched - {chunk["id"] for chunk, _ in keep})
+    return len(chunks) - len(keep)
+
+
+def update_sources(collection, dedup: DedupIndex, canonical_ids: set[str]):
+    # Re-upsert rather than update(): update() merges metadata, so an
+    # also_<scheme_id> flag would outlive the member that set it
+    if canonical_ids:
+        stored = collection.get(ids=sorted(canonical_ids), include=["embeddings", "documents"])
+        collection.upsert(
+            ids=stored["ids"],
+            embeddings=stored["embeddings"],
+            documents=stored["documents"],
+            metadatas=[dedup.metadata(cid) for cid in stored["ids"]],
         )
-        print(f"  Added batch {start}-{end}")
+
+
+def delete_stale(collection, stale_ids: list[str]):
+    BATCH_SIZE = 500
+    for start in range(0, len(stale_ids), BATCH_SIZE):
+        collection.delete(ids=stale_ids[start:start + BATCH_SIZE])
+    if stale_ids:
+        print(f"Deleted {len(stale_ids)} stale chunks")
+
+
+def release_chunks(collection, dedup: DedupIndex, chunk_ids: list[str]):
+    """
+    Drop chunks whose page changed or went away. A stored chunk that other
+    pages still point at stays, with those pages as its sources.
+    """
+    deleted, changed = dedup.release(chunk_ids)
+    delete_stale(collection, deleted)
+    update_sources(collection, dedup, changed)
+
+
+# ---------- PROFILING ----------
+def percentile(values: list[float], q: float) -> float:
+    """Nearest-rank percentile; 0.0 for an empty list."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, round(q / 100 * len(ordered)) - 1))
+    return ordered[rank]
+
+
+def latency_summary(values: list[float]) -> dict:
+    return {
+        "count": len(values),
+        "total_s": round(sum(values), 4),
+        "p50_s": round(percentile(values, 50), 4),
+        "p95_s": round(percentile(values, 95), 4),
+        "p99_s": round(percentile(values, 99), 4),
+        "max_s": round(max(values), 4) if values else 0.0,
+    }
+
+
+class IngestProfiler:
+    """
+    Collects per-stage busy time, batch latencies and counters for one
+    ingest run and writes them as a JSON report, so runs can be diffed.
+    Stages run on separate threads, so each stage's time is the time it
+    spent working, not waiting on its queues.
+    """
+
+    def __init__(self, config: dict):
+        self.config = config
+        self.started_at = datetime.now(timezone.utc)
+        self.started = time.perf_counter()
+        self.stages = {}  # stage -> list of durations
+        self.counters = {}
+        self.lock = threading.Lock()
+
+    @contextmanager
+    def timer(self, stage: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(stage, time.perf_counter() - started)
+
+    def record(self, stage: str, seconds: float):
+        with self.lock:
+            self.stages.setdefault(stage, []).append(seconds)
+
+    def count(self, name: str, n: int = 1):
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def report(
+        self,
+        ocr_engine: OcrEngine | None = None,
+        embedding_cache: EmbeddingCache | None = None,
+        dedup: DedupIndex | None = None,
+    ) -> dict:
+        wall = time.perf_counter() - self.started
+        pages = self.counters.get("pages", 0)
+        chunks = self.counters.get("chunks", 0)
+        report = {
+            "started_at": self.started_at.isoformat(),
+            "wall_s": round(wall, 4),
+            "config": self.config,
+            "counters": dict(self.counters),
+            "throughput": {
+                "pages_per_s": round(pages / wall, 3) if wall else 0.0,
+                "chunks_per_s": round(chunks / wall, 3) if wall else 0.0,
+            },
+            "stages": {stage: latency_summary(values) for stage, values in self.stages.items()},
+        }
+        if ocr_engine is not None:
+            report["ocr"] = {**ocr_engine.stats, "latency": latency_summary(ocr_engine.latencies)}
+        if embedding_cache is not None:
+            report["embedding_cache"] = embedding_cache.stats()
+        if dedup is not None:
+            report["dedup"] = dedup.stats()
+        return report
+
+    def write(self, report: dict) -> str:
+        os.makedirs(REPORT_DIR, exist_ok=True)
+        stamp = self.started_at.strftime("%Y%m%dT%H%M%SZ")
+        path = os.path.join(REPORT_DIR, f"ingest_{stamp}.json")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        return path
+
+
+# ---------- STREAMING PIPELINE ----------
+# extract -> chunk -> embed -> store, one thread per stage, joined by bounded
+# queues so only a few pages / batches are ever held in memory. Besides
+# pages and chunks the stream carries checkpoint markers:
+#   ("page", filename, page, hash, chunk_ids, sections)   page fully chunked
+#   ("file", filename, page_hashes, complete)   every page of a file seen
+# They travel in order behind their chunks, so once the store stage has
+# written a batch, every marker attached to it is safe to record in the
+# manifest. That manifest doubles as the resume checkpoint.
+_DONE = object()
+
+
+class Stage(threading.Thread):
+    """Runs fn(inbox, outbox); on failure, stops the pipeline and keeps the error."""
+
+    def __init__(self, name, fn, inbox, outbox, stop):
+        super().__init__(name=name, daemon=True)
+        self.fn, self.inbox, self.outbox, self.stop = fn, inbox, outbox, stop
+        self.error = None
+
+    def run(self):
+        try:
+            self.fn(self.inbox, self.outbox)
+        except BaseException as e:
+            self.error = e
+            self.stop.set()
+        finally:
+            if self.outbox is not None:
+                put(self.outbox, _DONE, self.stop)
+
+
+def put(q: queue.Queue, item, stop: threading.Event):
+    while not stop.is_set():
+        try:
+            q.put(item, timeout=0.5)
+            return
+        except queue.Full:
+            continue
+
+
+def drain(q: queue.Queue, stop: threading.Event):
+    while True:
+        try:
+            item = q.get(timeout=0.5)
+        except queue.Empty:
+            if stop.is_set():
+                return
+            continue
+        if item is _DONE:
+            return
+        yield item
+
+
+def run_pipeline(
+    plan: dict,
+    pending: dict,
+    manifest: dict,
+    collection,
+    embedding_model,
+    workers: int,
+    profiler: IngestProfiler,
+    ocr_engine: OcrEngine,
+    dedup: DedupIndex,
+) -> int:
+    """
+    Stream every changed page in `plan` ({filename: {page: hash}}) through
+    extraction, chunking, embedding and storage. Returns chunks written.
+    Pages whose extraction failed get no marker, and their file stays
+    un-hashed, so the next run retries them.
+    """
+    stop = threading.Event()
+    pages_q = queue.Queue(maxsize=PAGE_QUEUE_SIZE)
+    chunks_q = queue.Queue(maxsize=CHUNK_QUEUE_SIZE)
+    batches_q = queue.Queue(maxsize=BATCH_QUEUE_SIZE)
+    written = [0]
+
+    def extract(_, out):
+        jobs = {os.path.join(PDF_DIR, filename): sorted(changed) for filename, changed in plan.items()}
+        extracted = {filename: set() for filename in plan}
+        blocks = iter_page_blocks(jobs, workers)
+        while not stop.is_set():
+            with profiler.timer("parse"):
+                block = next(blocks, None)
+            if block is None:
+                return
+            pdf_path, records = block
+            filename = os.path.basename(pdf_path)
+            print(f"\n{filename}: pages {min(records)}-{max(records)}")
+            profiler.count("pages", len(records))
+            profiler.count("scanned_pages", sum(1 for r in records.values() if r["image"] is not None))
+            with profiler.timer("ocr"):
+                docs = extract_text_from_pdf(pdf_path, records=records, ocr_engine=ocr_engine)
+            for doc in docs:
+                extracted[filename].add(doc["metadata"]["page"])
+                put(out, doc, stop)
+            if max(records) == max(jobs[pdf_path]):
+                complete = extracted[filename] == set(plan[filename])
+                put(out, ("file", filename, complete), stop)
+
+    def chunk(inbox, out):
+        chunkers = {}  # filename -> (last page chunked, StructuredChunker)
+        for item in drain(inbox, stop):
+            if isinstance(item, tuple):
+                put(out, item, stop)
+                continue
+            meta = item["metadata"]
+            filename = os.path.basename(meta["source"])
+            page = meta["page"]
+            last_page, chunker = chunkers.get(filename, (None, None))
+            if last_page != page - 1:
+                # Resume the heading stack where the previous page left it
+                previous = manifest["files"][filename]["pages"].get(str(page - 1), {})
+                chunker = StructuredChunker(sections=previous.get("sections"))
+            with profiler.timer("chunk"):
+                chunks = assign_chunk_ids(chunk_documents([item], chunker))
+                for c in chunks:
+                    c["minhash"] = minhash(c["page_content"])
+            chunkers[filename] = (page, chunker)
+            profiler.count("chunks", len(chunks))
+            for c in chunks:
+                put(out, c, stop)
+            marker = ("page", filename, page, plan[filename][page], [c["id"] for c in chunks], list(chunker.sections))
+            put(out, marker, stop)
+
+    def embed(inbox, out):
+        chunks, markers = [], []
+
+        def flush():
+            started = time.perf_counter()
+            embeddings = embed_batch(chunks, embedding_model) if chunks else []
+            elapsed = time.perf_counter() - started
+            if chunks:
+                profiler.record("embed_batch", elapsed)
+            print(f"  Embedded batch of {len(chunks)} in {elapsed:.2f}s")
+            put(out, (list(chunks), embeddings, list(markers)), stop)
+            chunks.clear()
+            markers.clear()
+
+        for item in drain(inbox, stop):
+            if isinstance(item, tuple):
+                markers.append(item)
+                if not chunks:
+                    flush()
+                continue
+            chunks.append(item)
+            if len(chunks) >= EMBED_BATCH_SIZE:
+                flush()
+        if chunks or markers:
+            flush()
+
+    def store(inbox, _):
+        files = manifest["files"]
+        for chunks, embeddings, markers in drain(inbox, stop):
+            if chunks:
+                with profiler.timer("store_batch"):
+                    folded = store_batch(collection, chunks, embeddings, dedup)
+                profiler.count("near_duplicates", folded)
+                written[0] += len(chunks) - folded
+            for marker in markers:
+                if marker[0] == "page":
+                    _, filename, page, page_hash, ids, sections = marker
+                    entry = files[filename]["pages"]
+                    old = entry.get(str(page), {}).get("chunk_ids", [])
+                    release_chunks(collection, dedup, sorted(set(old) - set(ids)))
+                    entry[str(page)] = {"hash": page_hash, "chunk_ids": ids, "sections": sections}
+                elif marker[0] == "file":
+                    _, filename, complete = marker
+                    finish_file(collection, dedup, files[filename], **pending[filename])
+                    if not complete:
+                        files[filename]["sha256"] = None
+            with profiler.timer("checkpoint"):
+                dedup.save(DEDUP_INDEX_PATH)
+                save_manifest(manifest)
+            print(f"  Stored {written[0]} chunks so far (checkpoint saved)")
+
+    stages = [
+        Stage("extract", extract, None, pages_q, stop),
+        Stage("chunk", chunk, pages_q, chunks_q, stop),
+        Stage("embed", embed, chunks_q, batches_q, stop),
+        Stage("store", store, batches_q, None, stop),
+    ]
+    for stage in stages:
+        stage.start()
+    for stage in stages:
+        stage.join()
+    for stage in stages:
+        if stage.error:
+            raise stage.error
+
+    return written[0]
+
+
+def finish_file(collection, dedup: DedupIndex, entry: dict, sha256: str, live_pages: set[int]):
+    """
+    All pages of a file went through: drop pages that no longer exist and
+    mark the file as up to date.
+    """
+    for page in [p for p in entry["pages"] if int(p) not in live_pages]:
+        release_chunks(collection, dedup, entry["pages"].pop(page)["chunk_ids"])
+    entry["sha256"] = sha256
 
 
 # ---------- MAIN ----------
-def main():
+def main(full: bool = False, workers: int = EXTRACT_WORKERS, summaries: bool = True):
+    profiler = IngestProfiler({
+        "full": full,
+        "workers": workers,
+        "pages_per_task": PAGES_PER_TASK,
+        "embed_batch_size": EMBED_BATCH_SIZE,
+        "chunk_size": CHUNK_SIZE,
+        "min_chunk_chars": MIN_CHUNK_CHARS,
+        "embedding_model": EMBEDDING_MODEL_NAME,
+        "vector_storage": VECTOR_STORAGE,
+    })
+
     # 1. Load embedding model once
     print("Loading embedding model...")
-    embedding_model = SentenceTransformer("all-MiniLM-L6-v2")
+    with profiler.timer("load_model"):
+        # Own cache directory: the running app holds the serving one
+        embedding_model = EmbeddingCache(EMBEDDING_MODEL_NAME, SentenceTransformer(EMBEDDING_MODEL_NAME),
+                                         cache_dir=INGEST_EMBED_CACHE_DIR)
 
     # 2. Setup persistent ChromaDB
     print("Setting up ChromaDB...")
     client = chromadb.PersistentClient(path=CHROMA_DB_PATH)
 
-    # # Delete old collection if re-ingesting
-    # try:
-    #     client.delete_collection(COLLECTION_NAME)
-    #     print(f"Deleted existing collection '{COLLECTION_NAME}'")
-    # except ValueError:
-    #     pass
+    manifest = {} if full else load_manifest()
+    if not manifest:
+        # No manifest means we can't tell which vectors are ours (older runs
+        # used positional chunk_{i} IDs), so start from a clean collection.
+        try:
+            client.delete_collection(COLLECTION_NAME)
+            print(f"Deleted existing collection '{COLLECTION_NAME}'")
+        except Exception:
+            pass
+        manifest = {"files": {}}
+        dedup = DedupIndex()
+    else:
+        dedup = DedupIndex.load(DEDUP_INDEX_PATH)
 
     collection = client.get_or_create_collection(name=COLLECTION_NAME)
+    files = manifest["files"]
 
-    # 3. Process all PDFs
-    all_documents = []
+    # 3. Work out which pages changed. Old page entries stay in the manifest
+    # until their replacement is stored, so a crash never orphans vectors.
+    plan = {}  # filename -> {page: hash} still to be extracted
+    pending = {}  # filename -> new file hash and page set, applied when done
+    on_disk = set()
 
+    plan_started = time.perf_counter()
     for filename in sorted(os.listdir(PDF_DIR)):
         if not filename.endswith(".pdf"):
             continue
 
+        on_disk.add(filename)
         pdf_path = os.path.join(PDF_DIR, filename)
-        print(f"\nProcessing: {filename}")
-
-        docs = extract_text_from_pdf(pdf_path)
-        all_documents.extend(docs)
-        print(f"  Extracted {len(docs)} pages")
+        entry = files.setdefault(filename, {"sha256": None, "pages": {}})
+        sha = file_sha256(pdf_path)
 
-    print(f"\nTotal pages extracted: {len(all_documents)}")
-
-    # 4. Chunk
-    chunks = chunk_documents(all_documents)
-    print(f"Total chunks after splitting: {len(chunks)}")
+        if entry["sha256"] == sha:
+            print(f"Unchanged: {filename}")
+            continue
 
-    # 5. Embed and store
-    embed_and_store(chunks, collection, embedding_model)
+        with fitz.open(pdf_path) as doc:
+            hashes = page_hashes(doc)
+        changed = {
+            page: page_hash for page, page_hash in hashes.items()
+            if entry["pages"].get(str(page), {}).get("hash") != page_hash
+        }
+        print(f"Changed: {filename} ({len(changed)} of {len(hashes)} pages)")
+
+        entry["sha256"] = None
+        pending[filename] = {"sha256": sha, "live_pages": set(hashes)}
+        if changed:
+            plan[filename] = changed
+        else:
+            finish_file(collection, dedup, entry, **pending[filename])
+
+    # Files that disappeared from PDF_DIR
+    for filename in [f for f in files if f not in on_disk]:
+        print(f"Removed: {filename}")
+        pages = files.pop(filename)["pages"].values()
+        release_chunks(collection, dedup, [cid for page in pages for cid in page["chunk_ids"]])
+    dedup.save(DEDUP_INDEX_PATH)
+    save_manifest(manifest)
+    profiler.record("plan", time.perf_counter() - plan_started)
+
+    # 4. Extract -> chunk -> embed -> store, checkpointing as batches land
+    ocr_engine = OcrEngine()
+    with profiler.timer("pipeline"):
+        written = run_pipeline(
+            plan, pending, manifest, collection, embedding_model, workers, profiler, ocr_engine, dedup
+        )
+    dedup.save(DEDUP_INDEX_PATH)
+    save_manifest(manifest)
+    embedding_model.flush()
+
+    # 5. Keyword index for hybrid retrieval, rebuilt from what is stored
+    with profiler.timer("bm25_build"):
+        bm25 = BM25Index.from_collection(collection)
+        bm25.save(BM25_INDEX_PATH)
+    print(f"BM25 index: {len(bm25.ids)} chunks, {len(bm25.postings)} terms")
+
+    # 6. Fixed scheme summaries served at scheme_selection, redone only for changed schemes
+    if summaries:
+        with profiler.timer("summaries"):
+            counts = refresh_summaries(collection, bm25, manifest_path=MANIFEST_PATH)
+        print(f"Scheme summaries ({', '.join(SUMMARY_LANGUAGES)}): {counts}")
+
+    # 7. NumPy serving copy, when VECTOR_STORAGE picks that backend (see vector_backend.py)
+    if VECTOR_STORAGE in CODE_DTYPES:
+        with profiler.timer("compact_export"):
+            compact = CompactIndex.from_collection(
+                collection, os.path.join(COMPACT_DIR, COLLECTION_NAME), mode=VECTOR_STORAGE, rescore=VECTOR_RESCORE
+            )
+        print(f"Compact {VECTOR_STORAGE} copy: {compact.memory()}")
+
+    # 8. Stage report
+    profiler.count("chunks_written", written)
+    report = profiler.report(ocr_engine, embedding_model, dedup)
+    report_path = profiler.write(report)
+    print("\nStage timings (busy seconds):")
+    for stage, summary in report["stages"].items():
+        print(f"  {stage:<12} total {summary['total_s']:>8.2f}s  p50 {summary['p50_s']:.3f}s  p95 {summary['p95_s']:.3f}s")
+    print(f"Throughput: {report['throughput']}")
+    print(f"OCR: {report['ocr']}")
+    print(f"Embedding cache: {report['embedding_cache']}")
+    shrink = report["dedup"]
+    print(
+        f"Dedup: {shrink['chunks']} chunks stored as {shrink['canonical']} "
+        f"({shrink['folded']} near-duplicates folded, index {shrink['shrink_pct']}% smaller)"
+    )
+    print(f"Report written to {report_path}")
 
-    print(f"\nDone! {len(chunks)} chunks stored in ChromaDB at '{CHROMA_DB_PATH}'")
+    print(f"\nDone! Wrote {written} chunks; {collection.count()} chunks stored in ChromaDB at '{CHROMA_DB_PATH}'")
     print(f"Collection: '{COLLECTION_NAME}'")
 
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Ingest scheme PDFs into ChromaDB.")
+    parser.add_argument(
+        "--full",
+        action="store_true",
+        help="Ignore the manifest and rebuild the collection from scratch.",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=EXTRACT_WORKERS,
+        help="Processes used to read and render PDF pages (1 = no pool).",
+    )
+    parser.add_argument(
+        "--skip-summaries",
+        action="store_true",
+        help="Don't regenerate the per-scheme summaries (needs the LLM).",
+    )
+    args = parser.parse_args()
+    main(full=args.full, workers=args.workers, summaries=not args.skip_summaries)
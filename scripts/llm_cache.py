@@ -0,0 +1,216 @@
+"""
+Exact-match cache of LLM responses for call sites whose prompt fully
+determines the answer (translations, intent / branch classification, the
+IVR SMS short list, weather advice for identical stats). Used by the LLM
+gateway; only sites listed in CACHE_POLICIES are cached.
+
+    python scripts/llm_cache.py                 # stats per call site
+    python scripts/llm_cache.py --purge intent  # drop one site's entries
+
+Purging is deliberately CLI-only (run it on the host after changing a
+call site's prompt); the app exposes read-only stats. A purge bumps the
+site's generation in the database, and running workers check it on every
+memory hit, so they stop serving purged answers without a restart.
+"""
+import os
+import time
+import sqlite3
+import argparse
+import threading
+from collections import OrderedDict
+
+# ---------- CONFIG ----------
+LLM_CACHE_PATH = os.getenv(
+    "LLM_CACHE_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "llm_cache.sqlite"),
+)
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE", "1") == "1"
+LLM_CACHE_MEMORY_ENTRIES = int(os.getenv("LLM_CACHE_MEMORY_ENTRIES", "2048"))  # hot tier, all sites together
+HOUR = 3600
+DAY = 24 * HOUR
+
+# Call site -> ttl (seconds) and max_entries kept on disk; anything not listed is never cached
+CACHE_POLICIES = {
+    "translate": {"ttl": 30 * DAY, "max_entries": 20000},
+    "ivr_translate": {"ttl": 30 * DAY, "max_entries": 5000},
+    "intent": {"ttl": 7 * DAY, "max_entries": 20000},
+    "flow_branch": {"ttl": 7 * DAY, "max_entries": 20000},
+    "ivr_branch": {"ttl": 7 * DAY, "max_entries": 5000},
+    "ivr_sms": {"ttl": DAY, "max_entries": 5000},
+    # Same district stats give the same advice, but forecasts move: keep it short
+    "weather": {"ttl": 6 * HOUR, "max_entries": 2000},
+}
+
+
+class LlmCache:
+    """
+    Responses keyed by (call site, prompt hash), in an in-memory LRU in
+    front of SQLite so hits survive restarts and are shared by workers.
+    Each site has its own TTL and on-disk entry limit (least recently used
+    rows go first); hit / miss counters are kept per site. The database
+    is opened on first use, so importing the gateway touches no disk.
+    """
+
+    def __init__(self, path: str = LLM_CACHE_PATH, policies: dict = CACHE_POLICIES,
+                 memory_entries: int = LLM_CACHE_MEMORY_ENTRIES):
+        self.policies = policies
+        self.memory_entries = memory_entries
+        self.memory = OrderedDict()  # (site, key) -> (response, created, generation)
+        self.path = path
+        self.lock = threading.Lock()
+        self._db = None
+        self.counters = {}  # site -> {"hits", "memory_hits", "misses", "stale", "evictions"}
+
+    @property
+    def db(self) -> sqlite3.Connection:
+        """Callers hold self.lock."""
+        if self._db is None:
+            self._db = self._connect()
+        return self._db
+
+    def _connect(self) -> sqlite3.Connection:
+        db = sqlite3.connect(self.path, check_same_thread=False)
+        db.execute("""
+            CREATE TABLE IF NOT EXISTS llm_cache (
+                site TEXT NOT NULL,
+                key TEXT NOT NULL,
+                response TEXT NOT NULL,
+                created REAL NOT NULL,
+                used REAL NOT NULL,
+                hits INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (site, key)
+            )
+        """)
+        db.execute("CREATE INDEX IF NOT EXISTS llm_cache_used ON llm_cache (site, used)")
+        # Bumped by purge(); memory-tier entries from an older generation are dropped
+        db.execute("CREATE TABLE IF NOT EXISTS llm_cache_generations (site TEXT PRIMARY KEY, generation INTEGER NOT NULL)")
+        db.commit()
+        return db
+
+    def policy(self, site: str) -> dict | None:
+        return self.policies.get(site)
+
+    def _count(self, site: str, key: str, n: int = 1):
+        counters = self.counters.setdefault(site, {"hits": 0, "memory_hits": 0, "misses": 0, "stale": 0, "evictions": 0})
+        counters[key] += n
+
+    def _generation(self, site: str) -> int:
+        row = self.db.execute("SELECT generation FROM llm_cache_generations WHERE site = ?", (site,)).fetchone()
+        return row[0] if row else 0
+
+    def _remember(self, site: str, key: str, response: str, created: float, generation: int):
+        self.memory[(site, key)] = (response, created, generation)
+        self.memory.move_to_end((site, key))
+        while len(self.memory) > self.memory_entries:
+            self.memory.popitem(last=False)
+
+    def get(self, site: str, key: str) -> str | None:
+        policy = self.policy(site)
+        if policy is None:
+            return None
+        now = time.time()
+        with self.lock:
+            generation = self._generation(site)
+            cached = self.memory.get((site, key))
+            if cached and cached[2] != generation:
+                del self.memory[(site, key)]  # purged by another process
+                cached = None
+            if cached and now - cached[1] <= policy["ttl"]:
+                self.memory.move_to_end((site, key))
+                self._count(site, "hits")
+                self._count(site, "memory_hits")
+                return cached[0]
+            row = self.db.execute(
+                "SELECT response, created FROM llm_cache WHERE site = ? AND key = ?", (site, key),
+            ).fetchone()
+            if row and now - row[1] > policy["ttl"]:
+                self.db.execute("DELETE FROM llm_cache WHERE site = ? AND key = ?", (site, key))
+                self.db.commit()
+                self.memory.pop((site, key), None)
+                self._count(site, "stale")
+                row = None
+            if row is None:
+                self._count(site, "misses")
+                return None
+            self.db.execute("UPDATE llm_cache SET hits = hits + 1, used = ? WHERE site = ? AND key = ?", (now, site, key))
+            self.db.commit()
+            self._remember(site, key, row[0], row[1], generation)
+            self._count(site, "hits")
+            return row[0]
+
+    def put(self, site: str, key: str, response: str):
+        policy = self.policy(site)
+        if policy is None or not response.strip():
+            return
+        now = time.time()
+        with self.lock:
+            self.db.execute(
+                "INSERT OR REPLACE INTO llm_cache (site, key, response, created, used, hits) VALUES (?, ?, ?, ?, ?, 0)",
+                (site, key, response, now, now),
+            )
+            # Over the site's limit: drop the least recently used rows
+            over = self.db.execute("SELECT COUNT(*) FROM llm_cache WHERE site = ?", (site,)).fetchone()[0] - policy["max_entries"]
+            if over > 0:
+                evicted = self.db.execute(
+                    "SELECT key FROM llm_cache WHERE site = ? ORDER BY used LIMIT ?", (site, over),
+                ).fetchall()
+                self.db.executemany("DELETE FROM llm_cache WHERE site = ? AND key = ?", [(site, k) for (k,) in evicted])
+                for (k,) in evicted:
+                    self.memory.pop((site, k), None)
+                self._count(site, "evictions", len(evicted))
+            self.db.commit()
+            self._remember(site, key, response, now, self._generation(site))
+
+    def purge(self, site: str | None = None) -> int:
+        """Drop every entry of `site` (all sites when None); returns rows removed."""
+        with self.lock:
+            if site is None:
+                removed = self.db.execute("DELETE FROM llm_cache").rowcount
+                sites = set(self.policies) | {s for (s,) in self.db.execute("SELECT site FROM llm_cache_generations")}
+                self.memory.clear()
+            else:
+                removed = self.db.execute("DELETE FROM llm_cache WHERE site = ?", (site,)).rowcount
+                sites = {site}
+                for cached_site, key in [k for k in self.memory if k[0] == site]:
+                    del self.memory[(cached_site, key)]
+            self.db.executemany(
+                "INSERT INTO llm_cache_generations (site, generation) VALUES (?, 1) "
+                "ON CONFLICT(site) DO UPDATE SET generation = generation + 1",
+                [(s,) for s in sites],
+            )
+            self.db.commit()
+            return removed
+
+    def stats(self) -> dict:
+        with self.lock:
+            rows = self.db.execute("SELECT site, COUNT(*), SUM(hits) FROM llm_cache GROUP BY site").fetchall()
+            stored = {site: {"entries": entries, "lifetime_hits": hits or 0} for site, entries, hits in rows}
+            sites = {}
+            for site in sorted(set(self.policies) | set(self.counters) | set(stored)):
+                counters = self.counters.get(site, {"hits": 0, "memory_hits": 0, "misses": 0, "stale": 0, "evictions": 0})
+                lookups = counters["hits"] + counters["misses"]
+                sites[site] = {
+                    **counters,
+                    "hit_ratio": round(counters["hits"] / lookups, 4) if lookups else 0.0,
+                    **stored.get(site, {"entries": 0, "lifetime_hits": 0}),
+                    **(self.policies.get(site) or {}),
+                }
+            return {"sites": sites, "memory_entries": len(self.memory), "max_memory_entries": self.memory_entries}
+
+
+# ---------- MAIN ----------
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Inspect or purge the LLM response cache.")
+    parser.add_argument("--purge", metavar="SITE", help="Drop one call site's entries ('all' for every site).")
+    parser.add_argument("--path", default=LLM_CACHE_PATH)
+    args = parser.parse_args()
+
+    cache = LlmCache(args.path)
+    if args.purge:
+        removed = cache.purge(None if args.purge == "all" else args.purge)
+        print(f"Purged {removed} entries ({args.purge})")
+    print(f"\n{'site':<14} {'entries':>8} {'lifetime hits':>14} {'ttl h':>7} {'max':>7}")
+    for site, s in cache.stats()["sites"].items():
+        ttl = f"{s['ttl'] / HOUR:>7.0f}" if "ttl" in s else f"{'-':>7}"
+        limit = f"{s['max_entries']:>7}" if "max_entries" in s else f"{'-':>7}"
+        print(f"{site:<14} {s['entries']:>8} {s['lifetime_hits']:>14} {ttl} {limit}")
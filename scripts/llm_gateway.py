@@ -0,0 +1,364 @@
+import os
+import json
+import time
+import hashlib
+import random
+import asyncio
+import threading
+import weakref
+import httpx
+from groq import Groq, AsyncGroq, RateLimitError, APIConnectionError, APITimeoutError, InternalServerError
+from dotenv import load_dotenv
+
+try:
+    from llm_cache import LlmCache, LLM_CACHE_ENABLED
+except ImportError:  # imported as scripts.llm_gateway by the app
+    from scripts.llm_cache import LlmCache, LLM_CACHE_ENABLED
+
+load_dotenv()
+
+# ---------- CONFIG ----------
+LLM_MODEL = "openai/gpt-oss-120b"
+VLM_MODEL = "meta-llama/llama-4-scout-17b-16e-instruct"
+STT_MODEL = "whisper-large-v3"
+DEFAULT_SYSTEM = "You are a helpful assistant."
+# Point this at a local fake OpenAI-compatible server to test without Groq
+LLM_BASE_URL = os.getenv("LLM_BASE_URL")
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "60"))  # seconds per attempt, unless the call site passes its own
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "3"))
+LLM_BACKOFF_BASE = 0.5
+LLM_BACKOFF_CAP = 8.0
+LLM_CONCURRENCY = int(os.getenv("LLM_CONCURRENCY", "16"))  # upstream requests in flight, sync + async
+LLM_POOL_SIZE = int(os.getenv("LLM_POOL_SIZE", "32"))  # keep-alive connections per client
+LLM_KEEPALIVE_SECONDS = 120.0
+# Identical chat calls in flight at the same time share one upstream request
+LLM_COALESCE = os.getenv("LLM_COALESCE", "1") == "1"
+
+RETRYABLE_ERRORS = (RateLimitError, APIConnectionError, APITimeoutError, InternalServerError)
+
+
+def prompt_messages(prompt: str, system: str | None = DEFAULT_SYSTEM) -> list[dict]:
+    messages = [{"role": "system", "content": system}] if system else []
+    return messages + [{"role": "user", "content": prompt}]
+
+
+def flight_key(model: str, messages: list, params: dict) -> str:
+    """
+    Identity of a chat call: model, params and the exact messages. Used for
+    single-flight and as the response cache key, so only byte-identical
+    prompts share an answer (whitespace can change what the model says).
+    """
+    payload = json.dumps({"model": model, "messages": messages, "params": params}, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class Flight:
+    """One in-flight upstream chat call that later identical calls wait on."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+def backoff_delay(attempt: int, error: Exception) -> float:
+    """Jittered exponential backoff, stretched to the server's retry-after if it sent one."""
+    delay = min(LLM_BACKOFF_CAP, LLM_BACKOFF_BASE * 2 ** attempt) * random.uniform(0.5, 1.5)
+    retry_after = getattr(getattr(error, "response", None), "headers", {}).get("retry-after")
+    if retry_after:
+        try:
+            delay = max(delay, min(LLM_BACKOFF_CAP, float(retry_after)))
+        except ValueError:
+            pass
+    return delay
+
+
+class LlmGateway:
+    """
+    The one way the app talks to Groq. Keeps a single sync client and one
+    async client per event loop, each over a keep-alive connection pool, so
+    a WhatsApp turn that makes several calls pays TLS setup once. Every call
+    gets a per-attempt timeout, retry with jittered backoff on rate limits
+    and transient errors, and a slot under one process-wide concurrency
+    limit shared by the sync and async entry points. Identical chat calls
+    already in flight are coalesced (single-flight): the later callers wait
+    for the first one's answer instead of sending their own. Call sites
+    with a policy in `cache` (llm_cache.py) are answered from it when the
+    exact prompt was seen before. Counters are kept per call site.
+    """
+
+    def __init__(self, base_url: str | None = LLM_BASE_URL, concurrency: int = LLM_CONCURRENCY,
+                 max_retries: int = LLM_MAX_RETRIES, timeout: float = LLM_TIMEOUT, coalesce: bool = LLM_COALESCE,
+                 cache: LlmCache | None = None):
+        self.base_url = base_url
+        self.max_retries = max_retries
+        self.timeout = timeout
+        self.coalesce = coalesce
+        self.cache = cache
+        self.concurrency = max(1, concurrency)
+        self.slots = threading.BoundedSemaphore(self.concurrency)  # process-wide, sync + async
+        self.loop_slots = weakref.WeakKeyDictionary()  # event loop -> asyncio.Semaphore
+        self.lock = threading.Lock()
+        self.clients = {}  # base_url -> Groq
+        self.async_clients = weakref.WeakKeyDictionary()  # event loop -> AsyncGroq
+        self.sites = {}  # call site -> counters
+        self.flights = {}  # flight_key -> Flight (sync callers)
+        self.async_flights = weakref.WeakKeyDictionary()  # event loop -> {flight_key: {"task", "waiters"}}
+        self.peak_waiters = 0  # most callers ever sharing one flight
+
+    # ---------- CLIENTS ----------
+    def _limits(self) -> httpx.Limits:
+        return httpx.Limits(max_connections=LLM_POOL_SIZE, max_keepalive_connections=LLM_POOL_SIZE,
+                            keepalive_expiry=LLM_KEEPALIVE_SECONDS)
+
+    def client(self, base_url: str | None = None) -> Groq:
+        """The shared sync client (retries are done here, so the SDK's own are off)."""
+        base_url = base_url or self.base_url
+        with self.lock:
+            if base_url not in self.clients:
+                self.clients[base_url] = Groq(
+                    base_url=base_url, max_retries=0, timeout=self.timeout,
+                    http_client=httpx.Client(limits=self._limits(), timeout=self.timeout),
+                )
+            return self.clients[base_url]
+
+    def async_client(self) -> AsyncGroq:
+        # httpx async connections belong to the loop that opened them
+        loop = asyncio.get_running_loop()
+        with self.lock:
+            if loop not in self.async_clients:
+                self.async_clients[loop] = AsyncGroq(
+                    base_url=self.base_url, max_retries=0, timeout=self.timeout,
+                    http_client=httpx.AsyncClient(limits=self._limits(), timeout=self.timeout),
+                )
+            return self.async_clients[loop]
+
+    # ---------- STATS ----------
+    def _count(self, site: str, key: str, n: float = 1):
+        with self.lock:
+            self._count_locked(site, key, n)
+
+    def _count_locked(self, site: str, key: str, n: float = 1):
+        counters = self.sites.setdefault(site, {"requests": 0, "calls": 0, "coalesced": 0, "retries": 0, "failures": 0, "seconds": 0.0})
+        counters[key] += n
+
+    def stats(self) -> dict:
+        """
+        Per call site: requests (chat/transcribe calls made), calls
+        (upstream attempts), coalesced (requests answered by another
+        caller's in-flight call), retries, failures and upstream time.
+        """
+        with self.lock:
+            sites = {
+                site: {**c, "seconds": round(c["seconds"], 3),
+                       "avg_ms": round(c["seconds"] / c["calls"] * 1000, 1) if c["calls"] else 0.0,
+                       "coalesced_fraction": round(c["coalesced"] / c["requests"], 4) if c["requests"] else 0.0}
+                for site, c in self.sites.items()
+            }
+            requests = sum(c["requests"] for c in self.sites.values())
+            coalesced = sum(c["coalesced"] for c in self.sites.values())
+            in_flight = len(self.flights) + sum(len(f) for f in self.async_flights.values())
+        return {
+            "sites": sites,
+            "requests": requests,
+            "coalesced": coalesced,
+            "coalesced_fraction": round(coalesced / requests, 4) if requests else 0.0,
+            "in_flight": in_flight,
+            "peak_waiters": self.peak_waiters,
+            "coalesce": self.coalesce,
+            "cache": self.cache.stats() if self.cache else None,
+            "concurrency": self.concurrency,
+            "max_retries": self.max_retries,
+        }
+
+    # ---------- CALLS ----------
+    def _run(self, site: str, request):
+        for attempt in range(self.max_retries + 1):
+            self.slots.acquire()
+            started = time.perf_counter()
+            try:
+                return request()
+            except RETRYABLE_ERRORS as e:
+                if attempt == self.max_retries:
+                    self._count(site, "failures")
+                    raise
+                delay, error = backoff_delay(attempt, e), e.__class__.__name__
+            except Exception:
+                self._count(site, "failures")
+                raise
+            finally:
+                self.slots.release()
+                self._count(site, "calls")
+                self._count(site, "seconds", time.perf_counter() - started)
+            self._count(site, "retries")
+            print(f"LLM {site}: attempt {attempt + 1} failed ({error}), retrying in {delay:.1f}s")
+            time.sleep(delay)
+
+    def _loop_slots(self) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        with self.lock:
+            if loop not in self.loop_slots:
+                self.loop_slots[loop] = asyncio.Semaphore(self.concurrency)
+            return self.loop_slots[loop]
+
+    async def _acquire_slot(self):
+        """
+        A process-wide slot without blocking the loop. Only when sync
+        callers hold every slot does this wait, in a worker thread; if the
+        task is cancelled meanwhile, the slot is released once acquired.
+        """
+        if self.slots.acquire(blocking=False):
+            return
+        acquiring = asyncio.get_running_loop().run_in_executor(None, self.slots.acquire)
+        try:
+            await asyncio.shield(acquiring)
+        except asyncio.CancelledError:
+            acquiring.add_done_callback(lambda _: self.slots.release())
+            raise
+
+    async def _arun(self, site: str, request):
+        for attempt in range(self.max_retries + 1):
+            # Tasks queue on their loop's semaphore, then take a slot of the shared limit
+            async with self._loop_slots():
+                await self._acquire_slot()
+                started = time.perf_counter()
+                try:
+                    return await request()
+                except RETRYABLE_ERRORS as e:
+                    if attempt == self.max_retries:
+                        self._count(site, "failures")
+                        raise
+                    delay, error = backoff_delay(attempt, e), e.__class__.__name__
+                except Exception:
+                    self._count(site, "failures")
+                    raise
+                finally:
+                    self.slots.release()
+                    self._count(site, "calls")
+                    self._count(site, "seconds", time.perf_counter() - started)
+            self._count(site, "retries")
+            print(f"LLM {site}: attempt {attempt + 1} failed ({error}), retrying in {delay:.1f}s")
+            await asyncio.sleep(delay)
+
+    # ---------- SINGLE-FLIGHT ----------
+    def _single_flight(self, key: str, site: str, call):
+        with self.lock:
+            flight = self.flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self.flights[key] = Flight()
+            else:
+                flight.waiters += 1
+                self.peak_waiters = max(self.peak_waiters, flight.waiters)
+        if not leader:
+            self._count(site, "coalesced")
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+        try:
+            flight.result = call()
+            return flight.result
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            with self.lock:
+                self.flights.pop(key, None)
+            flight.done.set()
+
+    async def _asingle_flight(self, key: str, site: str, call):
+        loop = asyncio.get_running_loop()
+        with self.lock:
+            flights = self.async_flights.setdefault(loop, {})
+            flight = flights.get(key)
+            if flight is None:
+                flight = flights[key] = {"task": loop.create_task(call()), "waiters": 0}
+                flight["task"].add_done_callback(lambda _: flights.pop(key, None))
+            else:
+                flight["waiters"] += 1
+                self.peak_waiters = max(self.peak_waiters, flight["waiters"])
+                self._count_locked(site, "coalesced")
+        # Shielded: one caller giving up doesn't cancel the others' answer
+        return await asyncio.shield(flight["task"])
+
+    def chat(self, prompt: str | None = None, *, messages: list | None = None, system: str | None = DEFAULT_SYSTEM,
+             model: str = LLM_MODEL, timeout: float | None = None, site: str = "default", **params) -> str:
+        """
+        One chat completion; returns the message text. Pass either a user
+        `prompt` (sent after `system`) or the full `messages` list. Extra
+        keyword arguments (temperature, max_completion_tokens, ...) go to
+        the API as is.
+        """
+        messages = messages or prompt_messages(prompt, system)
+        client = self.client()
+        self._count(site, "requests")
+        key = flight_key(model, messages, params)
+        cache = self.cache if self.cache and self.cache.policy(site) else None
+        if cache:
+            cached = cache.get(site, key)
+            if cached is not None:
+                return cached
+
+        def call():
+            response = self._run(site, lambda: client.chat.completions.create(
+                model=model, messages=messages, timeout=timeout or self.timeout, **params,
+            ))
+            content = response.choices[0].message.content or ""
+            if cache:
+                cache.put(site, key, content)
+            return content
+
+        if not self.coalesce:
+            return call()
+        return self._single_flight(key, site, call)
+
+    async def achat(self, prompt: str | None = None, *, messages: list | None = None, system: str | None = DEFAULT_SYSTEM,
+                    model: str = LLM_MODEL, timeout: float | None = None, site: str = "default", **params) -> str:
+        """chat() for async handlers: waits on the network without blocking the event loop."""
+        messages = messages or prompt_messages(prompt, system)
+        client = self.async_client()
+        self._count(site, "requests")
+        key = flight_key(model, messages, params)
+        # SQLite lookups are sub-millisecond, so the cache is read inline
+        cache = self.cache if self.cache and self.cache.policy(site) else None
+        if cache:
+            cached = cache.get(site, key)
+            if cached is not None:
+                return cached
+
+        async def call():
+            response = await self._arun(site, lambda: client.chat.completions.create(
+                model=model, messages=messages, timeout=timeout or self.timeout, **params,
+            ))
+            content = response.choices[0].message.content or ""
+            if cache:
+                cache.put(site, key, content)
+            return content
+
+        if not self.coalesce:
+            return await call()
+        return await self._asingle_flight(key, site, call)
+
+    def transcribe(self, audio: bytes, filename: str = "audio.webm", *, model: str = STT_MODEL,
+                   timeout: float | None = None, site: str = "stt", **params) -> str:
+        """Whisper transcription of in-memory audio (bytes, so a retry can resend it)."""
+        client = self.client()
+        self._count(site, "requests")
+        result = self._run(site, lambda: client.audio.transcriptions.create(
+            file=(filename, audio), model=model, timeout=timeout or self.timeout, **params,
+        ))
+        return result.text
+
+    async def atranscribe(self, audio: bytes, filename: str = "audio.webm", *, model: str = STT_MODEL,
+                          timeout: float | None = None, site: str = "stt", **params) -> str:
+        client = self.async_client()
+        self._count(site, "requests")
+        result = await self._arun(site, lambda: client.audio.transcriptions.create(
+            file=(filename, audio), model=model, timeout=timeout or self.timeout, **params,
+        ))
+        return result.text
+
+
+gateway = LlmGateway(cache=LlmCache() if LLM_CACHE_ENABLED else None)
@@ -0,0 +1,205 @@
+import os
+import time
+import random
+import base64
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from groq import Groq
+from dotenv import load_dotenv
+
+try:
+    from llm_gateway import gateway, RETRYABLE_ERRORS
+except ImportError:  # imported as scripts.ocr
+    from scripts.llm_gateway import gateway, RETRYABLE_ERRORS
+
+load_dotenv()
+
+# ---------- CONFIG ----------
+OCR_MODEL = "meta-llama/llama-4-scout-17b-16e-instruct"
+OCR_PROMPT = "Extract ALL text from this document image. Return only the extracted text, nothing else. Preserve the structure and formatting."
+OCR_MAX_COMPLETION_TOKENS = 2048
+# Rough prompt-side cost of one ~1024px page image; reconciled against the
+# real usage once the response comes back.
+OCR_IMAGE_TOKENS = 1500
+OCR_CACHE_DIR = os.getenv("OCR_CACHE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "ocr_cache"))
+OCR_CONCURRENCY = int(os.getenv("OCR_CONCURRENCY", "4"))
+OCR_TOKENS_PER_MINUTE = int(os.getenv("OCR_TOKENS_PER_MINUTE", "30000"))
+OCR_MAX_RETRIES = 5
+OCR_BACKOFF_BASE = 1.0
+OCR_BACKOFF_CAP = 30.0
+# Point this at a local fake OpenAI-compatible server to test without Groq
+# (LLM_BASE_URL, the gateway's, is used when unset)
+OCR_BASE_URL = os.getenv("OCR_BASE_URL")
+
+
+class TokenBucket:
+    """
+    Tokens-per-minute limiter. acquire() blocks until `n` tokens are free;
+    refund() hands back what a request didn't actually use.
+    """
+
+    def __init__(self, tokens_per_minute: int):
+        self.capacity = float(tokens_per_minute)
+        self.tokens = float(tokens_per_minute)
+        self.rate = tokens_per_minute / 60.0
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self, n: int):
+        n = min(n, self.capacity)
+        while True:
+            with self.lock:
+                self._refill()
+                if self.tokens >= n:
+                    self.tokens -= n
+                    return
+                wait = (n - self.tokens) / self.rate
+            time.sleep(wait)
+
+    def refund(self, n: int):
+        with self.lock:
+            self._refill()
+            self.tokens = min(self.capacity, self.tokens + n)
+
+
+class OcrCache:
+    """
+    One text file per rendered page image, named by the image's sha256.
+    Empty results are never stored (nor served, for files written before),
+    so a page that came back blank is OCR'd again on the next run.
+    """
+
+    def __init__(self, cache_dir: str = OCR_CACHE_DIR):
+        self.cache_dir = cache_dir
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.txt")
+
+    def get(self, key: str) -> str | None:
+        path = self._path(key)
+        if not os.path.exists(path):
+            return None
+        with open(path, "r", encoding="utf-8") as f:
+            text = f.read()
+        return text if text.strip() else None
+
+    def put(self, key: str, text: str):
+        if not text.strip():
+            return
+        path = self._path(key)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(text)
+        os.replace(tmp_path, path)
+
+
+class OcrEngine:
+    """
+    Groq Vision OCR with bounded concurrency, a tokens-per-minute budget,
+    retry with jittered exponential backoff, and a persistent cache so a
+    page image is never sent twice.
+    """
+
+    def __init__(
+        self,
+        client: Groq | None = None,
+        concurrency: int = OCR_CONCURRENCY,
+        tokens_per_minute: int = OCR_TOKENS_PER_MINUTE,
+        cache: OcrCache | None = None,
+    ):
+        # The gateway's pooled client, SDK retries off: retries are handled
+        # here so they also respect the token budget
+        self.client = client or gateway.client(OCR_BASE_URL)
+        self.concurrency = max(1, concurrency)
+        self.bucket = TokenBucket(tokens_per_minute)
+        self.cache = cache or OcrCache()
+        self.stats = {"requests": 0, "cache_hits": 0, "retries": 0, "failures": 0, "bytes_sent": 0}
+        self.latencies = []  # seconds per successful request
+        self.stats_lock = threading.Lock()
+
+    def _count(self, key: str, n: int = 1):
+        with self.stats_lock:
+            self.stats[key] += n
+
+    def _request(self, image_bytes: bytes) -> str:
+        image_base64 = base64.b64encode(image_bytes).decode()
+        estimate = OCR_IMAGE_TOKENS + OCR_MAX_COMPLETION_TOKENS
+
+        for attempt in range(OCR_MAX_RETRIES + 1):
+            self.bucket.acquire(estimate)
+            try:
+                self._count("requests")
+                self._count("bytes_sent", len(image_base64))
+                started = time.perf_counter()
+                response = self.client.chat.completions.create(
+                    model=OCR_MODEL,
+                    messages=[
+                        {
+                            "role": "user",
+                            "content": [
+                                {"type": "text", "text": OCR_PROMPT},
+                                {
+                                    "type": "image_url",
+                                    "image_url": {"url": f"data:image/png;base64,{image_base64}"},
+                                },
+                            ],
+                        }
+                    ],
+                    temperature=0.1,
+                    max_completion_tokens=OCR_MAX_COMPLETION_TOKENS,
+                )
+            except RETRYABLE_ERRORS as e:
+                if attempt == OCR_MAX_RETRIES:
+                    raise
+                self._count("retries")
+                delay = min(OCR_BACKOFF_CAP, OCR_BACKOFF_BASE * 2 ** attempt) * random.uniform(0.5, 1.5)
+                retry_after = getattr(getattr(e, "response", None), "headers", {}).get("retry-after")
+                if retry_after:
+                    try:
+                        delay = max(delay, float(retry_after))
+                    except ValueError:
+                        pass
+                print(f"  OCR attempt {attempt + 1} failed ({e.__class__.__name__}), retrying in {delay:.1f}s")
+                time.sleep(delay)
+                continue
+
+            with self.stats_lock:
+                self.latencies.append(time.perf_counter() - started)
+            usage = getattr(response, "usage", None)
+            if usage and usage.total_tokens and usage.total_tokens < estimate:
+                self.bucket.refund(estimate - usage.total_tokens)
+            return response.choices[0].message.content or ""
+
+    def ocr_image(self, image_bytes: bytes) -> str:
+        key = hashlib.sha256(image_bytes).hexdigest()
+        cached = self.cache.get(key)
+        if cached is not None:
+            self._count("cache_hits")
+            return cached
+
+        text = self._request(image_bytes)
+        self.cache.put(key, text)
+        return text
+
+    def ocr_many(self, images: dict) -> dict:
+        """
+        OCR several page images concurrently. Takes {key: png_bytes} and
+        returns {key: text or the Exception that ended its retries}.
+        """
+        def run(item):
+            key, image_bytes = item
+            try:
+                return key, self.ocr_image(image_bytes)
+            except Exception as e:
+                self._count("failures")
+                return key, e
+
+        with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+            return dict(pool.map(run, images.items()))
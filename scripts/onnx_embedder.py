@@ -0,0 +1,167 @@
+import os
+import re
+import json
+import hashlib
+import functools
+from datetime import datetime, timezone
+import numpy as np
+
+# ---------- CONFIG ----------
+# "torch" runs the SentenceTransformer; "onnx" runs the exported model
+# (scripts/export_onnx.py) through onnxruntime, with no torch import at all.
+# Needs `pip install onnxruntime tokenizers` on the serving side only.
+# onnx only takes effect once bench_embedder.py has passed the parity check
+# on that exact export (see resolve_backend); until then workers use torch.
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "torch").lower()
+ONNX_SKIP_PARITY = os.getenv("ONNX_SKIP_PARITY", "0") == "1"
+PARITY_FILE = "parity.json"
+ONNX_MODEL_DIR = os.getenv(
+    "ONNX_MODEL_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "onnx_models"),
+)
+ONNX_QUANTIZED = os.getenv("ONNX_QUANTIZED", "1") == "1"  # dynamic int8 weights
+ONNX_THREADS = int(os.getenv("ONNX_THREADS", "0"))  # 0 = onnxruntime's default
+
+
+def model_dir(model_name: str, root: str = ONNX_MODEL_DIR) -> str:
+    return os.path.join(root, re.sub(r"[^A-Za-z0-9_.-]", "_", model_name))
+
+
+def backend_tag(backend: str = EMBEDDING_BACKEND, quantized: bool = ONNX_QUANTIZED) -> str:
+    """Suffix that keeps cached vectors from different backends apart ("" for torch)."""
+    if backend != "onnx":
+        return ""
+    return "onnx-int8" if quantized else "onnx-fp32"
+
+
+def model_file(quantized: bool) -> str:
+    return "model_int8.onnx" if quantized else "model.onnx"
+
+
+def file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+@functools.lru_cache(maxsize=None)
+def parity_record(model_name: str, quantized: bool = ONNX_QUANTIZED, root: str = ONNX_MODEL_DIR) -> dict | None:
+    """The passing parity check recorded for this exact exported file, or None."""
+    path = model_dir(model_name, root)
+    try:
+        with open(os.path.join(path, PARITY_FILE), "r", encoding="utf-8") as f:
+            entry = json.load(f).get(backend_tag("onnx", quantized))
+        if entry and entry["sha256"] == file_sha256(os.path.join(path, model_file(quantized))):
+            return entry
+    except (OSError, ValueError, KeyError):
+        pass
+    return None
+
+
+def record_parity(model_name: str, quantized: bool, cos_min: float, cos_mean: float, min_cosine: float,
+                  root: str = ONNX_MODEL_DIR):
+    """Called by bench_embedder.py when a variant passes; re-exporting invalidates it (sha256)."""
+    path = model_dir(model_name, root)
+    parity_path = os.path.join(path, PARITY_FILE)
+    try:
+        with open(parity_path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        data = {}
+    data[backend_tag("onnx", quantized)] = {
+        "sha256": file_sha256(os.path.join(path, model_file(quantized))),
+        "cos_min": cos_min,
+        "cos_mean": cos_mean,
+        "max_cosine_deviation": round(1 - cos_min, 6),
+        "min_cosine": min_cosine,
+        "checked_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+    }
+    with open(parity_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2)
+    parity_record.cache_clear()
+
+
+def resolve_backend(model_name: str, backend: str = EMBEDDING_BACKEND) -> str:
+    """
+    The backend workers actually use for `model_name`: onnx falls back to
+    torch until bench_embedder.py has recorded a passing parity check for
+    the exported file (ONNX_SKIP_PARITY=1 skips that gate).
+    """
+    if backend != "onnx" or ONNX_SKIP_PARITY or parity_record(model_name):
+        return backend
+    print(f"EMBEDDING_BACKEND=onnx but {model_name} has no passing parity check; "
+          "run scripts/bench_embedder.py. Using torch.")
+    return "torch"
+
+
+class OnnxEmbedder:
+    """
+    SentenceTransformer.encode() stand-in for an exported transformer:
+    fast tokenizer from tokenizer.json, onnxruntime forward pass, then the
+    mean pooling (and normalization) the sentence-transformers pipeline
+    applies, done in numpy.
+    """
+
+    def __init__(self, path: str, quantized: bool = ONNX_QUANTIZED, threads: int = ONNX_THREADS):
+        import onnxruntime as ort
+        from tokenizers import Tokenizer
+
+        with open(os.path.join(path, "meta.json"), "r", encoding="utf-8") as f:
+            self.meta = json.load(f)
+        self.tokenizer = Tokenizer.from_file(os.path.join(path, "tokenizer.json"))
+        self.tokenizer.enable_truncation(max_length=self.meta["max_seq_length"])
+        self.tokenizer.enable_padding(pad_id=self.meta["pad_id"], pad_token=self.meta["pad_token"])
+
+        options = ort.SessionOptions()
+        if threads:
+            options.intra_op_num_threads = threads
+        self.session = ort.InferenceSession(os.path.join(path, model_file(quantized)), options, providers=["CPUExecutionProvider"])
+        self.input_names = {i.name for i in self.session.get_inputs()}
+
+    @classmethod
+    def load(cls, model_name: str, root: str = ONNX_MODEL_DIR, **kwargs) -> "OnnxEmbedder":
+        path = model_dir(model_name, root)
+        if not os.path.exists(os.path.join(path, "meta.json")):
+            raise FileNotFoundError(f"No exported ONNX model at {path}; run scripts/export_onnx.py")
+        return cls(path, **kwargs)
+
+    def get_sentence_embedding_dimension(self) -> int:
+        return self.meta["dim"]
+
+    def _forward(self, texts: list[str]) -> np.ndarray:
+        encodings = self.tokenizer.encode_batch(texts)
+        ids = np.array([e.ids for e in encodings], dtype=np.int64)
+        mask = np.array([e.attention_mask for e in encodings], dtype=np.int64)
+        feed = {"input_ids": ids, "attention_mask": mask}
+        if "token_type_ids" in self.input_names:
+            feed["token_type_ids"] = np.array([e.type_ids for e in encodings], dtype=np.int64)
+        hidden = self.session.run(None, feed)[0]
+        weights = mask[..., None].astype(np.float32)
+        return (hidden * weights).sum(axis=1) / np.clip(weights.sum(axis=1), 1e-9, None)
+
+    def encode(self, sentences, batch_size: int = 32, normalize_embeddings: bool = False, **_):
+        """Same contract as SentenceTransformer.encode(): str -> 1-D, list -> 2-D float32."""
+        single = isinstance(sentences, str)
+        texts = [sentences] if single else list(sentences)
+        if not texts:
+            return np.zeros((0, self.meta["dim"]), dtype=np.float32)
+
+        # Similar lengths share a batch so padding stays short; order restored below
+        order = np.argsort([len(text) for text in texts])
+        out = np.empty((len(texts), self.meta["dim"]), dtype=np.float32)
+        for start in range(0, len(texts), batch_size):
+            picks = order[start:start + batch_size]
+            out[picks] = self._forward([texts[i] for i in picks])
+        if self.meta["normalize"] or normalize_embeddings:
+            out /= np.clip(np.linalg.norm(out, axis=1, keepdims=True), 1e-12, None)
+        return out[0] if single else out
+
+
+def load_embedding_model(model_name: str, backend: str = EMBEDDING_BACKEND):
+    """The model EmbeddingCache calls on a miss, for the configured backend."""
+    if backend == "onnx":
+        return OnnxEmbedder.load(model_name)
+    from sentence_transformers import SentenceTransformer
+    return SentenceTransformer(model_name)
@@ -0,0 +1,316 @@
+import re
+import json
+import difflib
+import hashlib
+
+# ---------- CONFIG ----------
+# Bucket edges; coarser buckets mean more cache hits but blurrier answers.
+# PM-KISAN's old 2 ha small/marginal cut-off is ~5 acres.
+LAND_BUCKETS_ACRES = (1, 2, 5, 10)
+INCOME_BUCKETS_RUPEES = (100000, 250000, 500000, 1000000)
+FUZZY_THRESHOLD = 0.8
+PROFILE_VERSION = 4  # bump when the normalization changes, so old cache keys stop matching
+
+ACRES_PER_UNIT = {
+    "acre": 1.0, "acres": 1.0, "ac": 1.0, "ekar": 1.0, "एकड़": 1.0, "एकर": 1.0,
+    "hectare": 2.471, "hectares": 2.471, "ha": 2.471, "hectre": 2.471, "हेक्टेयर": 2.471,
+    "bigha": 0.62, "bighas": 0.62, "बीघा": 0.62,  # varies by state; UP/Rajasthan pucca bigha
+    "guntha": 0.025, "gunthas": 0.025, "gunta": 0.025, "गुंठा": 0.025,
+}
+RUPEES_PER_UNIT = {
+    "lakh": 100000, "lakhs": 100000, "lac": 100000, "lacs": 100000, "l": 100000, "लाख": 100000,
+    "thousand": 1000, "k": 1000, "हजार": 1000, "hazar": 1000,
+    "crore": 10000000, "cr": 10000000, "करोड़": 10000000,
+}
+
+STATES = {
+    "Andhra Pradesh": ["ap", "andhra"],
+    "Arunachal Pradesh": ["arunachal"],
+    "Assam": ["असम"],
+    "Bihar": ["बिहार"],
+    "Chhattisgarh": ["cg", "chattisgarh", "छत्तीसगढ़"],
+    "Goa": [],
+    "Gujarat": ["gj", "गुजरात"],
+    "Haryana": ["hr", "हरियाणा"],
+    "Himachal Pradesh": ["hp", "himachal"],
+    "Jharkhand": ["jh", "झारखंड"],
+    "Karnataka": ["ka", "karnatak", "कर्नाटक"],
+    "Kerala": ["kl", "केरल"],
+    "Madhya Pradesh": ["mp", "मध्य प्रदेश"],
+    "Maharashtra": ["mh", "maha", "महाराष्ट्र"],
+    "Manipur": [],
+    "Meghalaya": [],
+    "Mizoram": [],
+    "Nagaland": [],
+    "Odisha": ["orissa", "od", "ओडिशा"],
+    "Punjab": ["pb", "पंजाब"],
+    "Rajasthan": ["rj", "राजस्थान"],
+    "Sikkim": [],
+    "Tamil Nadu": ["tn", "tamilnadu"],
+    "Telangana": ["ts", "tg", "तेलंगाना"],
+    "Tripura": [],
+    "Uttar Pradesh": ["up", "उत्तर प्रदेश"],
+    "Uttarakhand": ["uk", "uttaranchal", "उत्तराखंड"],
+    "West Bengal": ["wb", "bengal", "पश्चिम बंगाल"],
+    "Andaman and Nicobar Islands": ["andaman"],
+    "Chandigarh": [],
+    "Dadra and Nagar Haveli and Daman and Diu": ["daman", "dadra"],
+    "Delhi": ["new delhi", "दिल्ली"],
+    "Jammu and Kashmir": ["j&k", "jk", "kashmir", "jammu"],
+    "Ladakh": [],
+    "Lakshadweep": [],
+    "Puducherry": ["pondicherry"],
+}
+
+# A profile can fall into several classes ("paddy and dairy")
+CROP_CLASSES = {
+    "cereals": ["rice", "paddy", "wheat", "maize", "corn", "jowar", "bajra", "millet", "ragi", "barley", "dhan", "gehu", "गेहूं", "धान"],
+    "pulses": ["pulse", "dal", "tur", "arhar", "gram", "chana", "moong", "urad", "masoor", "lentil", "soybean", "soyabean"],
+    "oilseeds": ["groundnut", "mustard", "sunflower", "sesame", "til", "castor", "oilseed"],
+    "cash_crops": ["cotton", "sugarcane", "ganna", "jute", "tobacco", "kapas"],
+    "horticulture": ["fruit", "vegetable", "onion", "tomato", "potato", "banana", "mango", "grape", "pomegranate", "orange", "flower", "spice", "chilli", "sabzi"],
+    "plantation": ["tea", "coffee", "rubber", "coconut", "arecanut", "cashew"],
+    "dairy": ["dairy", "milk", "cow", "buffalo", "cattle", "doodh", "गाय", "भैंस"],
+    "small_ruminants": ["goat", "sheep", "bakri", "बकरी"],
+    "poultry": ["poultry", "chicken", "hen", "egg", "duck", "murgi", "मुर्गी"],
+    "piggery": ["pig", "piggery", "swine"],
+    "fisheries": ["fish", "fishery", "fisheries", "aquaculture", "prawn", "shrimp", "machli"],
+    "beekeeping": ["bee", "honey", "apiculture"],
+    "crops_other": ["crop", "crops", "farming", "kheti", "fasal", "खेती", "फसल"],  # "crop" without saying which
+}
+
+IRRIGATION_CLASSES = {
+    "rainfed": ["rain", "rainfed", "monsoon", "barish", "baarish", "no irrigation", "none", "बारिश"],
+    "micro": ["drip", "sprinkler", "micro"],
+    "canal": ["canal", "nahar", "नहर"],
+    "groundwater": ["well", "borewell", "bore", "tubewell", "tube well", "pump", "kuan", "कुआं"],
+    "surface": ["river", "pond", "lake", "tank", "talab"],
+}
+
+CATEGORIES = {
+    "sc": ["sc", "scheduled caste", "dalit"],
+    "st": ["st", "scheduled tribe", "tribal", "adivasi"],
+    "woman": ["woman", "women", "female", "lady", "mahila", "महिला"],
+}
+
+# flow_call.json (IVR) stores some answers under different keys
+KEY_ALIASES = {"land_size_acres": "land_size", "irrigation_method": "irrigation", "annual_income": "income"}
+
+YES_WORDS = {"yes", "y", "haan", "han", "ha", "ho", "hoy", "ji", "own", "owned", "mine", "have", "has", "हाँ", "हां", "हो"}
+NO_WORDS = {"no", "n", "nahi", "nahin", "nai", "na", "nope", "नहीं", "नाही"}
+TENANCY_WORDS = {"lease", "leased", "tenant", "rent", "rented"}
+# A negation only counts against the answer's own subject ("I do not own",
+# "don't have land", "zameen nahi"), so "yes I own it, no loan" stays yes.
+# "don't" is "don t" after _normalize.
+NEGATION_WORDS = NO_WORDS | {"not", "don", "dont", "doesn", "doesnt", "didn", "didnt", "never", "without"}
+OWN_KEYWORDS = {"own", "owned", "owner", "mine", "have", "has", "land", "zameen", "jameen", "जमीन", "ज़मीन"}
+NEGATION_WINDOW = 3  # words between a negation and the keyword it applies to
+# Words a bare "no" may come with ("no sir", "no, I don't")
+FILLER_WORDS = {"i", "it", "my", "sir", "madam", "ji", "do", "does", "t", "s", "hai", "h", "mera", "meri"}
+
+# Spelled-out amounts ("half acre", "one lakh", "dedh bigha"); only the word right before a unit counts
+FRACTION_WORDS = {"quarter", "half", "aadha", "adha"}
+NUMBER_WORDS = {
+    "quarter": 0.25, "half": 0.5, "aadha": 0.5, "adha": 0.5, "dedh": 1.5, "dhai": 2.5, "adhai": 2.5,
+    "a": 1, "an": 1, "one": 1, "ek": 1, "two": 2, "do": 2, "three": 3, "teen": 3, "four": 4, "char": 4,
+    "five": 5, "paanch": 5, "panch": 5, "six": 6, "seven": 7, "eight": 8, "nine": 9, "ten": 10, "das": 10,
+    "twenty": 20, "fifty": 50, "hundred": 100,
+}
+
+
+def _normalize(text) -> str:
+    # Keep Devanagari vowel signs (not \w), decimal points and "2,50,000" grouping
+    return re.sub(r"[^\w\u0900-\u097F&.,]+", " ", str(text or "").lower()).replace(", ", " ").strip(" ,")
+
+
+def _words(text: str) -> set[str]:
+    return set(re.sub(r"[.,]", " ", text).split())
+
+
+def _has(text: str, term: str) -> bool:
+    """Whole-word (or phrase) match, allowing a plural: "goats", "buffaloes"."""
+    padded = f" {re.sub(r'[.,]', ' ', text)} "
+    return any(f" {term}{suffix} " in padded for suffix in ("", "s", "es"))
+
+
+def normalize_state(text) -> str:
+    text = _normalize(text)
+    if not text:
+        return "unknown"
+    best, best_len = None, 0
+    for state, aliases in STATES.items():
+        for alias in [state.lower()] + aliases:
+            if _has(text, alias) and len(alias) > best_len:
+                best, best_len = state, len(alias)
+    if best:
+        return best
+    match = difflib.get_close_matches(text, [s.lower() for s in STATES], n=1, cutoff=FUZZY_THRESHOLD)
+    if match:
+        return next(state for state in STATES if state.lower() == match[0])
+    return "other"
+
+
+def _clause_yes_no(words: list[str]) -> str:
+    for i, word in enumerate(words):
+        nearby = words[max(0, i - NEGATION_WINDOW):i] + words[i + 1:i + 1 + NEGATION_WINDOW]
+        if word in TENANCY_WORDS:
+            # "leased land" is a no; "not leased" is the opposite
+            return "yes" if any(w in NEGATION_WORDS for w in words[max(0, i - 2):i]) else "no"
+        if word in NEGATION_WORDS and any(w in OWN_KEYWORDS for w in nearby):
+            return "no"
+    if words and words[0] in NO_WORDS and set(words) <= NEGATION_WORDS | FILLER_WORDS:
+        return "no"  # a bare "no" / "nahi"
+    if set(words) & YES_WORDS:
+        return "yes"
+    return "unknown"
+
+
+def normalize_yes_no(text) -> str:
+    """
+    Land ownership answer, read clause by clause: any clause saying no wins,
+    then any saying yes. A negation about something else ("no loan") is
+    ignored rather than flipping the whole answer.
+    """
+    clauses = re.split(r"[.,;!?]", str(text or ""))
+    verdicts = {_clause_yes_no(_normalize(clause).split()) for clause in clauses}
+    if "no" in verdicts:
+        return "no"
+    if "yes" in verdicts:
+        return "yes"
+    return "unknown"
+
+
+def _amount(text: str, units: dict) -> float | None:
+    """
+    First number in the text, scaled by the unit word right after it, if
+    any. Without digits, a number word directly followed by a unit is read
+    ("half acre", "half an acre", "one lakh"). Combined amounts the parser
+    can't add up ("one and a half", "2 and a half", "two hundred") give
+    None, so the bucket is "unknown" rather than a confident wrong one.
+    """
+    match = re.search(r"(\d+(?:,\d{2,3})*(?:\.\d+)?)\s*([^\W\d]*)", text)
+    if not match:
+        words = re.sub(r"[.,]", " ", text).split()
+        for i, (word, unit) in enumerate(zip(words, words[1:])):
+            if word not in NUMBER_WORDS or unit not in units:
+                continue
+            start, value = i, NUMBER_WORDS[word]
+            if word in ("a", "an") and i and words[i - 1] in FRACTION_WORDS:
+                start, value = i - 1, NUMBER_WORDS[words[i - 1]]  # "half an acre"
+            elif word in FRACTION_WORDS and i and words[i - 1] in ("a", "an"):
+                start = i - 1  # "a half acre"
+            if start and (words[start - 1] == "and" or words[start - 1] in NUMBER_WORDS):
+                return None
+            return value * units[unit]
+        return None
+    value = float(match.group(1).replace(",", ""))
+    unit = match.group(2) or next(iter(text[match.end():].split()), "")
+    if unit == "and":
+        return None
+    return value * units.get(unit.strip("."), 1)
+
+
+def bucket(value: float | None, edges: tuple, unit: str = "") -> str:
+    """"2-5ac" style label for the bucket `value` falls in."""
+    if value is None:
+        return "unknown"
+    low = 0
+    for edge in edges:
+        if value < edge:
+            return f"{low}-{edge}{unit}"
+        low = edge
+    return f"{edges[-1]}+{unit}"
+
+
+def land_bucket(text) -> str:
+    # A bare number is acres: that's what the question asks for
+    return bucket(_amount(_normalize(text), ACRES_PER_UNIT), LAND_BUCKETS_ACRES, "ac")
+
+
+def income_bucket(text) -> str:
+    return bucket(_amount(_normalize(text), RUPEES_PER_UNIT), INCOME_BUCKETS_RUPEES)
+
+
+def classes_in(text, table: dict) -> list[str]:
+    text = _normalize(text)
+    return sorted(name for name, terms in table.items() if any(_has(text, term) for term in terms))
+
+
+def normalize_category(text) -> list[str]:
+    found = classes_in(text, CATEGORIES)
+    return found or ["general"]
+
+
+def normalize_profile(answers: dict) -> dict:
+    """
+    Canonical form of the flow.json answers: state name, land ownership,
+    land and income buckets, crop/activity classes, irrigation class and
+    special categories. Farmers whose answers differ only in spelling or
+    exact figures within a bucket get the same profile.
+    """
+    answers = {KEY_ALIASES.get(k, k): v for k, v in answers.items()}
+    owns_land = normalize_yes_no(answers.get("owns_land"))
+    activity_text = " ".join(str(answers.get(k, "")) for k in ("farming_type", "activity"))
+    return {
+        "state": normalize_state(answers.get("state")),
+        "owns_land": owns_land,
+        "land": land_bucket(answers.get("land_size")) if owns_land == "yes" else "none",
+        "activities": classes_in(activity_text, CROP_CLASSES) or ["unspecified"],
+        "irrigation": (classes_in(answers.get("irrigation"), IRRIGATION_CLASSES) or ["unknown"])[0]
+        if answers.get("irrigation") else "n/a",
+        "income": income_bucket(answers.get("income")),
+        "category": normalize_category(answers.get("category")),
+    }
+
+
+def profile_key(profile: dict, salt: str = "") -> str:
+    """Cache key for a profile; `salt` folds in anything else the result depends on."""
+    payload = json.dumps({"v": PROFILE_VERSION, "salt": salt, **profile}, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+def profile_text(profile: dict) -> str:
+    """The normalized profile as prompt / retrieval text."""
+    return "\n".join(
+        f"{key}: {', '.join(value) if isinstance(value, list) else value}" for key, value in profile.items()
+    )
+
+
+# ---------- SELF-CHECK ----------
+# python scripts/profile_normalizer.py
+EXAMPLES = [
+    (normalize_yes_no, "Yes", "yes"),
+    (normalize_yes_no, "I own 3 acres", "yes"),
+    (normalize_yes_no, "I have land", "yes"),
+    (normalize_yes_no, "I do not own", "no"),
+    (normalize_yes_no, "don't own", "no"),
+    (normalize_yes_no, "not mine", "no"),
+    (normalize_yes_no, "I don't have land", "no"),
+    (normalize_yes_no, "nahi, kiraye par", "no"),
+    (normalize_yes_no, "leased land", "no"),
+    (normalize_yes_no, "Yes, I own it, no loan", "yes"),
+    (normalize_yes_no, "own land, not leased", "yes"),
+    (normalize_yes_no, "No", "no"),
+    (normalize_yes_no, "no, I don't", "no"),
+    (normalize_yes_no, "zameen nahi hai", "no"),
+    (normalize_yes_no, "", "unknown"),
+    (land_bucket, "half acre", "0-1ac"),
+    (land_bucket, "half an acre", "0-1ac"),
+    (land_bucket, "one and a half acres", "unknown"),
+    (land_bucket, "2 and a half acres", "unknown"),
+    (land_bucket, "1.5 acres", "1-2ac"),
+    (income_bucket, "two hundred thousand", "unknown"),
+    (land_bucket, "dedh bigha", "0-1ac"),
+    (land_bucket, "two hectares", "2-5ac"),
+    (land_bucket, "3 acres", "2-5ac"),
+    (income_bucket, "one lakh", "100000-250000"),
+    (income_bucket, "2,50,000", "250000-500000"),
+    (income_bucket, "fifty thousand", "0-100000"),
+]
+
+if __name__ == "__main__":
+    failed = [(fn.__name__, text, want, fn(text)) for fn, text, want in EXAMPLES if fn(text) != want]
+    for name, text, want, got in failed:
+        print(f"{name}({text!r}) = {got!r}, expected {want!r}")
+    print(f"{len(EXAMPLES) - len(failed)}/{len(EXAMPLES)} examples pass")
+    raise SystemExit(1 if failed else 0)
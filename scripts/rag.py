@@ -1,32 +1,110 @@
-import chromadb
 from fastapi import APIRouter
 from dotenv import load_dotenv
-from sentence_transformers import SentenceTransformer
 from data_input import llm_call
+from scripts.registry import registry
+from scripts.llm_gateway import gateway
+from scripts.translation_catalog import catalog
+from scripts.schemes import SCHEMES, resolve_scheme, scheme_filter
+from scripts.hybrid_search import BM25Index, hybrid_search
+from scripts.context_packer import pack_context, log_stats
+from scripts.answer_cache import SemanticAnswerCache
+from scripts.profile_normalizer import normalize_profile, profile_key, profile_text
+from scripts.eligibility_cache import EligibilityCache
+from scripts.rule_engine import RuleSet, split_decisions, describe_decisions, decision_stats, UNCERTAIN
+import json
+import time
 import os
+import threading
 
 load_dotenv()
 
 router = APIRouter()
 
 current_dir = os.path.dirname(os.path.abspath(__file__))
-CHROMA_DB_PATH = os.path.join(current_dir, "chroma_db")
 COLLECTION_NAME = "farmer_schemes"
-
-# Initialize Chroma client and collection
-client = chromadb.PersistentClient(path=CHROMA_DB_PATH)
-collection = client.get_or_create_collection(name=COLLECTION_NAME)
-
-# Initialize embedding model
-embedding_model = SentenceTransformer("all-MiniLM-L6-v2")
+BM25_INDEX_PATH = os.path.join(current_dir, "bm25_index.json")
+RAG_RESULTS = 6  # chunks per eligibility call (was 12 with dense-only retrieval)
+SCHEME_QA_RESULTS = 5  # chunks per follow-up question once narrowed to one scheme
+
+# Scheme chunks (backend picked by VECTOR_STORAGE) and the embedding model behind the
+# on-disk embedding cache, both shared process-wide through the registry
+collection = registry.collection(COLLECTION_NAME)
+embedding_model = registry.embedder()
+
+# Keyword side of hybrid retrieval, built by scripts/ingest.py. A re-ingest
+# replaces the file while the app runs, so it is reloaded when its mtime changes.
+bm25 = None
+bm25_mtime = -1  # not loaded yet
+bm25_lock = threading.Lock()
+
+def current_bm25():
+  """
+  The BM25 index as ingest last wrote it (None when there is none yet).
+  """
+  global bm25, bm25_mtime
+  try:
+    mtime = os.stat(BM25_INDEX_PATH).st_mtime_ns
+  except OSError:
+    mtime = None
+  if mtime != bm25_mtime:
+    with bm25_lock:
+      if mtime != bm25_mtime:
+        bm25 = BM25Index.load(BM25_INDEX_PATH)
+        if bm25 is None:
+          print(f"No BM25 index at {BM25_INDEX_PATH}; run scripts/ingest.py. Using dense retrieval only.")
+        elif bm25_mtime != -1:
+          print(f"BM25 index changed on disk; reloaded {len(bm25.ids)} chunks")
+        bm25_mtime = mtime
+  return bm25
+
+current_bm25()
+
+# Follow-up answers reused across farmers asking the same thing (see ANSWER_CACHE_* env)
+answer_cache = SemanticAnswerCache()
+
+# Eligibility results per normalized farmer profile, persisted across restarts
+eligibility_cache = EligibilityCache()
+
+# Compiled scheme rules (scripts/compile_rules.py): clear-cut decisions never reach the LLM
+eligibility_rules = RuleSet.load()
 
 @router.post("/rag")
 def rag(query: str, language: str = "english"):
-  query_embedding = embedding_model.encode(query).tolist()
-  result_chunks = collection.query(
-      query_embeddings=query_embedding,
-      n_results=12
-  )
+  # Flow answers (JSON) are normalized so equivalent farmers share one cached result;
+  # the prompt then only sees the normalized profile, never one farmer's specifics
+  started = time.perf_counter()
+  try:
+    answers = json.loads(query)
+  except ValueError:
+    answers = None
+  key = None
+  rule_decisions = ""
+  if isinstance(answers, dict):
+    profile = normalize_profile(answers)
+    key = profile_key(profile, eligibility_rules.version)
+    cached = eligibility_cache.get(key, language)
+    if cached is not None:
+      print(f"[rag] eligibility cache hit for {key[:12]} in {(time.perf_counter() - started) * 1000:.1f} ms")
+      return {"response": cached}
+    query = json.dumps(profile, ensure_ascii=False)
+    retrieval_query = profile_text(profile)
+
+    decisions = eligibility_rules.evaluate(profile)
+    uncertain = len(split_decisions(decisions)[UNCERTAIN])
+    # The answer is always written by the LLM, settled schemes included: one call per request
+    decision_stats.record("rag", len(decisions) - uncertain, len(SCHEMES) - len(decisions) + uncertain, llm_calls=1)
+    if decisions:
+      rule_decisions = f"""
+3) Rule engine decisions (from the compiled scheme guidelines):
+{describe_decisions(decisions)}
+"""
+  else:
+    retrieval_query = query
+    decision_stats.record("rag", 0, len(SCHEMES), llm_calls=1)
+
+  result_chunks = hybrid_search(collection, current_bm25(), embedding_model, retrieval_query, RAG_RESULTS)
+  context, stats = pack_context(result_chunks)
+  log_stats("rag", stats)
 
   response = llm_call(f"""
 SYSTEM ROLE:
@@ -37,9 +115,11 @@ INPUTS:
 {query}
 
 2) Retrieved document chunks (may include forms, annexures, or guidelines):
-{result_chunks}
-
+{context}
+{rule_decisions}
 YOUR TASK:
+- If rule engine decisions are given, they are FINAL: include every ELIGIBLE scheme,
+  never include a NOT ELIGIBLE one, and only judge the NEEDS YOUR JUDGEMENT ones yourself.
 - Decide which schemes the farmer is likely ELIGIBLE for.
 - Decide which schemes the farmer is NOT ELIGIBLE for.
 - Use the farmer profile as the PRIMARY source for eligibility.
@@ -79,18 +159,35 @@ OUTPUT FORMAT:
     }}
   ]
 }}
-"""
-)
+""", site="rag_eligibility")
+  if key and response and response.strip():
+    eligibility_cache.put(key, language, profile, response, time.perf_counter() - started)
   return {"response": response}
 
 @router.post("/rag_specific_qa")
 def rag_specific_qa(scheme_name: str, user_question: str, language: str = "english"):
-  query_embedding = embedding_model.encode(f"{scheme_name} {user_question}").tolist()
-  result_chunks = collection.query(
-      query_embeddings=query_embedding,
-      n_results=8
-  )
-  
+  # Search only the chunks of the scheme the user named, when we can tell which
+  scheme_id = resolve_scheme(scheme_name)
+  started = time.perf_counter()
+  cache_scope = scheme_id or f"name:{scheme_name.strip().lower()}"
+  question_embedding = embedding_model.encode(user_question)
+  cached = answer_cache.get(cache_scope, language, question_embedding)
+  if cached is not None:
+    print(f"[rag_specific_qa] answer cache hit for {cache_scope} in {(time.perf_counter() - started) * 1000:.1f} ms")
+    return {"response": cached}
+
+  result_chunks = None
+  if scheme_id:
+    scheme_name = SCHEMES[scheme_id]["name"]
+    result_chunks = hybrid_search(
+        collection, current_bm25(), embedding_model, user_question, SCHEME_QA_RESULTS, where=scheme_filter(scheme_id)
+    )
+  if not result_chunks or not result_chunks["ids"][0]:
+    # Unknown scheme, or one with no PDF ingested (e.g. KCC)
+    result_chunks = hybrid_search(collection, current_bm25(), embedding_model, f"{scheme_name} {user_question}", RAG_RESULTS)
+  context, stats = pack_context(result_chunks)
+  log_stats("rag_specific_qa", stats)
+
   response = llm_call(f"""
 SYSTEM ROLE:
 You are an expert advisor for Indian government farmer schemes, specifically knowledgeable about the "{scheme_name}" scheme.
@@ -100,7 +197,7 @@ INPUTS:
 {user_question}
 
 2) Retrieved document chunks (from official forms, annexures, or guidelines):
-{result_chunks}
+{context}
 
 YOUR TASK:
 - Answer the user's specific question accurately and directly using information ONLY related to "{scheme_name}".
@@ -112,6 +209,39 @@ OUTPUT REQUIREMENTS:
 - You MUST respond ENTIRELY in this language: {language.upper()}.
 - Output plain text. DO NOT output JSON. Do NOT use markdown formatting (no bolding, no italics, no bullet points). Keep it clean conversational text.
 - Be extremely concise, conversational, and factual.
-"""
+""", site="rag_qa"
   )
-  return {"response": response.strip()}
\ No newline at end of file
+  answer = response.strip()
+  if answer:
+    answer_cache.put(cache_scope, language, question_embedding, answer, time.perf_counter() - started)
+  return {"response": answer}
+
+@router.get("/rag/embedding_cache_stats")
+def embedding_cache_stats():
+  return embedding_model.stats()
+
+@router.get("/rag/answer_cache_stats")
+def answer_cache_stats():
+  return answer_cache.stats()
+
+@router.get("/rag/eligibility_cache_stats")
+def eligibility_cache_stats():
+  return eligibility_cache.stats()
+
+@router.get("/rag/rule_engine_stats")
+def rule_engine_stats():
+  return {"rules_version": eligibility_rules.version, **decision_stats.stats()}
+
+@router.get("/rag/registry_stats")
+def registry_stats():
+  # Load time and RSS growth of each shared model / collection, plus current process RSS
+  return registry.report()
+
+@router.get("/rag/llm_gateway_stats")
+def llm_gateway_stats():
+  # Upstream LLM calls, retries, failures and latency per call site, plus response cache hits
+  return gateway.stats()
+
+@router.get("/rag/translation_catalog_stats")
+def translation_catalog_stats():
+  return catalog.stats()
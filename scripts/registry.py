@@ -0,0 +1,108 @@
+import os
+import time
+import threading
+
+try:
+    from embedding_cache import EmbeddingCache
+    from vector_backend import open_collection
+    from onnx_embedder import backend_tag, load_embedding_model, resolve_backend
+except ImportError:  # imported as scripts.registry by the app
+    from scripts.embedding_cache import EmbeddingCache
+    from scripts.vector_backend import open_collection
+    from scripts.onnx_embedder import backend_tag, load_embedding_model, resolve_backend
+
+# ---------- CONFIG ----------
+CHROMA_DB_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "chroma_db")
+EMBEDDING_MODEL_NAME = "all-MiniLM-L6-v2"
+WARMUP_COLLECTIONS = ("farmer_schemes", "farmer_profiles")
+
+
+def rss_mb() -> float:
+    """Resident memory of this process in MB (peak RSS where /proc is missing)."""
+    try:
+        with open("/proc/self/status", encoding="utf-8") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+class Registry:
+    """
+    One embedding model and one vector collection per name for the whole
+    process, shared by rag.py, the WhatsApp / web chat flows and the admin
+    broadcast. Everything is created on first use; each entry has its own
+    lock so a slow model load doesn't hold up opening a collection, and two
+    threads asking for the same entry get the same object. Load time and
+    the RSS growth it caused are recorded per entry.
+    """
+
+    def __init__(self, chroma_path: str = CHROMA_DB_PATH):
+        self.chroma_path = chroma_path
+        self.lock = threading.Lock()
+        self.entries = {}  # key -> object
+        self.entry_locks = {}  # key -> Lock
+        self.loads = {}  # key -> {"seconds", "rss_mb"}
+
+    def _get(self, key: str, factory):
+        entry = self.entries.get(key)
+        if entry is not None:
+            return entry
+        with self.lock:
+            entry_lock = self.entry_locks.setdefault(key, threading.Lock())
+        with entry_lock:
+            if key not in self.entries:
+                before, started = rss_mb(), time.perf_counter()
+                self.entries[key] = factory()
+                self.loads[key] = {
+                    "seconds": round(time.perf_counter() - started, 3),
+                    "rss_mb": round(rss_mb() - before, 1),
+                }
+                print(f"Registry: loaded {key} in {self.loads[key]['seconds']}s (+{self.loads[key]['rss_mb']} MB)")
+            return self.entries[key]
+
+    def chroma_client(self):
+        def factory():
+            import chromadb
+            return chromadb.PersistentClient(path=self.chroma_path)
+        return self._get(f"chroma:{self.chroma_path}", factory)
+
+    def sentence_model(self, name: str = EMBEDDING_MODEL_NAME):
+        """The encoder for `name` on EMBEDDING_BACKEND (torch, or a parity-checked onnx; see onnx_embedder.py)."""
+        backend = resolve_backend(name)
+        return self._get(f"model:{name}:{backend}", lambda: load_embedding_model(name, backend))
+
+    def embedder(self, name: str = EMBEDDING_MODEL_NAME) -> EmbeddingCache:
+        """
+        The shared embedding cache for `name`. Its model comes from
+        sentence_model() on the first cache miss, so a process that only
+        hits the cache still never loads it. ONNX vectors are cached apart
+        from torch ones, since they are close but not identical.
+        """
+        tag = backend_tag(resolve_backend(name))
+        cache_name = f"{name}+{tag}" if tag else name
+        return self._get(
+            f"embedder:{cache_name}",
+            lambda: EmbeddingCache(cache_name, model_loader=lambda: self.sentence_model(name)),
+        )
+
+    def collection(self, name: str):
+        """The vector backend for `name` (see vector_backend.open_collection)."""
+        return self._get(f"collection:{name}", lambda: open_collection(name, self.chroma_client()))
+
+    def warmup(self, models: tuple = (EMBEDDING_MODEL_NAME,), collections: tuple = WARMUP_COLLECTIONS) -> dict:
+        """Load everything a request would otherwise pay for on first use."""
+        for name in models:
+            self.embedder(name).model
+        for name in collections:
+            self.collection(name)
+        return self.report()
+
+    def report(self) -> dict:
+        return {"loads": dict(self.loads), "rss_mb": round(rss_mb(), 1)}
+
+
+registry = Registry()
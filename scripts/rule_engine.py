@@ -0,0 +1,290 @@
+import os
+import re
+import json
+import threading
+
+# ---------- CONFIG ----------
+RULES_PATH = os.getenv(
+    "ELIGIBILITY_RULES_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "eligibility_rules.json"),
+)
+RULES_SCHEMA_VERSION = 1
+
+ELIGIBLE, INELIGIBLE, UNCERTAIN = "eligible", "ineligible", "uncertain"
+UNKNOWN_VALUES = {"unknown", "unspecified", "other", "n/a", None}
+
+# Fields of profile_normalizer.normalize_profile() a rule may test, and the
+# operators that make sense on each
+FIELDS = {
+    "state": {"eq", "ne", "in", "not_in"},
+    "owns_land": {"eq", "ne"},
+    "land": {"gte", "lt", "eq", "ne"},
+    "activities": {"overlaps", "not_overlaps"},
+    "irrigation": {"eq", "ne", "in", "not_in"},
+    "income": {"gte", "lt"},
+    "category": {"overlaps", "not_overlaps"},
+}
+
+
+# ---------- CONDITIONS ----------
+def bucket_bounds(label: str) -> tuple[float, float] | None:
+    """(low, high) of a "2-5ac" / "10+ac" / "100000-250000" bucket; high is exclusive."""
+    if label == "none":
+        return 0.0, 0.0
+    match = re.match(r"^(\d+(?:\.\d+)?)(?:-(\d+(?:\.\d+)?)|(\+))", label or "")
+    if not match:
+        return None
+    low = float(match.group(1))
+    return low, float(match.group(2)) if match.group(2) else float("inf")
+
+
+def check(condition: dict, profile: dict) -> bool | None:
+    """True / False, or None when the profile doesn't say enough to tell."""
+    value = profile.get(condition["field"])
+    op, target = condition["op"], condition["value"]
+    if isinstance(value, list):
+        known = [v for v in value if v not in UNKNOWN_VALUES]
+        if not known:
+            return None
+        if op == "overlaps":
+            return bool(set(known) & set(target))
+        if op == "not_overlaps":
+            return not set(known) & set(target)
+        return None
+    if value in UNKNOWN_VALUES:
+        return None
+    if op in ("gte", "lt"):
+        bounds = bucket_bounds(value)
+        if bounds is None:
+            return None
+        low, high = bounds
+        if op == "gte":
+            return True if low >= target else False if high <= target else None
+        return True if high <= target else False if low >= target else None
+    if op == "eq":
+        return value == target
+    if op == "ne":
+        return value != target
+    if op == "in":
+        return value in target
+    if op == "not_in":
+        return value not in target
+    return None
+
+
+def evaluate_scheme(rule: dict, profile: dict) -> dict:
+    """
+    One scheme's decision for a normalized profile:
+      - any `exclude` condition true                -> ineligible
+      - any `require` condition false               -> ineligible
+      - a `require` unknown, or an `uncertain_if`
+        true (a borderline case worth a closer look) -> uncertain
+      - otherwise                                   -> eligible
+    """
+    for condition in rule.get("exclude", []):
+        if check(condition, profile) is True:
+            return {"status": INELIGIBLE, "reason": condition["label"]}
+    unknown = []
+    for condition in rule.get("require", []):
+        result = check(condition, profile)
+        if result is False:
+            return {"status": INELIGIBLE, "reason": f"needs: {condition['label']}"}
+        if result is None:
+            unknown.append(condition)
+    flagged = [c for c in rule.get("uncertain_if", []) if check(c, profile) is True]
+    if unknown or flagged:
+        return {"status": UNCERTAIN, "reason": f"check: {(unknown or flagged)[0]['label']}"}
+    return {"status": ELIGIBLE, "reason": rule.get("summary", "")}
+
+
+def validate_rule(rule: dict) -> list[str]:
+    """Problems with a scheme rule (empty if it is usable)."""
+    problems = []
+    if not isinstance(rule, dict):
+        return ["rule is not an object"]
+    for section in ("require", "exclude", "uncertain_if"):
+        conditions = rule.get(section, [])
+        if not isinstance(conditions, list):
+            problems.append(f"{section} is not a list")
+            continue
+        for condition in conditions:
+            if not isinstance(condition, dict):
+                problems.append(f"{section}: condition is not an object")
+                continue
+            field, op = condition.get("field"), condition.get("op")
+            if field not in FIELDS:
+                problems.append(f"{section}: unknown field {field!r}")
+            elif op not in FIELDS[field]:
+                problems.append(f"{section}: op {op!r} not allowed on {field}")
+            if "value" not in condition:
+                problems.append(f"{section}: {field} has no value")
+            elif op in ("in", "not_in", "overlaps", "not_overlaps") and not isinstance(condition["value"], list):
+                problems.append(f"{section}: {field} {op} needs a list")
+            elif op in ("gte", "lt") and not isinstance(condition["value"], (int, float)):
+                problems.append(f"{section}: {field} {op} needs a number")
+            if not condition.get("label"):
+                problems.append(f"{section}: {field} has no label")
+    if not rule.get("require") and not rule.get("exclude"):
+        problems.append("rule has no conditions")
+    return problems
+
+
+# ---------- RULE SET ----------
+class RuleSet:
+    """
+    Compiled eligibility rules (see scripts/compile_rules.py), evaluated
+    locally against a normalized profile.
+    """
+
+    def __init__(self, data: dict):
+        self.version = data.get("rules_version", "none")
+        self.schemes = data.get("schemes", {})
+
+    @classmethod
+    def load(cls, path: str = RULES_PATH) -> "RuleSet":
+        if not os.path.exists(path):
+            print(f"No eligibility rules at {path}; every decision goes to the LLM")
+            return cls({})
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        if data.get("schema_version") != RULES_SCHEMA_VERSION:
+            print(f"Eligibility rules at {path} use an old schema; every decision goes to the LLM")
+            return cls({})
+        return cls(data)
+
+    def evaluate(self, profile: dict) -> dict:
+        """{scheme_id: {"name", "status", "reason"}} for every compiled scheme."""
+        return {
+            scheme_id: {"name": rule["name"], **evaluate_scheme(rule, profile)}
+            for scheme_id, rule in self.schemes.items()
+        }
+
+
+def split_decisions(decisions: dict) -> dict:
+    """{status: [scheme_id, ...]} in rule-set order."""
+    groups = {ELIGIBLE: [], INELIGIBLE: [], UNCERTAIN: []}
+    for scheme_id, decision in decisions.items():
+        groups[decision["status"]].append(scheme_id)
+    return groups
+
+
+def describe_decisions(decisions: dict) -> str:
+    """Prompt block telling the LLM which decisions are already settled."""
+    groups = split_decisions(decisions)
+    lines = []
+    for status, title in ((ELIGIBLE, "ELIGIBLE (final)"), (INELIGIBLE, "NOT ELIGIBLE (final)"),
+                          (UNCERTAIN, "NEEDS YOUR JUDGEMENT")):
+        for scheme_id in groups[status]:
+            decision = decisions[scheme_id]
+            lines.append(f"- {title}: {decision['name']} ({decision['reason']})")
+    return "\n".join(lines)
+
+
+# ---------- EXTRACTION ----------
+EXTRACT_PROMPT = """
+You convert farmer-scheme eligibility criteria into JSON rules for a local evaluator.
+
+SCHEME: {name}
+CRITERIA TEXT:
+{text}
+
+Profile fields and the values they can take:
+- state: Indian state name, e.g. "Maharashtra"
+- owns_land: "yes" | "no"
+- land: land holding in acres (compare with gte / lt and a number of acres)
+- activities: list, any of {activities}
+- irrigation: one of {irrigation}
+- income: annual income in rupees (compare with gte / lt and a number)
+- category: list, any of ["sc", "st", "woman", "general"]
+
+Allowed ops per field: {ops}
+
+Return ONLY a JSON object:
+{{
+  "summary": "<one line: who the scheme is for>",
+  "require": [{{"field": ..., "op": ..., "value": ..., "label": "<short plain-English condition>"}}],
+  "exclude": [...],
+  "uncertain_if": [...]
+}}
+Only encode criteria the text states clearly; leave anything vague out.
+"""
+
+
+def extract_rule(name: str, text: str, llm_call) -> tuple[dict | None, list[str]]:
+    """
+    Ask the LLM to turn criteria text into a rule in this module's format.
+    Returns (rule, problems); rule is None unless it validated cleanly.
+    """
+    try:
+        from profile_normalizer import CROP_CLASSES, IRRIGATION_CLASSES
+    except ImportError:  # imported as scripts.rule_engine by the app
+        from scripts.profile_normalizer import CROP_CLASSES, IRRIGATION_CLASSES
+
+    prompt = EXTRACT_PROMPT.format(
+        name=name,
+        text=text,
+        activities=json.dumps(sorted(CROP_CLASSES)),
+        irrigation=json.dumps(sorted(IRRIGATION_CLASSES)),
+        ops=json.dumps({field: sorted(ops) for field, ops in FIELDS.items()}),
+    )
+    try:
+        raw = llm_call(prompt) or ""
+        match = re.search(r"\{.*\}", raw, re.DOTALL)
+        rule = json.loads(match.group(0)) if match else None
+    except Exception as e:
+        return None, [f"extraction failed: {e}"]
+    if rule is None:
+        return None, ["no JSON in the LLM reply"]
+    problems = validate_rule(rule)
+    if problems:
+        return None, problems
+    return {"name": name, **rule}, []
+
+
+# ---------- STATS ----------
+class DecisionStats:
+    """
+    Per call site: scheme decisions the rules settled ("local") vs left to
+    the LLM ("llm"), and the LLM calls the requests actually made. A request
+    can settle every scheme by rule and still call the LLM to write up the
+    answer, so local_fraction (decisions) and llm_call_fraction (requests
+    that made a call) are reported separately.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.sites = {}
+
+    def record(self, site: str, local: int, llm: int, llm_calls: int | None = None):
+        """One request; `llm_calls` defaults to one call if any decision went to the LLM."""
+        with self.lock:
+            counts = self.sites.setdefault(site, {"local": 0, "llm": 0, "requests": 0, "llm_calls": 0, "requests_with_llm": 0})
+            counts["local"] += local
+            counts["llm"] += llm
+            calls = (1 if llm else 0) if llm_calls is None else llm_calls
+            counts["requests"] += 1
+            counts["llm_calls"] += calls
+            counts["requests_with_llm"] += bool(calls)
+
+    def stats(self) -> dict:
+        with self.lock:
+            local = sum(c["local"] for c in self.sites.values())
+            total = local + sum(c["llm"] for c in self.sites.values())
+            requests = sum(c["requests"] for c in self.sites.values())
+            with_llm = sum(c["requests_with_llm"] for c in self.sites.values())
+            return {
+                "sites": {
+                    site: {
+                        **c,
+                        "local_fraction": round(c["local"] / (c["local"] + c["llm"]), 4) if c["local"] + c["llm"] else 0.0,
+                        "llm_call_fraction": round(c["requests_with_llm"] / c["requests"], 4) if c["requests"] else 0.0,
+                    }
+                    for site, c in self.sites.items()
+                },
+                "local_fraction": round(local / total, 4) if total else 0.0,
+                "llm_call_fraction": round(with_llm / requests, 4) if requests else 0.0,
+                "llm_calls": sum(c["llm_calls"] for c in self.sites.values()),
+            }
+
+
+decision_stats = DecisionStats()
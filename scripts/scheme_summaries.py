@@ -0,0 +1,184 @@
+import os
+import re
+import json
+import threading
+from datetime import datetime, timezone
+from dotenv import load_dotenv
+
+try:
+    from schemes import SCHEMES, scheme_filter
+    from answer_cache import corpus_versions
+    from context_packer import pack_context
+    from llm_gateway import gateway
+except ImportError:  # imported as scripts.scheme_summaries by the app
+    from scripts.schemes import SCHEMES, scheme_filter
+    from scripts.answer_cache import corpus_versions
+    from scripts.context_packer import pack_context
+    from scripts.llm_gateway import gateway
+
+load_dotenv()
+
+# ---------- CONFIG ----------
+SUMMARIES_PATH = os.getenv(
+    "SCHEME_SUMMARIES_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "scheme_summaries.json"),
+)
+SUMMARY_LANGUAGES = [lang.strip() for lang in os.getenv("SUMMARY_LANGUAGES", "english,hindi,marathi").split(",") if lang.strip()]
+SUMMARY_MODEL = "openai/gpt-oss-120b"
+SUMMARY_QUERY = "objective benefits assistance features eligibility documents required how to apply"
+SUMMARY_CHUNKS = 8
+SUMMARY_CONTEXT_TOKENS = 2500
+ARTIFACT_VERSION = 1
+
+SUMMARY_PROMPT = """
+You are writing the fixed introduction farmers see when they pick the "{name}" scheme.
+
+Scheme guideline extracts:
+{context}
+
+Write ENTIRELY in {language}. Return ONLY a JSON object:
+{{
+  "summary": "<2 sentence high level summary of the scheme>",
+  "key_features": ["<short feature>", "... 3 to 5 items"],
+  "documents": ["<document a farmer needs to apply>", "..."],
+  "labels": {{"key_features": "<'Key Features' in {language}>", "documents": "<'Documents Required' in {language}>"}}
+}}
+Use the extracts where they say something; otherwise use well-known facts about the scheme. Do not quote amounts.
+"""
+
+
+# ---------- GENERATION ----------
+def _llm(prompt: str) -> str:
+    return gateway.chat(prompt, system=None, model=SUMMARY_MODEL, site="scheme_summary")
+
+
+def scheme_context(collection, bm25, scheme_id: str) -> str:
+    """The scheme's most overview-like chunks, packed to a token budget."""
+    if bm25 is None:
+        return ""
+    hits = bm25.search(SUMMARY_QUERY, SUMMARY_CHUNKS, scheme_filter(scheme_id))
+    if not hits:
+        return ""
+    stored = collection.get(ids=[cid for cid, _ in hits], include=["documents", "metadatas"])
+    # get() doesn't keep the order asked for; put the BM25 ranking back
+    by_id = {cid: (doc, meta) for cid, doc, meta in zip(stored["ids"], stored["documents"], stored["metadatas"])}
+    ranked = [cid for cid, _ in hits if cid in by_id]
+    context, _ = pack_context({
+        "ids": [ranked],
+        "documents": [[by_id[cid][0] for cid in ranked]],
+        "metadatas": [[by_id[cid][1] for cid in ranked]],
+    }, SUMMARY_CONTEXT_TOKENS)
+    return context
+
+
+def generate_entry(name: str, context: str, language: str) -> dict | None:
+    raw = _llm(SUMMARY_PROMPT.format(name=name, context=context or "(none ingested)", language=language))
+    match = re.search(r"\{.*\}", raw, re.DOTALL)
+    try:
+        entry = json.loads(match.group(0)) if match else None
+    except ValueError:
+        entry = None
+    if not isinstance(entry, dict) or not entry.get("summary"):
+        return None
+    return {
+        "summary": str(entry["summary"]).strip(),
+        "key_features": [str(item) for item in entry.get("key_features", [])],
+        "documents": [str(item) for item in entry.get("documents", [])],
+        "labels": entry.get("labels") or {},
+    }
+
+
+def refresh_summaries(collection, bm25, path: str = SUMMARIES_PATH, languages: list[str] = SUMMARY_LANGUAGES,
+                      manifest_path: str | None = None) -> dict:
+    """
+    Bring the summaries artifact up to date: a scheme is regenerated only
+    when its ingested PDFs changed (its corpus version moved) or a
+    language is missing. Returns counts of what was generated.
+    """
+    artifact = load_artifact(path) or {"schemes": {}}
+    versions = corpus_versions(manifest_path) if manifest_path else corpus_versions()
+    counts = {"generated": 0, "reused": 0, "failed": 0}
+
+    for scheme_id, scheme in SCHEMES.items():
+        version = versions.get(scheme_id, versions.get(None))
+        stored = artifact["schemes"].get(scheme_id, {})
+        if stored.get("corpus_version") != version:
+            stored = {"languages": {}}
+        entries = stored["languages"]
+        context = None
+        for language in languages:
+            if language in entries:
+                counts["reused"] += 1
+                continue
+            if context is None:
+                context = scheme_context(collection, bm25, scheme_id)
+            try:
+                entry = generate_entry(scheme["name"], context, language)
+            except Exception as e:
+                print(f"  {scheme_id}/{language}: summary failed: {e}")
+                entry = None
+            if entry is None:
+                counts["failed"] += 1
+                continue
+            entries[language] = entry
+            counts["generated"] += 1
+        artifact["schemes"][scheme_id] = {"name": scheme["name"], "corpus_version": version, "languages": entries}
+
+    artifact["version"] = ARTIFACT_VERSION
+    artifact["generated_at"] = datetime.now(timezone.utc).isoformat(timespec="seconds")
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(artifact, f, indent=1, ensure_ascii=False)
+    os.replace(tmp_path, path)
+    return counts
+
+
+# ---------- SERVING ----------
+def load_artifact(path: str = SUMMARIES_PATH) -> dict | None:
+    if not os.path.exists(path):
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        artifact = json.load(f)
+    if artifact.get("version") != ARTIFACT_VERSION:
+        return None
+    return artifact
+
+
+class SummaryStore:
+    """
+    The summaries artifact held in memory for the scheme_selection step.
+    Reloaded only when the file on disk changes (i.e. after an ingest).
+    """
+
+    def __init__(self, path: str = SUMMARIES_PATH):
+        self.path = path
+        self.mtime = -1
+        self.schemes = {}
+        self.lock = threading.Lock()
+
+    def _refresh(self):
+        mtime = os.path.getmtime(self.path) if os.path.exists(self.path) else None
+        if mtime == self.mtime:
+            return
+        self.mtime = mtime
+        artifact = load_artifact(self.path)
+        self.schemes = artifact["schemes"] if artifact else {}
+
+    def get(self, scheme_id: str, language: str) -> dict | None:
+        with self.lock:
+            self._refresh()
+            return self.schemes.get(scheme_id, {}).get("languages", {}).get(language.lower())
+
+
+def render_summary(entry: dict) -> str:
+    """Chat text for a summary entry: summary, then features and documents."""
+    labels = entry.get("labels") or {}
+    text = entry["summary"]
+    if entry.get("key_features"):
+        text += f"\n\n*{labels.get('key_features', 'Key Features')}:*\n" + "\n".join(f"• {f}" for f in entry["key_features"])
+    if entry.get("documents"):
+        text += f"\n\n*{labels.get('documents', 'Documents Required')}:*\n" + "\n".join(f"• {d}" for d in entry["documents"])
+    return text
+
+
+summary_store = SummaryStore()
@@ -0,0 +1,136 @@
+import re
+import difflib
+
+# ---------- CONFIG ----------
+# Canonical scheme IDs (same keys as auto_form_filling.application_flows),
+# the PDF(s) in data_sources each one is ingested from, and the ways farmers
+# actually type them. short_name is what fits in an SMS.
+SCHEMES = {
+    "pmfby": {
+        "name": "Pradhan Mantri Fasal Bima Yojana (PMFBY)",
+        "short_name": "PMFBY",
+        "files": ["PMFBY"],
+        "aliases": [
+            "pmfby", "fasal bima", "fasal bima yojana", "pradhan mantri fasal bima yojana",
+            "crop insurance", "pm fasal bima", "फसल बीमा", "पीक विमा",
+        ],
+    },
+    "pm_kisan": {
+        "name": "Pradhan Mantri Kisan Samman Nidhi (PM-KISAN)",
+        "short_name": "PM-KISAN",
+        "files": ["PM_KISAN"],
+        "aliases": [
+            "pm kisan", "pmkisan", "kisan samman nidhi", "samman nidhi",
+            "pradhan mantri kisan samman nidhi", "पीएम किसान", "किसान सम्मान निधि",
+        ],
+    },
+    "pmksy": {
+        "name": "Pradhan Mantri Krishi Sinchayee Yojana (PMKSY)",
+        "short_name": "PMKSY",
+        "files": ["Guidelines_PMKSY"],
+        "aliases": [
+            "pmksy", "krishi sinchayee yojana", "krishi sinchai yojana", "sinchayee", "per drop more crop",
+            "har khet ko pani", "irrigation scheme", "drip irrigation", "कृषि सिंचाई योजना",
+        ],
+    },
+    "soil_health_card": {
+        "name": "Soil Health Card Scheme",
+        "short_name": "Soil Health Card",
+        "files": ["Guidelines_Soil Health Card"],
+        "aliases": ["soil health card", "soil card", "soil health", "soil testing", "मृदा स्वास्थ्य कार्ड"],
+    },
+    "nlm": {
+        "name": "National Livestock Mission (NLM)",
+        "short_name": "NLM",
+        "files": ["NLMOperationalGuidelines"],
+        "aliases": [
+            "nlm", "national livestock mission", "livestock mission", "livestock scheme",
+            "राष्ट्रीय पशुधन मिशन", "पशुधन मिशन",
+        ],
+    },
+    "kcc": {
+        "name": "Kisan Credit Card (KCC)",
+        "short_name": "KCC",
+        "files": [],
+        "aliases": ["kcc", "kisan credit card", "kisan card", "किसान क्रेडिट कार्ड"],
+    },
+}
+FUZZY_THRESHOLD = 0.8  # difflib ratio needed for a misspelled alias to count
+
+_FILE_TO_ID = {stem: scheme_id for scheme_id, scheme in SCHEMES.items() for stem in scheme["files"]}
+
+
+def _normalize(text: str) -> str:
+    return re.sub(r"[^\w]+", " ", text.lower()).strip()
+
+
+def scheme_id_for_file(scheme_name: str) -> str:
+    """
+    Canonical ID for an ingested PDF (by file stem). Unknown PDFs get a slug
+    of their name so they still form their own partition.
+    """
+    if scheme_name in _FILE_TO_ID:
+        return _FILE_TO_ID[scheme_name]
+    return re.sub(r"[^a-z0-9]+", "_", scheme_name.lower()).strip("_")
+
+
+def scheme_by_name(title: str) -> str | None:
+    """
+    Canonical ID when `title` is exactly a scheme's name, ID or one of its
+    aliases (case and punctuation aside). Unlike resolve_scheme() there is
+    no partial or fuzzy match: "PM Kisan Maandhan Yojana" is a different
+    scheme from PM-KISAN, not a mention of it.
+    """
+    normalized = _normalize(title or "")
+    for scheme_id, scheme in SCHEMES.items():
+        names = [scheme_id.replace("_", " "), scheme["name"]] + scheme["aliases"]
+        if normalized and normalized in {_normalize(name) for name in names}:
+            return scheme_id
+    return None
+
+
+def resolve_scheme(text: str) -> str | None:
+    """
+    Map a free-text scheme reply ("pm kisan", "Fasal beema yojna", "PMFBY
+    please") to a canonical scheme ID, or None if nothing is close enough.
+    Exact alias matches win (longest first); otherwise the closest alias
+    by edit ratio, over windows of the reply as long as that alias.
+    """
+    normalized = _normalize(text or "")
+    if not normalized:
+        return None
+    padded = f" {normalized} "
+    squashed = normalized.replace(" ", "")
+
+    best_id, best_len = None, 0
+    for scheme_id, scheme in SCHEMES.items():
+        for alias in [scheme_id.replace("_", " ")] + scheme["aliases"]:
+            alias = _normalize(alias)
+            if (f" {alias} " in padded or alias.replace(" ", "") == squashed) and len(alias) > best_len:
+                best_id, best_len = scheme_id, len(alias)
+    if best_id:
+        return best_id
+
+    words = normalized.split()
+    best_id, best_score = None, FUZZY_THRESHOLD
+    for scheme_id, scheme in SCHEMES.items():
+        for alias in scheme["aliases"]:
+            alias = _normalize(alias)
+            if len(alias) < 4:
+                continue  # "nlm" vs "elm" is noise, not a typo
+            width = len(alias.split())
+            for start in range(max(1, len(words) - width + 1)):
+                window = " ".join(words[start:start + width])
+                score = difflib.SequenceMatcher(None, alias, window).ratio()
+                if score > best_score:
+                    best_id, best_score = scheme_id, score
+    return best_id
+
+
+def scheme_filter(scheme_id: str) -> dict:
+    """
+    Chroma `where` clause for one scheme's partition: chunks ingested from
+    its PDF, plus canonical chunks that absorbed a near-duplicate from it
+    (see dedup.DedupIndex.metadata).
+    """
+    return {"$or": [{"scheme_id": scheme_id}, {f"also_{scheme_id}": True}]}
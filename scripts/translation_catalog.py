@@ -0,0 +1,194 @@
+"""
+Translations of the app's fixed prompts (flow.json, flow_call.json, the
+auto-form application_flows and a few literal replies), one per (string
+hash, language), kept on disk so a fixed-prompt turn makes no LLM call.
+Filled lazily on first use, or ahead of time with:
+
+    python scripts/translation_catalog.py --languages hindi,marathi,tamil,telugu
+"""
+import os
+import sys
+import json
+import time
+import atexit
+import hashlib
+import argparse
+import threading
+
+try:
+    from llm_gateway import gateway
+except ImportError:  # imported as scripts.translation_catalog by the app
+    from scripts.llm_gateway import gateway
+
+# ---------- CONFIG ----------
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CATALOG_PATH = os.getenv(
+    "TRANSLATION_CATALOG_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "translation_catalog.json"),
+)
+TRANSLATION_LANGUAGES = [lang.strip() for lang in os.getenv("TRANSLATION_LANGUAGES", "hindi,marathi,tamil,telugu").split(",") if lang.strip()]
+TRANSLATE_PROMPT = "Translate the following text to {language}. Return ONLY the translated text:\n\n{text}"
+CATALOG_VERSION = 1
+SAVE_INTERVAL = float(os.getenv("TRANSLATION_CATALOG_SAVE_INTERVAL", "5"))  # seconds between rewrites of the file
+
+
+def text_key(text: str) -> str:
+    return hashlib.sha256(text.strip().encode("utf-8")).hexdigest()[:16]
+
+
+def file_digest(path: str) -> str:
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def data_digest(data) -> str:
+    return hashlib.sha256(json.dumps(data, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+def flow_strings(flow: dict) -> list[str]:
+    """Question texts of a flow.json-shaped dict (also fits application_flows entries)."""
+    strings = [q["text"] for q in flow.get("questions", {}).values() if q.get("text")]
+    return strings + [flow[key] for key in ("end_message",) if flow.get(key)]
+
+
+class TranslationCatalog:
+    """
+    Persistent translation memory grouped by source (a flow file, or a
+    module's literal replies). Each source is stored with a digest of its
+    content; when a flow file changes, register() drops that source's
+    translations so edited prompts never serve a stale one. Misses are
+    translated through the LLM gateway once; new entries are written back
+    to disk at most every SAVE_INTERVAL seconds, and at exit.
+    """
+
+    def __init__(self, path: str = CATALOG_PATH):
+        self.path = path
+        self.lock = threading.Lock()
+        self.sources = {}  # source -> {"digest", "entries": {text_key: {language: text}}}
+        self.strings = {}  # source -> fixed strings registered this run (for prefill)
+        self.hits = 0
+        self.misses = 0
+        self._dirty = False
+        self._saved_at = time.monotonic()
+        self._load()
+        atexit.register(self.flush)
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                stored = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Translation catalog unreadable ({e}), starting empty")
+            return
+        if stored.get("version") == CATALOG_VERSION:
+            self.sources = stored["sources"]
+
+    def _save(self):
+        """Caller holds self.lock."""
+        tmp_path = f"{self.path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"version": CATALOG_VERSION, "sources": self.sources}, f, indent=1, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+        self._dirty = False
+        self._saved_at = time.monotonic()
+
+    def flush(self):
+        with self.lock:
+            if self._dirty:
+                self._save()
+
+    def register(self, source: str, strings: list[str], digest: str | None = None):
+        """
+        Declare a source's fixed strings. With a digest (file_digest /
+        data_digest of the flow), a changed flow invalidates the source.
+        """
+        with self.lock:
+            self.strings[source] = list(dict.fromkeys(s for s in strings if s and s.strip()))
+            stored = self.sources.setdefault(source, {"digest": digest, "entries": {}})
+            if digest is not None and stored["digest"] != digest:
+                if stored["entries"]:
+                    print(f"Translation catalog: {source} changed, dropping {len(stored['entries'])} cached strings")
+                self.sources[source] = {"digest": digest, "entries": {}}
+                self._save()
+
+    def get(self, text: str, language: str, source: str) -> str | None:
+        entries = self.sources.get(source, {}).get("entries", {})
+        return entries.get(text_key(text), {}).get(language.lower().strip())
+
+    def translate(self, text: str, language: str, source: str, timeout: float | None = None) -> str:
+        """
+        `text` in `language`: from the catalog, or translated once and
+        stored. English, blank text and failed translations come back
+        unchanged (failures are not stored, so the next turn retries).
+        """
+        language = language.lower().strip()
+        if language == "english" or not text.strip():
+            return text
+        cached = self.get(text, language, source)
+        with self.lock:
+            if cached is not None:
+                self.hits += 1
+                return cached
+            self.misses += 1
+        try:
+            translated = gateway.chat(TRANSLATE_PROMPT.format(language=language, text=text), timeout=timeout, site="translate").strip()
+        except Exception as e:
+            print(f"Translation to {language} failed: {e}")
+            return text
+        if not translated:
+            return text
+        with self.lock:
+            stored = self.sources.setdefault(source, {"digest": None, "entries": {}})
+            stored["entries"].setdefault(text_key(text), {})[language] = translated
+            self._dirty = True
+            if time.monotonic() - self._saved_at >= SAVE_INTERVAL:
+                self._save()
+        return translated
+
+    def prefill(self, languages: list[str] = TRANSLATION_LANGUAGES) -> dict:
+        """Translate every registered string that's missing in `languages`."""
+        counts = {"translated": 0, "present": 0}
+        for source, strings in list(self.strings.items()):
+            for text in strings:
+                for language in languages:
+                    if language == "english" or self.get(text, language, source) is not None:
+                        counts["present"] += 1
+                        continue
+                    self.translate(text, language, source)
+                    counts["translated"] += self.get(text, language, source) is not None
+        self.flush()
+        return counts
+
+    def stats(self) -> dict:
+        with self.lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 4) if total else 0.0,
+                "sources": {source: len(stored["entries"]) for source, stored in self.sources.items()},
+                "unsaved": self._dirty,
+            }
+
+
+catalog = TranslationCatalog()
+
+
+# ---------- MAIN ----------
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fill the translation catalog for every fixed prompt.")
+    parser.add_argument("--languages", default=",".join(TRANSLATION_LANGUAGES), help="Comma-separated languages.")
+    args = parser.parse_args()
+
+    # The app modules register their own sources on import, into the
+    # catalog instance they import (scripts.translation_catalog, not __main__)
+    sys.path.insert(0, ROOT_DIR)
+    import data_input  # noqa: F401  flow.json + the chatbot END_TEXT
+    import auto_form_filling  # noqa: F401  application_flows
+    import ivr  # noqa: F401  flow_call.json + the fixed IVR_REPLIES
+    from scripts.translation_catalog import catalog
+
+    counts = catalog.prefill([lang for lang in args.languages.split(",") if lang])
+    print(f"Translation catalog: {counts['translated']} translated, {counts['present']} already present -> {catalog.path}")
@@ -0,0 +1,104 @@
+import os
+import threading
+from abc import ABC, abstractmethod
+
+try:
+    from compact_index import CompactIndex, CODE_DTYPES, COMPACT_DIR, VECTOR_STORAGE, VECTOR_RESCORE
+except ImportError:  # imported as scripts.vector_backend by the app
+    from scripts.compact_index import CompactIndex, CODE_DTYPES, COMPACT_DIR, VECTOR_STORAGE, VECTOR_RESCORE
+
+
+class VectorBackend(ABC):
+    """
+    What rag.py, ingest and the farmer profile store need from a vector
+    collection. Results use Chroma's shapes so either backend can be
+    swapped in with VECTOR_STORAGE:
+
+      upsert / add(ids, embeddings, documents=None, metadatas=None)
+      delete(ids)
+      count() -> int
+      get(ids=None, where=None, include=None)
+          -> {"ids", "documents", "metadatas"}
+      query(query_embeddings, n_results, where=None, include=None)
+          -> {"ids", "documents", "metadatas", "distances"}, one list per query
+
+    `where` supports equality, {"$in": [...]} and "$or" (see
+    compact_index.matches_where). Distances are squared L2.
+    """
+
+    @abstractmethod
+    def upsert(self, ids, embeddings, documents=None, metadatas=None): ...
+
+    def add(self, ids, embeddings, documents=None, metadatas=None):
+        return self.upsert(ids, embeddings, documents, metadatas)
+
+    @abstractmethod
+    def delete(self, ids): ...
+
+    @abstractmethod
+    def count(self) -> int: ...
+
+    @abstractmethod
+    def get(self, ids=None, where=None, **kwargs) -> dict: ...
+
+    @abstractmethod
+    def query(self, query_embeddings, n_results: int = 10, where=None, include=None, **kwargs) -> dict: ...
+
+
+class ChromaBackend(VectorBackend):
+    """A Chroma collection behind the VectorBackend interface (HNSW, SQLite metadata)."""
+
+    def __init__(self, collection):
+        self.collection = collection
+
+    def upsert(self, ids, embeddings, documents=None, metadatas=None):
+        return self.collection.upsert(ids=ids, embeddings=embeddings, documents=documents, metadatas=metadatas)
+
+    def add(self, ids, embeddings, documents=None, metadatas=None):
+        return self.collection.add(ids=ids, embeddings=embeddings, documents=documents, metadatas=metadatas)
+
+    def delete(self, ids=None, **kwargs):
+        return self.collection.delete(ids=ids, **kwargs)
+
+    def count(self) -> int:
+        return self.collection.count()
+
+    def get(self, ids=None, where=None, **kwargs) -> dict:
+        return self.collection.get(ids=ids, where=where, **kwargs)
+
+    def query(self, query_embeddings, n_results: int = 10, where=None, include=None, **kwargs) -> dict:
+        if include is not None:
+            kwargs["include"] = include
+        return self.collection.query(query_embeddings=query_embeddings, n_results=n_results, where=where, **kwargs)
+
+    def __getattr__(self, name):
+        # anything outside the interface (name, metadata, modify, ...) goes straight to Chroma
+        return getattr(self.collection, name)
+
+
+# NumPy memmaps, exhaustive search; duck-typed so compact_index stays standalone
+VectorBackend.register(CompactIndex)
+
+BACKENDS = {"chroma": "Chroma HNSW", **{mode: f"NumPy memmap, {mode}" for mode in CODE_DTYPES}}
+
+_open_backends = {}
+_open_lock = threading.Lock()
+
+
+def open_collection(name: str, chroma_client, storage: str = VECTOR_STORAGE) -> VectorBackend:
+    """
+    The vector backend for collection `name`, opened once per process:
+    VECTOR_STORAGE=chroma wraps the Chroma collection; float32 (exact),
+    float16 or int8 serve it from NumPy memmaps under COMPACT_DIR, which
+    ingest exports after each run (the profile store writes there directly).
+    """
+    if storage not in BACKENDS:
+        raise ValueError(f"Unknown VECTOR_STORAGE {storage!r}; expected one of {sorted(BACKENDS)}")
+    with _open_lock:
+        key = (name, storage)
+        if key not in _open_backends:
+            if storage == "chroma":
+                _open_backends[key] = ChromaBackend(chroma_client.get_or_create_collection(name=name))
+            else:
+                _open_backends[key] = CompactIndex(os.path.join(COMPACT_DIR, name), mode=storage, rescore=VECTOR_RESCORE)
+        return _open_backends[key]
@@ -1,6 +1,6 @@
 import os
 from fastapi import APIRouter, UploadFile, File, Form
-from groq import Groq
+from scripts.llm_gateway import gateway
 
 router = APIRouter()
 
@@ -15,16 +15,24 @@ LANGUAGE_MAP = {
 }
 
 def stt(audio_bytes, language="en"):
-  client = Groq()
   whisper_lang = LANGUAGE_MAP.get(language, "en")
-  transcription = client.audio.transcriptions.create(
-      file=("audio.webm", audio_bytes),
-      model="whisper-large-v3",
+  return gateway.transcribe(
+      audio_bytes,
+      "audio.webm",
+      temperature=0,
+      language=whisper_lang,
+      response_format="verbose_json",
+    )
+
+async def astt(audio_bytes, language="en"):
+  whisper_lang = LANGUAGE_MAP.get(language, "en")
+  return await gateway.atranscribe(
+      audio_bytes,
+      "audio.webm",
       temperature=0,
       language=whisper_lang,
       response_format="verbose_json",
     )
-  return transcription.text
 
 @router.post("/stt")
 async def process_audio(
@@ -32,5 +40,5 @@ async def process_audio(
     language: str = Form("en")
 ):
     audio_bytes = await audio_file.read()
-    transcribed_text = stt(audio_bytes, language)
+    transcribed_text = await astt(audio_bytes, language)
     return {"text": transcribed_text}
\ No newline at end of file
@@ -110,7 +110,7 @@ For each scheme:
 """
 
     try:
-        recommendation = llm_call(prompt)
+        recommendation = llm_call(prompt, site="weather")
         if not recommendation:
             recommendation = "Based on your area's weather, consider PMFBY for crop insurance and PMKSY for irrigation support."
     except Exception as e:
@@ -6,10 +6,22 @@ from fastapi.responses import Response
 from twilio.twiml.messaging_response import MessagingResponse
 
 from data_input import chatbot, ChatRequest
-from stt import stt
+from stt import astt
+from scripts.registry import registry
+from scripts.llm_gateway import gateway
+from scripts.profile_normalizer import normalize_profile
+from scripts.rule_engine import RuleSet, evaluate_scheme, decision_stats, ELIGIBLE, INELIGIBLE
+from scripts.schemes import scheme_by_name
 processed_message_sids = set()
 router = APIRouter()
 
+# Farmer profile vectors go through the shared embedding cache; the model
+# is only loaded when a profile text hasn't been seen before
+profile_embedder = registry.embedder()
+
+# Reviewed rules (scripts/compile_rules.py); only these may exclude a farmer from a broadcast
+eligibility_rules = RuleSet.load()
+
 # In-memory session tracking for WhatsApp numbers
 # Format: { "+1234567890": {"current_state": "start", "answers": {}, "language": "english"} }
 sessions = {
@@ -111,7 +123,7 @@ async def whatsapp_webhook(
                 if media_resp.status_code == 200:
                     print("Audio downloaded, transcribing via Whisper...")
                     try:
-                        transcription = stt(media_resp.content, session_lang)
+                        transcription = await astt(media_resp.content, session_lang)
                         body_text = transcription
                         print(f"Transcribed Text: {body_text}")
                     except Exception as e:
@@ -187,7 +199,6 @@ async def whatsapp_webhook(
 
     # Intent Classification handling
     if session["current_state"] == "awaiting_intent":
-        from data_input import llm_call
         prompt = f"""
         User said: "{body_text}"
         Determine the user's intent based on semantic meaning. 
@@ -208,7 +219,7 @@ async def whatsapp_webhook(
         Return ONLY the option key string. If unsure, return "eligibility".
         """
         try:
-            intent_resp = llm_call(prompt).strip().lower()
+            intent_resp = (await gateway.achat(prompt, site="intent")).strip().lower()
             intent = "eligibility"
             for k in ["kcc", "nlm", "pm_kisan", "pmfby"]:
                 if k in intent_resp:
@@ -285,25 +296,18 @@ async def whatsapp_webhook(
             rag_data = json.loads(clean_json)
             
             # --- CHROMADB FARMER PROFILE INGESTION ---
-            import os
-            import chromadb
-            from sentence_transformers import SentenceTransformer
             import json as built_in_json
             
             try:
-                db_dir = os.path.dirname(os.path.abspath(__file__))
-                chroma_path = os.path.join(db_dir, "scripts", "chroma_db")
-                pr_client = chromadb.PersistentClient(path=chroma_path)
-                f_collection = pr_client.get_or_create_collection(name="farmer_profiles")
+                f_collection = registry.collection("farmer_profiles")
                 
-                embedder = SentenceTransformer("all-MiniLM-L6-v2")
                 # Create a rich text summary of the farmer to embed for vector similarity
                 farmer_text_profile = ""
                 for k, v in session.get("answers", {}).items():
                     farmer_text_profile += f"{k}: {v}\n"
                     
                 if farmer_text_profile.strip():
-                    f_embed = embedder.encode(farmer_text_profile).tolist()
+                    f_embed = profile_embedder.encode(farmer_text_profile).tolist()
                     
                     f_collection.upsert(
                         documents=[built_in_json.dumps(session.get("answers", {}))],
@@ -441,7 +445,7 @@ async def web_chat_endpoint(request: WebChatRequest, http_request: Request):
     user_id = request.user_id
     body_text = request.message.strip()
     
-    from data_input import llm_call, chatbot, ChatRequest
+    from data_input import chatbot, ChatRequest
     
     LANGUAGE_OPTIONS = {
         "0": "english",
@@ -497,7 +501,6 @@ async def web_chat_endpoint(request: WebChatRequest, http_request: Request):
             
     # Intent Classification handling
     if session["current_state"] == "awaiting_intent":
-        from data_input import llm_call
         prompt = f'''
         User said: "{body_text}"
         Determine the user's intent based on semantic meaning. 
@@ -518,7 +521,7 @@ async def web_chat_endpoint(request: WebChatRequest, http_request: Request):
         Return ONLY the option key string. If unsure, return "eligibility".
         '''
         try:
-            intent_resp = llm_call(prompt).strip().lower()
+            intent_resp = (await gateway.achat(prompt, site="intent")).strip().lower()
             intent = "eligibility"
             for k in ["kcc", "nlm", "pm_kisan", "pmfby"]:
                 if k in intent_resp:
@@ -606,24 +609,17 @@ async def web_chat_endpoint(request: WebChatRequest, http_request: Request):
                 rag_data = json.loads(clean_json.strip())
                 
                 # --- CHROMADB FARMER PROFILE INGESTION ---
-                import os
-                import chromadb
-                from sentence_transformers import SentenceTransformer
                 import json as built_in_json
                 
                 try:
-                    db_dir = os.path.dirname(os.path.abspath(__file__))
-                    chroma_path = os.path.join(db_dir, "scripts", "chroma_db")
-                    pr_client = chromadb.PersistentClient(path=chroma_path)
-                    f_collection = pr_client.get_or_create_collection(name="farmer_profiles")
+                    f_collection = registry.collection("farmer_profiles")
                     
-                    embedder = SentenceTransformer("all-MiniLM-L6-v2")
                     farmer_text_profile = ""
                     for k, v in session.get("answers", {}).items():
                         farmer_text_profile += f"{k}: {v}\n"
                         
                     if farmer_text_profile.strip():
-                        f_embed = embedder.encode(farmer_text_profile).tolist()
+                        f_embed = profile_embedder.encode(farmer_text_profile).tolist()
                         
                         f_collection.upsert(
                             documents=[built_in_json.dumps(session.get("answers", {}))],
@@ -708,22 +704,16 @@ async def inject_scheme_endpoint(request: SchemeBroadcastRequest):
     3. Feeds each user's accumulated profile (answers dict) + scheme criteria into LLM.
     4. If LLM determines eligibility => Trues => Fires Outbound Twilio WhatsApp Message.
     """
-    from data_input import llm_call
     from twilio.rest import Client
     import os
-    import chromadb
-    from sentence_transformers import SentenceTransformer
     import json
     
     twilio_sid = os.getenv("TWILIO_ACCOUNT_SID")
     twilio_auth = os.getenv("TWILIO_AUTH_TOKEN")
     twilio_number = "whatsapp:+14155238886" # Standard Sandbox Number
     
-    # 1. Connect to ChromaDB
-    current_dir = os.path.dirname(os.path.abspath(__file__))
-    CHROMA_DB_PATH = os.path.join(current_dir, "scripts", "chroma_db")
-    client_db = chromadb.PersistentClient(path=CHROMA_DB_PATH)
-    farmer_collection = client_db.get_or_create_collection(name="farmer_profiles")
+    # 1. Connect to ChromaDB (shared client, see scripts/registry.py)
+    farmer_collection = registry.collection("farmer_profiles")
     
     matches = []
     
@@ -733,8 +723,7 @@ async def inject_scheme_endpoint(request: SchemeBroadcastRequest):
         return {"status": "success", "scanned_users": 0, "matches_found": 0, "message": "No farmers in ChromaDB yet."}
         
     # 2. Embed the New Scheme Criteria
-    embedding_model = SentenceTransformer("all-MiniLM-L6-v2")
-    scheme_embedding = embedding_model.encode(request.description).tolist()
+    scheme_embedding = profile_embedder.encode(request.description).tolist()
     
     # 3. Pull Top-Matching Farmers (Reverse RAG) from the DB
     results = farmer_collection.query(
@@ -743,6 +732,14 @@ async def inject_scheme_endpoint(request: SchemeBroadcastRequest):
     )
     
     scanned = 0
+    decided_locally = 0
+
+    # Only a reviewed rule from eligibility_rules.json may settle a farmer locally, and
+    # only when the title names that exact scheme; anything else is a new scheme whose
+    # announced criteria (request.description) the LLM judges for every farmer.
+    scheme_id = scheme_by_name(request.title)
+    scheme_rule = eligibility_rules.schemes.get(scheme_id) if scheme_id else None
+    outreach_messages = {}  # language -> outreach message for farmers the rule found eligible
     
     # results['ids'][0] contains the actual phone numbers ["whatsapp:+91...", etc.]
     # results['documents'][0] contains their JSON stringified answers profile
@@ -753,6 +750,31 @@ async def inject_scheme_endpoint(request: SchemeBroadcastRequest):
             profile_json_str = results["documents"][0][idx]
             metadata = results["metadatas"][0][idx]
             language = metadata.get("language", "english")
+
+            decision = None
+            if scheme_rule is not None:
+                try:
+                    decision = evaluate_scheme(scheme_rule, normalize_profile(json.loads(profile_json_str)))
+                except (ValueError, AttributeError):
+                    decision = None  # not a JSON answers dict; let the LLM read it
+            if decision and decision["status"] == INELIGIBLE:
+                decided_locally += 1
+                decision_stats.record("broadcast", 1, 0)
+                continue
+            eligible_by_rule = bool(decision and decision["status"] == ELIGIBLE)
+            decided_locally += eligible_by_rule
+            # An eligible farmer still costs a call for the first outreach message in their language
+            llm_calls = 1 if not eligible_by_rule or language not in outreach_messages else 0
+            decision_stats.record("broadcast", int(eligible_by_rule), int(not eligible_by_rule), llm_calls)
+
+            outreach_prompt = f"""
+            A new government scheme for farmers was announced:
+            Title: {request.title}
+            Details: {request.description}
+
+            Write a short 2-sentence proactive outreach message in {language} offering an eligible farmer to apply.
+            Only return the message. NO generic conversational filler.
+            """
             
             evaluation_prompt = f"""
             You are an expert Agricultural Scheme Evaluator.
@@ -775,7 +797,13 @@ async def inject_scheme_endpoint(request: SchemeBroadcastRequest):
             """
             
             try:
-                eval_result = llm_call(evaluation_prompt).strip()
+                if eligible_by_rule:
+                    # Same message for every eligible farmer in a language
+                    if language not in outreach_messages:
+                        outreach_messages[language] = (await gateway.achat(outreach_prompt, site="broadcast")).strip()
+                    eval_result = outreach_messages[language]
+                else:
+                    eval_result = (await gateway.achat(evaluation_prompt, site="broadcast")).strip()
                 
                 if not eval_result.upper().startswith("FALSE"):
                     matches.append(user_id)
@@ -799,6 +827,8 @@ async def inject_scheme_endpoint(request: SchemeBroadcastRequest):
     return {
         "status": "success", 
         "scanned_users": scanned,
-        "matches_found": len(matches)
+        "matches_found": len(matches),
+        "decided_locally": decided_locally,
+        "reviewed_rule": scheme_id if scheme_rule is not None else None
     }
 